@@ -0,0 +1,106 @@
+"""Compare disk usage and read latency of raw and compressed artifact storage
+
+A synthetic manifest is stored raw and gzip compressed in the artifact cache, then
+indexed from either file, which is the only time the manifest is read. Node reads
+decompress a single entry of the index.
+
+    python -m benchmarks.artifact_storage [number of nodes ...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from src.artifact_cache import ArtifactCache
+from src.manifest import (
+    MANIFEST_FILE,
+    MANIFEST_INDEX_FILE,
+    ensure_manifest_index,
+)
+
+DEFAULT_SIZES = (1_000, 10_000)
+NODE_READS = 20
+
+
+def synthetic_manifest(count: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    nodes = {}
+    for i in range(count):
+        resource_type = "test" if i % 3 else "model"
+        folder = f"models/domain_{i % 20}"
+        nodes[f"{resource_type}.project.node_{i}"] = {
+            "resource_type": resource_type,
+            "original_file_path": f"{folder}/node_{i}.sql",
+            "path": f"domain_{i % 20}/node_{i}.sql",
+            "raw_sql": f"select * from {{{{ ref('node_{rng.randrange(max(i, 1))}') }}}}"
+            f" where updated_at > '{rng.randrange(2000, 2023)}-01-01'",
+            "config": {
+                "enabled": True,
+                "materialized": "table" if i % 2 else "view",
+                "tags": [],
+                "meta": {},
+                "schema": f"domain_{i % 20}",
+                "column_types": {},
+                "full_refresh": None,
+                "on_schema_change": "ignore",
+            },
+            "depends_on": {
+                "macros": ["macro.dbt.is_incremental"],
+                "nodes": [f"model.project.node_{rng.randrange(max(i, 1))}"],
+            },
+            "columns": {
+                f"column_{c}": {"name": f"column_{c}", "description": "", "meta": {}}
+                for c in range(rng.randrange(1, 8))
+            },
+        }
+    return {"metadata": {"adapter_type": "snowflake"}, "nodes": nodes}
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def node_reads(read, unique_ids):
+    for unique_id in unique_ids:
+        read(unique_id)
+
+
+def main(sizes):
+    sys.stdout.write(
+        f"{'nodes':>8} {'raw MB':>8} {'gzip MB':>8} {'index MB':>9}"
+        f" {'build raw':>10} {'build gzip':>11} {'read index':>11}"
+        "   (seconds per node read)\n"
+    )
+    for size in sizes:
+        manifest = synthetic_manifest(size)
+        unique_ids = random.Random(1).sample(sorted(manifest["nodes"]), NODE_READS)
+        with tempfile.TemporaryDirectory() as directory:
+            raw = ArtifactCache(os.path.join(directory, "raw"), compresslevel=None)
+            compressed = ArtifactCache(os.path.join(directory, "gzip"))
+            raw_path = raw.path(0, 0, MANIFEST_FILE)
+            raw.put(0, 0, MANIFEST_FILE, manifest)
+            compressed.put(0, 0, MANIFEST_FILE, manifest)
+            gzip_path = compressed.path(0, 0, MANIFEST_FILE)
+
+            build_raw, raw_index = timed(ensure_manifest_index, raw, 0, 0, raw_path)
+            raw_index.close()
+            build_gzip, index = timed(
+                ensure_manifest_index, compressed, 0, 0, gzip_path
+            )
+            index_path = compressed.path(0, 0, MANIFEST_INDEX_FILE)
+            read_index, _ = timed(node_reads, index.node, unique_ids)
+            index.close()
+            sys.stdout.write(
+                f"{size:>8} {os.path.getsize(raw_path) / 1e6:>8.2f}"
+                f" {os.path.getsize(gzip_path) / 1e6:>8.2f}"
+                f" {os.path.getsize(index_path) / 1e6:>9.2f}"
+                f" {build_raw:>10.3f} {build_gzip:>11.3f}"
+                f" {read_index / NODE_READS:>11.6f}\n"
+            )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
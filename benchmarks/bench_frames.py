@@ -0,0 +1,60 @@
+"""Dataframe work of a render on the runs and jobs of the fake account"""
+import pytest
+
+from benchmarks.conftest import NODE_COUNTS, PROJECT_MAPPING
+from benchmarks.fake_dbt_cloud import FakeAccount
+from src.dbt_dashboard import (
+    choose_runs,
+    find_failed_results,
+    frame_page,
+    highlight,
+    join_runs_jobs,
+    only_latest_runs,
+    runs_to_frame,
+)
+
+PROJECT_IDS = [int(project_id) for project_id in PROJECT_MAPPING]
+PAGE_SIZE = 50
+
+
+@pytest.fixture(scope="module")
+def merged(all_runs, all_jobs):
+    return join_runs_jobs(all_runs, all_jobs, PROJECT_MAPPING)
+
+
+def test_runs_to_frame(benchmark, all_runs):
+    runs = benchmark(runs_to_frame, all_runs)
+    assert len(runs) == len(all_runs["data"])
+
+
+def test_only_latest_runs(benchmark, all_runs, all_jobs):
+    runs = runs_to_frame(all_runs)
+    latest = benchmark(only_latest_runs, runs)
+    assert len(latest) == min(len(all_jobs["data"]), len(runs))
+
+
+def test_join_runs_jobs(benchmark, all_runs, all_jobs):
+    merged = benchmark(join_runs_jobs, all_runs, all_jobs, PROJECT_MAPPING)
+    assert merged["project_name"].notna().all()
+
+
+@pytest.mark.parametrize("chosen", ["all", "failed"])
+def test_choose_runs(benchmark, merged, chosen):
+    chosen_df, options, selection = benchmark(
+        choose_runs, merged, PROJECT_IDS, chosen
+    )
+    assert len(options) == len(chosen_df)
+
+
+def test_runs_table_page(benchmark, merged):
+    chosen_df, _, _ = choose_runs(merged, PROJECT_IDS, "all")
+    styles = benchmark(lambda: highlight(frame_page(chosen_df, 1, PAGE_SIZE)))
+    assert len(styles) == min(PAGE_SIZE, len(chosen_df))
+
+
+@pytest.mark.parametrize("nodes", NODE_COUNTS, ids=lambda nodes: f"{nodes}nodes")
+def test_find_failed_results(benchmark, nodes):
+    account = FakeAccount(nodes=nodes, failure_rate=1.0)
+    run_results = account.run_results(1)
+    failed = benchmark(find_failed_results, run_results)
+    assert 0 < len(failed) < nodes
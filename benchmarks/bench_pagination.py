@@ -0,0 +1,35 @@
+"""Fetching every run of an account through the paginated runs endpoint"""
+from benchmarks.conftest import ACCOUNT_ID, MAX_WORKERS
+from src.classes import DbtCloud
+from src.dbt_dashboard import RUNS_PARAMS
+
+PARAMS = {**RUNS_PARAMS, "limit": 100}
+
+
+def test_collect_runs(benchmark, fake_api):
+    dbt = DbtCloud(ACCOUNT_ID, max_workers=MAX_WORKERS, api_base=fake_api.api_base)
+    runs = benchmark.pedantic(
+        lambda: dbt.list_runs(params=PARAMS).collect(), rounds=3, iterations=1
+    )
+    assert len(runs["data"]) == fake_api.accounts[ACCOUNT_ID].runs
+
+
+def test_collect_runs_async(benchmark, fake_api, event_loop, async_client):
+    async def collect():
+        response = await async_client.list_runs(params=PARAMS)
+        return await response.collect()
+
+    runs = benchmark.pedantic(
+        lambda: event_loop.run(collect()), rounds=3, iterations=1
+    )
+    assert len(runs["data"]) == fake_api.accounts[ACCOUNT_ID].runs
+
+
+def test_iterate_pages(benchmark, fake_api):
+    dbt = DbtCloud(ACCOUNT_ID, max_workers=MAX_WORKERS, api_base=fake_api.api_base)
+
+    def iterate():
+        return sum(len(page.get("data")) for page in dbt.list_runs(params=PARAMS))
+
+    count = benchmark.pedantic(iterate, rounds=3, iterations=1)
+    assert count == fake_api.accounts[ACCOUNT_ID].runs
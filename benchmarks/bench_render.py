@@ -0,0 +1,72 @@
+"""The data path of a render of the dashboard page, without streamlit
+
+Process wide caches start empty every round, so this is what a render costs for
+the first session after a restart, with the run store and artifact cache on disk
+already filled, and what syncing an empty run store costs.
+"""
+from benchmarks.conftest import ACCOUNT_ID, PROJECT_MAPPING
+from src.dbt_dashboard import (
+    chosen_runs,
+    combine_runs_and_jobs,
+    fetch_runs_and_jobs,
+    frame_page,
+    highlight,
+    load_run_details,
+    sync_jobs,
+    sync_runs,
+)
+from src.run_store import RunStore
+from src.run_trends import job_trends, rolling_run_stats, run_history
+from src.shared.cache import SharedCache
+from src.shared.memo import Memo
+
+PROJECT_IDS = [int(project_id) for project_id in PROJECT_MAPPING]
+PAGE_SIZE = 50
+
+
+def render(dbt, store, event_loop):
+    """the data path of render_dashboard, for the first run of the list"""
+    runs_and_jobs = event_loop.run(fetch_runs_and_jobs(dbt, store))
+    all_runs, all_jobs = combine_runs_and_jobs({dbt.account_id: runs_and_jobs})
+    chosen_df, run_options, selection = chosen_runs(
+        all_runs, all_jobs, PROJECT_MAPPING, PROJECT_IDS, "all", Memo()
+    )
+    highlight(frame_page(chosen_df, 1, PAGE_SIZE))
+
+    run_row = chosen_df.loc[selection[run_options[0]]]
+    details = load_run_details(event_loop, dbt, run_row, None, True, SharedCache())
+    return details.triage
+
+
+def test_render_data_path(benchmark, event_loop, async_client, synced_store):
+    # the first render downloads the artifacts of the chosen run to disk
+    render(async_client, synced_store, event_loop)
+    triage = benchmark.pedantic(
+        render, (async_client, synced_store, event_loop), rounds=5, iterations=1
+    )
+    assert len(triage.results)
+
+
+def test_sync_empty_store(benchmark, fake_api, event_loop, async_client, tmp_path):
+    runs = fake_api.accounts[ACCOUNT_ID].runs
+    paths = (str(tmp_path / f"runs_{i}.sqlite") for i in range(10))
+
+    def setup():
+        return (RunStore(next(paths), ACCOUNT_ID),), {}
+
+    def sync(store):
+        event_loop.run(sync_runs(async_client, store, max_runs=runs))
+        event_loop.run(sync_jobs(async_client, store))
+        return store
+
+    store = benchmark.pedantic(sync, setup=setup, rounds=3, iterations=1)
+    assert len(store) == runs
+
+
+def test_job_trends(benchmark, synced_store):
+    trends = benchmark.pedantic(
+        lambda: job_trends(rolling_run_stats(run_history(synced_store))),
+        rounds=5,
+        iterations=1,
+    )
+    assert len(trends)
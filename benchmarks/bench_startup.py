@@ -0,0 +1,134 @@
+"""Cold start cost of the app and the dashboard page
+
+Every round imports them in a fresh interpreter, as a container started from zero
+does, with placeholder secrets in a temporary home directory. The tests fail when
+the import takes longer than IMPORT_BUDGET_SECONDS, when the app pulls in what
+only the page needs before login, see PAGE_ONLY_MODULES, or when the page pulls
+in a module only some code paths need, see LAZY_MODULES. Modules streamlit loads
+itself are not held against either. To find what got slower:
+
+    python -X importtime -c "import streamlit_app" 2>&1 | sort -t'|' -k2 -n
+"""
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# the budget covers importing streamlit itself
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", 2.0))
+APP_IMPORTS = ["streamlit_app"]
+# the page is imported by streamlit_app once logged in
+DASHBOARD_IMPORTS = [*APP_IMPORTS, "src.pages.dbt_dashboard"]
+# everything the page imports from src, timed one by one
+PAGE_IMPORTS = [
+    "src.artifact_cache",
+    "src.async_classes",
+    "src.dbt_dashboard",
+    "src.lineage",
+    "src.manifest",
+    "src.node_performance",
+    "src.poller",
+    "src.run_store",
+    "src.run_trends",
+    "src.shared.cache",
+    "src.shared.memo",
+    "src.shared.metrics",
+    "src.triage",
+]
+# only imported by the code paths which use them
+LAZY_MODULES = ["requests", "PIL"]
+# the title and login render before these are loaded
+PAGE_ONLY_MODULES = ["pandas", "numpy", "aiohttp"]
+SECRETS = """
+DASHBOARD_USER = "benchmark"
+DASHBOARD_PASS = "benchmark"
+PROJECT_MAPPING = { 1 = "analytics" }
+PROJECT_REPO_URL_MAPPING = { postgres = "https://example.com/repo" }
+"""
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+for module in sys.argv[1:]:
+    __import__(module)
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "modules": list(sys.modules)}))
+"""
+# streamlit imports some modules only once an element needing them renders, the
+# app renders its logo with st.image before login
+STREAMLIT_ELEMENTS = """
+import json, sys
+import streamlit as st
+st.image("./images/logo.png")
+print(json.dumps({"modules": list(sys.modules)}))
+"""
+
+
+@pytest.fixture(scope="module")
+def secrets_home(tmp_path_factory) -> str:
+    """home directory whose .streamlit/secrets.toml streamlit reads st.secrets from"""
+    home = tmp_path_factory.mktemp("home")
+    (home / ".streamlit").mkdir()
+    (home / ".streamlit" / "secrets.toml").write_text(SECRETS)
+    return str(home)
+
+
+def import_in_fresh_interpreter(modules, home=None, script=MEASURE):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, HOME=home) if home else None
+    output = subprocess.run(
+        [sys.executable, "-c", script, *modules],
+        cwd=root,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    # streamlit may print warnings before the measure when run outside of a server
+    return json.loads(output.splitlines()[-1])
+
+
+@pytest.fixture(scope="module")
+def streamlit_modules() -> set:
+    """modules streamlit loads itself, whichever version is installed"""
+    return set(import_in_fresh_interpreter([], script=STREAMLIT_ELEMENTS)["modules"])
+
+
+def measure_imports(benchmark, modules, home):
+    measures = []
+
+    def measure():
+        measures.append(import_in_fresh_interpreter(modules, home))
+
+    benchmark.pedantic(measure, rounds=5, iterations=1)
+    assert min(measure["seconds"] for measure in measures) <= IMPORT_BUDGET_SECONDS
+    return set(measures[0]["modules"])
+
+
+def test_app_import_budget(benchmark, secrets_home, streamlit_modules):
+    loaded = measure_imports(benchmark, APP_IMPORTS, secrets_home)
+    loaded -= streamlit_modules
+    assert [module for module in PAGE_ONLY_MODULES if module in loaded] == []
+
+
+def test_page_import_budget(benchmark, secrets_home, streamlit_modules):
+    loaded = measure_imports(benchmark, DASHBOARD_IMPORTS, secrets_home)
+    loaded -= streamlit_modules
+    assert [module for module in LAZY_MODULES if module in loaded] == []
+
+
+@pytest.mark.parametrize("module", PAGE_IMPORTS)
+def test_module_import(benchmark, module):
+    benchmark.pedantic(import_in_fresh_interpreter, ([module],), rounds=3, iterations=1)
+
+
+def test_client_import_skips_dataframes(benchmark):
+    # the api clients and the export command line work without pandas and numpy
+    measure = benchmark.pedantic(
+        import_in_fresh_interpreter,
+        (["src.async_classes", "src.export"],),
+        rounds=3,
+        iterations=1,
+    )
+    assert {"pandas", "numpy"}.isdisjoint(measure["modules"])
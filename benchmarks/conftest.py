@@ -0,0 +1,89 @@
+"""Fixtures of the benchmark suite, every api call goes to a local fake dbt Cloud
+
+    pip install pytest-benchmark
+    python -m pytest benchmarks [--benchmark-autosave]
+
+BENCHMARK_RUN_COUNTS limits the scales, ie BENCHMARK_RUN_COUNTS=1000 for a quick
+run, BENCHMARK_API_LATENCY adds seconds to every api response. Compare saved runs
+with pytest-benchmark compare to catch regressions before deploying.
+"""
+import os
+
+import pytest
+
+from benchmarks.fake_dbt_cloud import FakeAccount, FakeDbtCloudServer
+from src.artifact_cache import ArtifactCache
+from src.async_classes import AsyncDbtCloud, EventLoopThread
+from src.classes import DbtCloud
+from src.dbt_dashboard import RUNS_PARAMS, sync_jobs, sync_runs
+from src.run_store import RunStore
+
+RUN_COUNTS = [
+    int(runs)
+    for runs in os.environ.get("BENCHMARK_RUN_COUNTS", "1000,10000,100000").split(",")
+]
+NODE_COUNTS = [
+    int(nodes)
+    for nodes in os.environ.get("BENCHMARK_NODE_COUNTS", "200,2000,20000").split(",")
+]
+API_LATENCY = float(os.environ.get("BENCHMARK_API_LATENCY", 0))
+ACCOUNT_ID = 1
+JOBS = 200
+NODES = 2_000
+PROJECT_MAPPING = {"1": "analytics", "2": "finance", "3": "marketing"}
+# enough workers to keep the fake api busy, as many as the dashboard allows
+MAX_WORKERS = 16
+
+os.environ.setdefault("API_TOKEN", "benchmark")
+
+
+@pytest.fixture(scope="session", params=RUN_COUNTS, ids=lambda runs: f"{runs}runs")
+def fake_api(request) -> FakeDbtCloudServer:
+    account = FakeAccount(ACCOUNT_ID, runs=request.param, jobs=JOBS, nodes=NODES)
+    with FakeDbtCloudServer(account, latency=API_LATENCY) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def event_loop() -> EventLoopThread:
+    loop = EventLoopThread()
+    yield loop
+    loop.stop()
+
+
+@pytest.fixture(scope="session")
+def all_runs(fake_api: FakeDbtCloudServer) -> dict:
+    """every run of the fake account in one response"""
+    dbt = DbtCloud(ACCOUNT_ID, max_workers=MAX_WORKERS, api_base=fake_api.api_base)
+    return dbt.list_runs(params={**RUNS_PARAMS, "limit": 100}).collect()
+
+
+@pytest.fixture(scope="session")
+def all_jobs(fake_api: FakeDbtCloudServer) -> dict:
+    dbt = DbtCloud(ACCOUNT_ID, max_workers=MAX_WORKERS, api_base=fake_api.api_base)
+    return dbt.list_jobs(params={"limit": 100}).collect()
+
+
+@pytest.fixture()
+def async_client(fake_api: FakeDbtCloudServer, event_loop: EventLoopThread, tmp_path):
+    dbt = AsyncDbtCloud(
+        ACCOUNT_ID,
+        max_workers=MAX_WORKERS,
+        api_base=fake_api.api_base,
+        artifact_cache=ArtifactCache(str(tmp_path / "artifacts")),
+    )
+    yield dbt
+    event_loop.run(dbt.close())
+
+
+@pytest.fixture()
+def synced_store(
+    fake_api: FakeDbtCloudServer, event_loop: EventLoopThread, async_client, tmp_path
+) -> RunStore:
+    """run store holding every run and job of the fake account"""
+    store = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    runs = fake_api.accounts[ACCOUNT_ID].runs
+    event_loop.run(sync_runs(async_client, store, max_runs=runs))
+    event_loop.run(sync_jobs(async_client, store))
+    yield store
+    store.close()
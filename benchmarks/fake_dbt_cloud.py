@@ -0,0 +1,405 @@
+"""Local stand-in for the dbt Cloud api v2, serving synthetic jobs, runs and artifacts
+
+Runs and run results are generated from their id on request, so a server for
+100k runs starts instantly and holds nothing but the manifest. Every response
+waits latency seconds first, to simulate the round trip to cloud.getdbt.com.
+
+    python -m benchmarks.fake_dbt_cloud [--runs 10000] [--jobs 200] [--latency 0.05]
+
+then point the dashboard at it:
+
+    DBT_CLOUD_API_BASE=http://127.0.0.1:8765/api/v2 API_TOKEN=fake ACCOUNT_ID=1 \
+        streamlit run streamlit_app.py
+"""
+import argparse
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import random
+import re
+import sys
+import threading
+import time
+from typing import FrozenSet, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.artifact_storage import synthetic_manifest
+
+API_PREFIX = "/api/v2"
+# the api never returns more items per page than this, whatever the limit asks for
+MAX_PAGE_SIZE = 100
+START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+# seconds between two runs finishing, run ids increase with finished_at
+RUN_INTERVAL = 60
+HREF_BASE = "https://cloud.getdbt.com/#"
+ROUTES = [
+    ("jobs", re.compile(r"/accounts/(\d+)/jobs/?")),
+    ("job", re.compile(r"/accounts/(\d+)/jobs/(\d+)/?")),
+    ("runs", re.compile(r"/accounts/(\d+)/runs/?")),
+    ("run", re.compile(r"/accounts/(\d+)/runs/(\d+)/?")),
+    ("artifact", re.compile(r"/accounts/(\d+)/runs/(\d+)/artifacts/([\w.]+)")),
+]
+
+
+def _timestamp(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d %H:%M:%S.%f+00:00")
+
+
+def _duration(seconds: int) -> str:
+    return f"{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}"
+
+
+def _status(code: int = 200, message: str = "Success!") -> dict:
+    return {
+        "code": code,
+        "is_success": code < 400,
+        "user_message": message,
+        "developer_message": "",
+    }
+
+
+@dataclass
+class FakeAccount:
+    """
+    Synthetic content of one dbt Cloud account. Run ids go from 1 to runs, the
+    latest finished run has the highest id. Jobs take turns, so every job has
+    runs / jobs runs, and every run of a job shares the one manifest of the account.
+    Runs in without_artifacts have none, as runs failing before compilation
+    """
+
+    account_id: int = 1
+    runs: int = 1_000
+    jobs: int = 100
+    projects: int = 3
+    nodes: int = 500
+    failure_rate: float = 0.1
+    seed: int = 0
+    without_artifacts: FrozenSet[int] = frozenset()
+    _manifest: Optional[bytes] = field(default=None, repr=False, compare=False)
+
+    def _rng(self, run_id: int) -> random.Random:
+        return random.Random(self.seed * 1_000_003 + run_id)
+
+    def job_id(self, run_id: int) -> int:
+        return (run_id - 1) % self.jobs + 1
+
+    def project_id(self, job_id: int) -> int:
+        return (job_id - 1) % self.projects + 1
+
+    def is_success(self, run_id: int) -> bool:
+        return self._rng(run_id).random() >= self.failure_rate
+
+    def job(self, job_id: int) -> dict:
+        created = START - timedelta(days=job_id)
+        return {
+            "id": job_id,
+            "account_id": self.account_id,
+            "project_id": self.project_id(job_id),
+            "environment_id": self.project_id(job_id),
+            "name": f"job_{job_id}",
+            "dbt_version": None,
+            "state": 1,
+            "generate_docs": False,
+            "execute_steps": ["dbt build"],
+            "triggers": {"github_webhook": False, "schedule": True},
+            "settings": {"threads": 4, "target_name": "default"},
+            "schedule": {"cron": "0 * * * *"},
+            "created_at": _timestamp(created),
+            "updated_at": _timestamp(created),
+            "next_run": _timestamp(START + timedelta(hours=1)),
+        }
+
+    def run(self, run_id: int) -> dict:
+        duration = self._rng(run_id).randrange(30, 3600)
+        finished = START + timedelta(seconds=run_id * RUN_INTERVAL)
+        started = finished - timedelta(seconds=duration)
+        created = started - timedelta(seconds=5)
+        success = self.is_success(run_id)
+        job_id = self.job_id(run_id)
+        return {
+            "id": run_id,
+            "trigger_id": run_id,
+            "account_id": self.account_id,
+            "environment_id": self.project_id(job_id),
+            "project_id": self.project_id(job_id),
+            "job_definition_id": job_id,
+            "job_id": job_id,
+            "status": 10 if success else 20,
+            "status_humanized": "Success" if success else "Error",
+            "status_message": None if success else "Database Error",
+            "git_branch": "main",
+            "git_sha": f"{run_id:040x}",
+            "is_complete": True,
+            "is_success": success,
+            "is_error": not success,
+            "is_cancelled": False,
+            "in_progress": False,
+            "has_docs_generated": False,
+            "has_sources_generated": False,
+            "created_at": _timestamp(created),
+            "updated_at": _timestamp(finished),
+            "dequeued_at": _timestamp(started),
+            "started_at": _timestamp(started),
+            "finished_at": _timestamp(finished),
+            "duration": _duration(duration + 5),
+            "queued_duration": _duration(5),
+            "run_duration": _duration(duration),
+            "duration_humanized": f"{duration // 60} minutes",
+            "href": f"{HREF_BASE}/accounts/{self.account_id}/runs/{run_id}/",
+        }
+
+    def run_ids(self, offset: int, limit: int):
+        """run ids of a page ordered by -finished_at"""
+        return range(self.runs - offset, max(self.runs - offset - limit, 0), -1)
+
+    def manifest(self) -> bytes:
+        if self._manifest is None:
+            manifest = synthetic_manifest(self.nodes, self.seed)
+            manifest["metadata"][
+                "dbt_schema_version"
+            ] = "https://schemas.getdbt.com/dbt/manifest/v4.json"
+            manifest["sources"] = {}
+            manifest["exposures"] = {}
+            self._manifest = json.dumps(manifest).encode()
+        return self._manifest
+
+    def run_results(self, run_id: int) -> dict:
+        """run results of every node of the manifest, failed runs have failed nodes"""
+        rng = self._rng(run_id)
+        failed = not self.is_success(run_id)
+        results = []
+        for i in range(self.nodes):
+            resource_type = "test" if i % 3 else "model"
+            status = "pass" if resource_type == "test" else "success"
+            if failed and rng.random() < 0.05:
+                status = "fail" if resource_type == "test" else "error"
+            execution_time = round(rng.lognormvariate(0, 1), 3)
+            results.append(
+                {
+                    "unique_id": f"{resource_type}.project.node_{i}",
+                    "status": status,
+                    "message": None if status in ("pass", "success") else "failed",
+                    "thread_id": f"Thread-{i % 4 + 1}",
+                    "execution_time": execution_time,
+                    "timing": [],
+                    "adapter_response": {},
+                    "failures": 1 if status == "fail" else 0,
+                }
+            )
+        return {
+            "metadata": {
+                "dbt_schema_version": (
+                    "https://schemas.getdbt.com/dbt/run-results/v4.json"
+                )
+            },
+            "results": results,
+            "elapsed_time": sum(result["execution_time"] for result in results),
+            "args": {"which": "build"},
+        }
+
+
+def paged(items: list, total: int, offset: int, limit: int, order_by: str) -> dict:
+    return {
+        "status": _status(),
+        "data": items,
+        "extra": {
+            "filters": {"limit": limit, "offset": offset},
+            "order_by": order_by,
+            "pagination": {"count": len(items), "total_count": total},
+        },
+    }
+
+
+class FakeDbtCloudHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "FakeDbtCloudServer"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        self.server.count_request()
+        time.sleep(self.server.latency)
+        failure = self.server.next_failure()
+        if failure is not None:
+            return self._send_failure(failure)
+        if not self.headers.get("Authorization", "").startswith("Token "):
+            return self._send_json(401, {"status": _status(401, "Unauthorized")})
+        url = urlparse(self.path)
+        if not url.path.startswith(API_PREFIX):
+            return self._not_found()
+        path = url.path[len(API_PREFIX) :]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        for name, pattern in ROUTES:
+            match = pattern.fullmatch(path)
+            if match:
+                return getattr(self, f"_{name}")(query, *match.groups())
+        return self._not_found()
+
+    def _account(self, account_id: str) -> Optional[FakeAccount]:
+        return self.server.accounts.get(int(account_id))
+
+    def _page(self, query: dict) -> Tuple[int, int]:
+        offset = int(query.get("offset") or 0)
+        limit = min(int(query.get("limit") or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        return offset, limit
+
+    def _jobs(self, query: dict, account_id: str):
+        account = self._account(account_id)
+        if account is None:
+            return self._not_found()
+        offset, limit = self._page(query)
+        job_ids = range(offset + 1, min(offset + limit, account.jobs) + 1)
+        jobs = [account.job(job_id) for job_id in job_ids]
+        order_by = query.get("order_by", "id")
+        self._send_json(200, paged(jobs, account.jobs, offset, limit, order_by))
+
+    def _job(self, query: dict, account_id: str, job_id: str):
+        account = self._account(account_id)
+        if account is None or not 0 < int(job_id) <= account.jobs:
+            return self._not_found()
+        self._send_json(200, {"status": _status(), "data": account.job(int(job_id))})
+
+    def _runs(self, query: dict, account_id: str):
+        account = self._account(account_id)
+        if account is None:
+            return self._not_found()
+        offset, limit = self._page(query)
+        runs = [account.run(run_id) for run_id in account.run_ids(offset, limit)]
+        order_by = query.get("order_by", "-finished_at")
+        self._send_json(200, paged(runs, account.runs, offset, limit, order_by))
+
+    def _run(self, query: dict, account_id: str, run_id: str):
+        account = self._account(account_id)
+        if account is None or not 0 < int(run_id) <= account.runs:
+            return self._not_found()
+        self._send_json(200, {"status": _status(), "data": account.run(int(run_id))})
+
+    def _artifact(self, query: dict, account_id: str, run_id: str, name: str):
+        account = self._account(account_id)
+        if (
+            account is None
+            or not 0 < int(run_id) <= account.runs
+            or int(run_id) in account.without_artifacts
+        ):
+            return self._not_found()
+        if name == "manifest.json":
+            return self._send(200, account.manifest())
+        if name == "run_results.json":
+            return self._send_json(200, account.run_results(int(run_id)))
+        if name == "catalog.json":
+            return self._send_json(200, {"metadata": {}, "nodes": {}, "sources": {}})
+        return self._not_found()
+
+    def _send_failure(self, code: int):
+        body = json.dumps({"status": _status(code, "Failure")}).encode()
+        self.send_response(code)
+        if code == 429:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self._send_json(404, {"status": _status(404, "Not found")})
+
+    def _send_json(self, code: int, body: dict):
+        self._send(code, json.dumps(body).encode())
+
+    def _send(self, code: int, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeDbtCloudServer(ThreadingHTTPServer):
+    """
+    Threaded http server answering like the dbt Cloud api for the given accounts,
+    on a free local port unless one is given. Used as a context manager it serves
+    from a daemon thread for the duration of the block
+
+    fail_next queues error statuses answered to the next requests, whatever they
+    ask for, to exercise the retries of the clients
+    """
+
+    daemon_threads = True
+
+    def __init__(self, *accounts: FakeAccount, latency: float = 0.0, port: int = 0):
+        super().__init__(("127.0.0.1", port), FakeDbtCloudHandler)
+        self.accounts = {account.account_id: account for account in accounts}
+        self.latency = latency
+        self.requests = 0
+        self._requests_lock = threading.Lock()
+        self._failures: deque = deque()
+        self._thread: Optional[threading.Thread] = None
+
+    def handle_error(self, request, client_address):
+        # clients closing idle kept alive connections are no errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    def count_request(self):
+        with self._requests_lock:
+            self.requests += 1
+
+    def fail_next(self, *statuses: Optional[int]):
+        """answer the next requests with these statuses, None answers one as usual"""
+        with self._requests_lock:
+            self._failures.extend(statuses)
+
+    def next_failure(self) -> Optional[int]:
+        with self._requests_lock:
+            return self._failures.popleft() if self._failures else None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def __enter__(self) -> "FakeDbtCloudServer":
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="fake-dbt-cloud", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self._thread.join()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--account-id", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=10_000)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--projects", type=int, default=3)
+    parser.add_argument("--nodes", type=int, default=2_000)
+    parser.add_argument("--failure-rate", type=float, default=0.1)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    account = FakeAccount(
+        args.account_id,
+        runs=args.runs,
+        jobs=args.jobs,
+        projects=args.projects,
+        nodes=args.nodes,
+        failure_rate=args.failure_rate,
+    )
+    server = FakeDbtCloudServer(account, latency=args.latency, port=args.port)
+    sys.stdout.write(f"serving {account} on {server.api_base}\n")
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
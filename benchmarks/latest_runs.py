@@ -0,0 +1,107 @@
+"""Compare the dataframe based run helpers against the original per row loops
+
+The dataframe is built once per refresh, after that every latest run or history
+lookup reuses it, so build cost and per lookup cost are reported separately.
+
+    python -m benchmarks.latest_runs [number of runs ...]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from src.dbt_dashboard import (
+    historical_runs,
+    only_latest_runs,
+    runs_to_frame,
+)
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+HISTORY_LOOKUPS = 20
+
+
+def synthetic_runs(count: int, jobs: int = 500, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+    data = []
+    for run_id in range(count):
+        started = start + timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        finished = started + timedelta(seconds=rng.randrange(30, 3600))
+        data.append(
+            {
+                "id": run_id,
+                "job_id": rng.randrange(jobs),
+                "project_id": rng.randrange(3),
+                "status_humanized": "Success",
+                "started_at": started.isoformat(sep=" "),
+                "finished_at": finished.isoformat(sep=" "),
+                "run_duration": "00:01:00",
+                "is_complete": True,
+                "is_success": rng.random() > 0.1,
+                "is_error": False,
+            }
+        )
+    return {"data": data}
+
+
+def loop_latest_runs(all_runs: dict) -> pd.DataFrame:
+    runs = {}
+    for run in all_runs["data"]:
+        new_time = run["started_at"]
+        existing_time = runs.get(run["job_id"], {}).get("started_at")
+        if existing_time:
+            if new_time and new_time > existing_time:
+                runs[run["job_id"]] = run
+            else:
+                continue
+        else:
+            runs[run["job_id"]] = run
+    return pd.DataFrame.from_dict(runs, orient="index")
+
+
+def loop_historical_runs(all_runs: dict, job_id: int) -> pd.DataFrame:
+    history = {}
+    for run in all_runs["data"]:
+        if run["job_id"] == job_id:
+            history[run["id"]] = run
+    return pd.DataFrame.from_dict(history, orient="index")
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def history_lookups(lookup):
+    for job_id in range(HISTORY_LOOKUPS):
+        lookup(job_id)
+
+
+def main(sizes):
+    sys.stdout.write(
+        f"{'runs':>10} {'build frame':>12} {'latest loop':>12} {'latest frame':>13}"
+        f" {'history loop':>13} {'history frame':>14}   (seconds, history per lookup)\n"
+    )
+    for size in sizes:
+        all_runs = synthetic_runs(size)
+        build, runs = timed(runs_to_frame, all_runs)
+        latest_loop, _ = timed(loop_latest_runs, all_runs)
+        latest_frame, _ = timed(only_latest_runs, runs)
+        history_loop, _ = timed(
+            history_lookups, lambda job_id: loop_historical_runs(all_runs, job_id)
+        )
+        history_frame, _ = timed(
+            history_lookups, lambda job_id: historical_runs(runs, job_id)
+        )
+        sys.stdout.write(
+            f"{size:>10} {build:>12.3f} {latest_loop:>12.3f}"
+            f" {latest_frame:>13.4f} {history_loop / HISTORY_LOOKUPS:>13.4f}"
+            f" {history_frame / HISTORY_LOOKUPS:>14.5f}\n"
+        )
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,2 @@
+"""Root of the test and benchmark suites, pytest puts this directory on sys.path
+so src and benchmarks import the same with `pytest` as with `python -m pytest`"""
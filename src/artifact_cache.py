@@ -0,0 +1,277 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import BinaryIO, Optional
+
+from src.shared.metrics import METRICS
+
+GZIP_MAGIC = b"\x1f\x8b"
+# eviction frees space down to this share of max_bytes, so it does not run again
+# with the next write
+EVICT_TO = 0.9
+
+
+def open_artifact(path: str) -> BinaryIO:
+    """open a cached artifact for reading, decompressing it when it was stored
+    compressed. A JSON document never starts with the gzip magic bytes, so entries
+    written before compression was enabled are read as they are
+
+    Args:
+        path (str): path of the cached artifact
+
+    Returns:
+        BinaryIO: file object yielding the raw artifact
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(GZIP_MAGIC))
+    return gzip.open(path, "rb") if magic == GZIP_MAGIC else open(path, "rb")
+
+
+@dataclass
+class ArtifactCache:
+    """
+    Size bounded on-disk cache for run artifacts. Artifacts of a finished run never
+    change, so entries are keyed by (account_id, run_id, artifact name) and never
+    expire, the least recently used entries are evicted once the directory grows
+    past max_bytes. Writes go to a temporary file which is then renamed into place,
+    so readers never see a partially written artifact. The size of the cache is
+    scanned once and then kept up to date by every write, the directory is only
+    scanned again to evict.
+
+    Artifacts are very repetitive JSON, they are stored gzip compressed unless
+    compresslevel is None, use open_artifact to read a path returned by the cache
+    """
+
+    directory: str
+    max_bytes: int = 2 * 1024 ** 3
+    compresslevel: Optional[int] = 6
+
+    def __post_init__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size: Optional[int] = None
+
+    @staticmethod
+    def key(account_id: int, run_id: int, name: str) -> str:
+        return hashlib.sha256(f"{account_id}/{run_id}/{name}".encode()).hexdigest()
+
+    def path(self, account_id: int, run_id: int, name: str) -> str:
+        key = self.key(account_id, run_id, name)
+        return os.path.join(self.directory, key[:2], key)
+
+    def get_bytes(self, account_id: int, run_id: int, name: str) -> Optional[bytes]:
+        """return the raw artifact or None when it is not cached
+
+        Args:
+            account_id (int): dbt cloud account id
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+
+        Returns:
+            Optional[bytes]: artifact content
+        """
+        path = self.path(account_id, run_id, name)
+        try:
+            with open_artifact(path) as f:
+                data = f.read()
+        except FileNotFoundError:
+            METRICS.inc("artifact_cache_lookups_total", result="miss")
+            return None
+        METRICS.inc("artifact_cache_lookups_total", result="hit")
+        self._touch(path)
+        return data
+
+    def get_path(self, account_id: int, run_id: int, name: str) -> Optional[str]:
+        """return the path of the cached artifact or None when it is not cached"""
+        path = self.path(account_id, run_id, name)
+        if not os.path.exists(path):
+            METRICS.inc("artifact_cache_lookups_total", result="miss")
+            return None
+        METRICS.inc("artifact_cache_lookups_total", result="hit")
+        self._touch(path)
+        return path
+
+    def get(self, account_id: int, run_id: int, name: str) -> Optional[dict]:
+        data = self.get_bytes(account_id, run_id, name)
+        return None if data is None else json.loads(data)
+
+    def put_bytes(self, account_id: int, run_id: int, name: str, data: bytes) -> str:
+        """atomically store the raw artifact and evict old entries if needed
+
+        Args:
+            account_id (int): dbt cloud account id
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+            data (bytes): artifact content
+
+        Returns:
+            str: path of the cached artifact
+        """
+        with self.writer(account_id, run_id, name) as f:
+            f.write(data)
+        return self.path(account_id, run_id, name)
+
+    @contextmanager
+    def writer(self, account_id: int, run_id: int, name: str):
+        """file object to stream an artifact into, compressing it on the way, it only
+        replaces the cached artifact once the block exits without an error
+
+        Args:
+            account_id (int): dbt cloud account id
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+
+        Yields:
+            BinaryIO: temporary file to write the artifact to
+        """
+        with self.staging_path(account_id, run_id, name) as tmp_path:
+            with self.open_staged(tmp_path) as f:
+                yield f
+
+    @contextmanager
+    def staging_path(self, account_id: int, run_id: int, name: str):
+        """temporary path to build an artifact at, ie with sqlite, it only replaces
+        the cached artifact once the block exits without an error
+
+        Args:
+            account_id (int): dbt cloud account id
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+
+        Yields:
+            str: temporary path next to the cached artifact
+        """
+        tmp_path = self.stage(account_id, run_id, name)
+        try:
+            yield tmp_path
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        self.commit(account_id, run_id, name, tmp_path)
+
+    def stage(self, account_id: int, run_id: int, name: str) -> str:
+        """create a temporary file next to the cached artifact, for callers which
+        cannot write it inside staging_path, ie from an event loop. The file has
+        to be passed to either commit or discard
+
+        Args:
+            account_id (int): dbt cloud account id
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+
+        Returns:
+            str: temporary path
+        """
+        directory = os.path.dirname(self.path(account_id, run_id, name))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.close(fd)
+        return tmp_path
+
+    def open_staged(self, tmp_path: str) -> BinaryIO:
+        """open a staged file for writing, compressing unless compresslevel is None"""
+        if self.compresslevel is None:
+            return open(tmp_path, "wb")
+        return gzip.open(tmp_path, "wb", compresslevel=self.compresslevel)
+
+    def commit(self, account_id: int, run_id: int, name: str, tmp_path: str) -> str:
+        """replace the cached artifact with a staged file and evict old entries if
+        the cache grew past max_bytes
+
+        Args:
+            account_id (int): dbt cloud account id
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+            tmp_path (str): path returned by stage, written and closed
+
+        Returns:
+            str: path of the cached artifact
+        """
+        path = self.path(account_id, run_id, name)
+        replaced = _file_size(path)
+        try:
+            os.replace(tmp_path, path)
+        except BaseException:
+            self.discard(tmp_path)
+            raise
+        self._grow(_file_size(path) - replaced, path)
+        return path
+
+    @staticmethod
+    def discard(tmp_path: str):
+        """remove a staged file which is not committed"""
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+
+    def put(self, account_id: int, run_id: int, name: str, artifact: dict) -> str:
+        return self.put_bytes(account_id, run_id, name, json.dumps(artifact).encode())
+
+    def _touch(self, path: str):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def _entries(self) -> list:
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _grow(self, delta: int, written: str):
+        with self._lock:
+            if self._size is None:
+                # the first scan already counts the written entry
+                self._size = self.size()
+            else:
+                self._size += delta
+            if self._size > self.max_bytes:
+                self._evict(keep=written)
+
+    def evict(self):
+        """remove least recently used entries until the cache fits in max_bytes"""
+        with self._lock:
+            self._evict()
+
+    def _evict(self, keep: Optional[str] = None):
+        # an entry just written is returned to the caller, it stays even when it
+        # alone is larger than max_bytes
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total > self.max_bytes:
+            for _, size, path in entries:
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self._size = total
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
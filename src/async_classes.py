@@ -0,0 +1,545 @@
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import aiohttp
+
+from src.artifact_cache import ArtifactCache
+from src.classes import (
+    API_BASE,
+    CHUNK_SIZE,
+    RETRY_STATUS_CODES,
+    api_token,
+    decode,
+    endpoint,
+)
+from src.export import ARTIFACT_FILES, ExportSummary, atomic_writer, export_path
+from src.manifest import (
+    MANIFEST_FILE,
+    ManifestIndex,
+    cached_manifest_index,
+    ensure_manifest_index,
+)
+from src.shared.metrics import METRICS
+
+
+class RateLimiter:
+    """
+    Token bucket for the requests of one account, rate requests per second on
+    average with bursts of up to burst requests. Callers over the limit reserve the
+    next free slot and sleep until then, so they are served in arrival order
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+class ConcurrencyLimiter:
+    """
+    Limit on the requests in flight shared by several clients, ie one per account.
+    The semaphore is created on first use so it belongs to the loop the clients
+    run on
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.limit)
+        return self._semaphore
+
+    async def __aenter__(self):
+        await self.semaphore.acquire()
+
+    async def __aexit__(self, *exc_info):
+        self.semaphore.release()
+
+
+class _NoLimit:
+    async def __aenter__(self):
+        pass
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+@dataclass
+class AsyncDbtCloud:
+    """
+    Asyncio variant of DbtCloud with the same surface, every call is awaitable so
+    independent requests can be issued together with asyncio.gather
+
+    The aiohttp session is created lazily and bound to the event loop it is first
+    used on, so a client should always be driven from the same loop, see EventLoopThread
+
+    Every request first waits for the rate_limiter of the client and for a slot of
+    the concurrency_limiter, which clients of several accounts can share
+    """
+
+    account_id: int
+    max_workers: int = 4
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    api_base: str = API_BASE
+    artifact_cache: Optional[ArtifactCache] = field(default=None, compare=False)
+    rate_limiter: Optional[RateLimiter] = field(default=None, compare=False)
+    concurrency_limiter: Optional[ConcurrencyLimiter] = field(
+        default=None, compare=False
+    )
+    api_token: str = field(repr=False, init=False)
+    headers: dict = field(repr=False, init=False)
+    _session: Optional[aiohttp.ClientSession] = field(
+        repr=False, init=False, compare=False, default=None
+    )
+
+    def __post_init__(self):
+        self.api_token = api_token(self.account_id)
+        self.headers = {"Authorization": f"Token {self.api_token}"}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=max(self.max_workers, 1))
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector, raise_for_status=False
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get(self, url_suffix: str, params: dict = None) -> dict:
+        return decode(await self._get_raw(url_suffix, params))
+
+    async def _get_raw(self, url_suffix: str, params: dict = None) -> bytes:
+        labels = {"client": "async", "endpoint": endpoint(url_suffix)}
+        with METRICS.timer("api_request_seconds", **labels):
+            async with self._response(url_suffix, params) as response:
+                data = await response.read()
+        METRICS.inc("api_response_bytes_total", len(data), **labels)
+        return data
+
+    @asynccontextmanager
+    async def _response(self, url_suffix: str, params: dict = None):
+        """the response to the request with its body still unread, the request holds
+        its slot of the concurrency_limiter until the block exits and the response
+        is released, so reading or streaming the body counts as in flight"""
+        async with self.concurrency_limiter or _NoLimit():
+            response = await self._open(url_suffix, params)
+            try:
+                yield response
+            finally:
+                response.release()
+
+    async def _open(
+        self, url_suffix: str, params: dict = None
+    ) -> aiohttp.ClientResponse:
+        """send the request, retrying with backoff, and return the response with its
+        body still unread, see _response"""
+        url = self.api_base + url_suffix
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self._send(url, params)
+            except aiohttp.ClientConnectionError:
+                METRICS.inc(
+                    "api_requests_total",
+                    client="async",
+                    endpoint=endpoint(url_suffix),
+                    status="connection_error",
+                )
+                if attempt >= self.max_retries:
+                    raise
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            METRICS.inc(
+                "api_requests_total",
+                client="async",
+                endpoint=endpoint(url_suffix),
+                status=response.status,
+            )
+            if response.status in RETRY_STATUS_CODES and attempt < self.max_retries:
+                response.release()
+                await asyncio.sleep(self._backoff(attempt, response))
+                continue
+            try:
+                response.raise_for_status()
+            except aiohttp.ClientResponseError:
+                response.release()
+                raise
+            return response
+
+    async def _stream(self, url_suffix: str, response: aiohttp.ClientResponse, f):
+        loop = asyncio.get_event_loop()
+        labels = {"client": "async", "endpoint": endpoint(url_suffix)}
+        size = 0
+        with METRICS.timer("api_request_seconds", **labels):
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                # writes may compress, which is cpu bound, keep them off the loop
+                await loop.run_in_executor(None, f.write, chunk)
+                size += len(chunk)
+        METRICS.inc("api_response_bytes_total", size, **labels)
+
+    async def _send(self, url: str, params: dict = None) -> aiohttp.ClientResponse:
+        if self.rate_limiter is not None:
+            await self.rate_limiter.acquire()
+        return await self.session.get(url, params=params)
+
+    def _backoff(self, attempt: int, response: aiohttp.ClientResponse = None) -> float:
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff_factor * (2 ** attempt)
+
+    async def list_jobs(self, params: dict = None):
+        url_suffix = f"/accounts/{self.account_id}/jobs/"
+        response = await self._get(url_suffix, params)
+        return AsyncDbtCloudResponse(self, url_suffix, params, response)
+
+    async def list_runs(self, params: dict = None):
+        url_suffix = f"/accounts/{self.account_id}/runs/"
+        response = await self._get(url_suffix, params)
+        return AsyncDbtCloudResponse(self, url_suffix, params, response)
+
+    async def get_run(self, run_id: int, params: dict = None):
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/"
+        return await self._get(url_suffix, params)
+
+    async def get_job(self, job_id: int, params: dict = None):
+        url_suffix = f"/accounts/{self.account_id}/jobs/{job_id}/"
+        return await self._get(url_suffix, params)
+
+    async def _get_artifact(
+        self, run_id: int, name: str, params: dict = None, cache: bool = True
+    ) -> dict:
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{name}"
+        if not cache or self.artifact_cache is None or params:
+            return await self._get(url_suffix, params)
+
+        # disk access is kept off the event loop, manifests can be tens of MB
+        loop = asyncio.get_event_loop()
+        data = await loop.run_in_executor(
+            None, self.artifact_cache.get_bytes, self.account_id, run_id, name
+        )
+        if data is None:
+            data = await self._get_raw(url_suffix)
+            await loop.run_in_executor(
+                None, self.artifact_cache.put_bytes, self.account_id, run_id, name, data
+            )
+        return decode(data)
+
+    async def get_artifact_path(self, run_id: int, name: str) -> str:
+        """stream the artifact into the artifact cache without parsing it
+
+        Args:
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+
+        Returns:
+            str: path of the cached artifact
+        """
+        if self.artifact_cache is None:
+            raise ValueError("An artifact_cache is required to store artifacts on disk")
+
+        cache = self.artifact_cache
+        key = (self.account_id, run_id, name)
+        # every disk access stays off the event loop, committing may evict entries
+        loop = asyncio.get_event_loop()
+        path = await loop.run_in_executor(None, cache.get_path, *key)
+        if path is not None:
+            return path
+
+        def open_staged():
+            tmp_path = cache.stage(*key)
+            return tmp_path, cache.open_staged(tmp_path)
+
+        def commit():
+            # closing flushes the end of the compressed stream
+            f.close()
+            return cache.commit(*key, tmp_path)
+
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{name}"
+        async with self._response(url_suffix) as response:
+            tmp_path, f = await loop.run_in_executor(None, open_staged)
+            try:
+                await self._stream(url_suffix, response, f)
+            except BaseException:
+                f.close()
+                cache.discard(tmp_path)
+                raise
+        return await loop.run_in_executor(None, commit)
+
+    async def get_run_manifest_path(self, run_id: int) -> str:
+        """path of the cached manifest.json of a finished run, see manifest.py
+        for reading only parts of it"""
+        return await self.get_artifact_path(run_id, MANIFEST_FILE)
+
+    async def get_run_manifest_index(self, run_id: int) -> ManifestIndex:
+        """compact index of the manifest of a finished run, built once when the
+        manifest is first downloaded and cached next to it. The manifest is only
+        downloaded when the index is not cached"""
+        loop = asyncio.get_event_loop()
+        index = await loop.run_in_executor(
+            None, cached_manifest_index, self.artifact_cache, self.account_id, run_id
+        )
+        if index is not None:
+            return index
+        manifest_path = await self.get_run_manifest_path(run_id)
+        return await loop.run_in_executor(
+            None,
+            ensure_manifest_index,
+            self.artifact_cache,
+            self.account_id,
+            run_id,
+            manifest_path,
+        )
+
+    async def get_run_artifacts(
+        self, run_id: int, params: dict = None, cache: bool = True
+    ):
+        """run_results.json of the run, set cache to False for runs still in progress"""
+        return await self._get_artifact(run_id, "run_results.json", params, cache)
+
+    async def get_run_manifest(
+        self, run_id: int, params: dict = None, cache: bool = True
+    ):
+        """manifest.json of the run, set cache to False for runs still in progress"""
+        return await self._get_artifact(run_id, "manifest.json", params, cache)
+
+    async def download_artifact(
+        self, run_id: int, name: str, path: str, compression: Optional[str] = None
+    ) -> bool:
+        """stream the raw artifact to path without parsing it, see
+        DbtCloud.download_artifact"""
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{name}"
+        try:
+            async with self._response(url_suffix) as response:
+                with atomic_writer(path, compression) as f:
+                    await self._stream(url_suffix, response, f)
+        except aiohttp.ClientResponseError as error:
+            if error.status == 404:
+                return False
+            raise
+        return True
+
+    async def download_run_artifacts(
+        self,
+        run_id: int,
+        directory: str = ".",
+        compression: Optional[str] = None,
+        skip_existing: bool = False,
+    ) -> ExportSummary:
+        """download run_results, catalog and manifest of a run into its directory
+        below directory, see export.export_path"""
+        return await self._export(
+            [
+                (run_id, name, export_path(directory, run_id, name, compression))
+                for name in ARTIFACT_FILES
+            ],
+            compression,
+            skip_existing,
+        )
+
+    async def export_run_artifacts(
+        self,
+        run_ids: Iterable[int],
+        directory: str,
+        names: Iterable[str] = ARTIFACT_FILES,
+        compression: Optional[str] = None,
+        skip_existing: bool = True,
+    ) -> ExportSummary:
+        """download the artifacts of many runs concurrently (bounded by max_workers),
+        see DbtCloud.export_run_artifacts"""
+        names = list(names)
+        return await self._export(
+            [
+                (run_id, name, export_path(directory, run_id, name, compression))
+                for run_id in run_ids
+                for name in names
+            ],
+            compression,
+            skip_existing,
+        )
+
+    async def _export(
+        self,
+        downloads: List[Tuple[int, str, str]],
+        compression: Optional[str],
+        skip_existing: bool,
+    ) -> ExportSummary:
+        summary = ExportSummary()
+        if skip_existing:
+            exists = [os.path.exists(path) for _, _, path in downloads]
+            summary.skipped = [d[2] for d, skip in zip(downloads, exists) if skip]
+            downloads = [d for d, skip in zip(downloads, exists) if not skip]
+
+        semaphore = asyncio.Semaphore(max(self.max_workers, 1))
+
+        async def download(run_id: int, name: str, path: str) -> bool:
+            async with semaphore:
+                return await self.download_artifact(run_id, name, path, compression)
+
+        found = await asyncio.gather(*(download(*d) for d in downloads))
+        for (run_id, name, path), exists in zip(downloads, found):
+            if exists:
+                summary.written.append(path)
+            else:
+                summary.missing.append((run_id, name))
+        return summary
+
+
+@dataclass
+class AsyncDbtCloudResponse:
+    """
+    Async iterator over the pages of an AsyncDbtCloud list response, yields itself
+    once per page like DbtCloudResponse. The remaining pages are requested
+    concurrently (bounded by client.max_workers) once the first page is known
+    """
+
+    client: AsyncDbtCloud
+    url_suffix: str
+    params: Optional[Dict] = None
+    response: Optional[Dict] = None
+
+    def __aiter__(self):
+        self._iteration = 0
+        self._pages = None
+        return self
+
+    async def __anext__(self):
+        self._iteration += 1
+        if self._iteration == 1:
+            return self
+
+        if self._pages is None:
+            pages = await self._fetch_remaining_pages(getattr(self, "_max_items", None))
+            self._pages = iter(pages)
+
+        try:
+            self.response = next(self._pages)
+        except StopIteration:
+            raise StopAsyncIteration
+        self.count += self.response.get("extra").get("pagination").get("count")
+        return self
+
+    def _remaining_offsets(self, max_items: int = None) -> list:
+        if self.response.get("status").get("is_success") is False:
+            raise RuntimeError("Error while requesting data.")
+
+        if self.response.get("extra") is None:
+            return []
+
+        pagination = self.response.get("extra").get("pagination")
+        filters = self.response.get("extra").get("filters")
+        self.total_count: int = pagination.get("total_count")
+        self.count: int = pagination.get("count")
+        self.offset: int = filters.get("offset") or 0
+
+        page_size = filters.get("limit") or self.count
+        if not page_size:
+            return []
+        end = self.total_count
+        if max_items is not None:
+            end = min(end, self.offset + max_items)
+        return list(range(self.offset + self.count, end, page_size))
+
+    async def _fetch_remaining_pages(self, max_items: int = None) -> list:
+        semaphore = asyncio.Semaphore(max(self.client.max_workers, 1))
+
+        async def fetch(offset):
+            params = {**(self.params or {}), "offset": offset}
+            METRICS.inc(
+                "api_pages_total", client="async", endpoint=endpoint(self.url_suffix)
+            )
+            async with semaphore:
+                return await self.client._get(url_suffix=self.url_suffix, params=params)
+
+        pages = await asyncio.gather(
+            *(fetch(offset) for offset in self._remaining_offsets(max_items))
+        )
+        for page in pages:
+            if page.get("status").get("is_success") is False:
+                raise RuntimeError("Error while requesting data.")
+        return pages
+
+    async def collect(self, max_items: int = None) -> dict:
+        """fetch every page and return a single response with all the data
+
+        Args:
+            max_items (int, optional): stop requesting pages after this many items
+
+        Returns:
+            dict: first page response with "data" extended by all following pages
+        """
+        data = []
+        first = None
+        self._max_items = max_items
+        async for page in self:
+            if first is None:
+                first = page.response
+            data.extend(page.response.get("data") or [])
+        self._max_items = None
+        if max_items is not None:
+            data = data[:max_items]
+        return {**first, "data": data}
+
+    def get(self, key, default=None):
+        return self.response.get(key, default)
+
+
+class EventLoopThread:
+    """
+    Event loop running forever in a daemon thread. Streamlit executes scripts in
+    their own threads, submitting coroutines here lets every session share one loop
+    and with it the aiohttp connection pool of the clients driven from it
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="dbt-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coroutine, timeout: float = None):
+        """run coroutine on the shared loop and block until it is done
+
+        Args:
+            coroutine: awaitable to schedule
+            timeout (float, optional): seconds to wait for the result
+
+        Returns:
+            result of the coroutine
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        return future.result(timeout)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
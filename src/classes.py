@@ -1,31 +1,127 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 import json
 import os
-from typing import Optional, Dict
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple
 
-import requests
+from src.artifact_cache import ArtifactCache
+from src.export import ARTIFACT_FILES, ExportSummary, atomic_writer, export_path
+from src.manifest import (
+    MANIFEST_FILE,
+    ManifestIndex,
+    cached_manifest_index,
+    ensure_manifest_index,
+)
+from src.shared.metrics import METRICS
+
+if TYPE_CHECKING:
+    import requests
+
+# overridable to point the clients at another host, ie a local stand-in server
+API_BASE = os.environ.get("DBT_CLOUD_API_BASE", "https://cloud.getdbt.com/api/v2")
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+CHUNK_SIZE = 1024 * 1024
+
+
+def endpoint(url_suffix: str) -> str:
+    """metrics label of an api path, ids are dropped to keep the label set small"""
+    parts = url_suffix.strip("/").split("/")[2:]
+    return "/".join(part for part in parts if not part.isdigit())
+
+
+def decode(data: bytes) -> dict:
+    with METRICS.timer("json_decode_seconds"):
+        return json.loads(data)
+
+
+def api_token(account_id: int) -> str:
+    """api token of the account, API_TOKEN_<account id> when accounts need different
+    tokens, otherwise API_TOKEN"""
+    return os.environ.get(f"API_TOKEN_{account_id}") or os.environ["API_TOKEN"]
 
 
 @dataclass
 class DbtCloud:
     """
     Interact with the DBT cloud api. List, create or update jobs for a given account
+
+    All requests go through a single pooled session which keeps connections alive
+    and retries with exponential backoff on rate limiting and server errors.
+    With an artifact_cache, artifacts of finished runs are only downloaded once.
     """
 
     account_id: int
+    max_workers: int = 4
+    max_retries: int = 3
+    backoff_factor: float = 0.5
+    api_base: str = API_BASE
+    artifact_cache: Optional[ArtifactCache] = field(default=None, compare=False)
     api_token: str = field(repr=False, init=False)
-    api_base: str = field(init=False, default="https://cloud.getdbt.com/api/v2")
     headers: dict = field(repr=False, init=False)
+    session: "requests.Session" = field(repr=False, init=False, compare=False)
 
     def __post_init__(self):
-        self.api_token = os.environ["API_TOKEN"]
+        self.api_token = api_token(self.account_id)
         self.headers = {"Authorization": f"Token {self.api_token}"}
+        self.session = self._create_session()
+
+    def _create_session(self) -> "requests.Session":
+        # requests is only imported by the sync client, the dashboard which only
+        # uses AsyncDbtCloud starts without it
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        retry = Retry(
+            total=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUS_CODES,
+            raise_on_status=False,
+        )
+        # the pool has to be at least as big as the number of page fetching workers
+        adapter = HTTPAdapter(
+            max_retries=retry, pool_connections=1, pool_maxsize=max(self.max_workers, 1)
+        )
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
 
     def _get(self, url_suffix: str, params: dict = None) -> dict:
+        return decode(self._get_raw(url_suffix, params))
+
+    def _get_raw(self, url_suffix: str, params: dict = None) -> bytes:
         url = self.api_base + url_suffix
-        response = requests.get(url, headers=self.headers, params=params)
+        labels = {"client": "sync", "endpoint": endpoint(url_suffix)}
+        with METRICS.timer("api_request_seconds", **labels):
+            response = self.session.get(url, params=params)
+        METRICS.inc("api_requests_total", status=response.status_code, **labels)
+        METRICS.inc("api_response_bytes_total", len(response.content), **labels)
         response.raise_for_status()
-        return response.json()
+        return response.content
+
+    def get_run(self, run_id: int, params: dict = None):
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/"
+        response = self._get(url_suffix, params)
+        return response
+
+    def get_job(self, job_id: int, params: dict = None):
+        url_suffix = f"/accounts/{self.account_id}/jobs/{job_id}/"
+        return self._get(url_suffix, params)
+
+    def _get_artifact(
+        self, run_id: int, name: str, params: dict = None, cache: bool = True
+    ) -> dict:
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{name}"
+        if not cache or self.artifact_cache is None or params:
+            return self._get(url_suffix, params)
+
+        data = self.artifact_cache.get_bytes(self.account_id, run_id, name)
+        if data is None:
+            data = self._get_raw(url_suffix)
+            self.artifact_cache.put_bytes(self.account_id, run_id, name, data)
+        return decode(data)
 
     def list_jobs(self, params: dict = None):
         url_suffix = f"/accounts/{self.account_id}/jobs/"
@@ -37,37 +133,173 @@ class DbtCloud:
         response = self._get(url_suffix, params)
         return DbtCloudResponse(self, url_suffix, params, response)
 
-    def get_run_artifacts(self, run_id: int, params: dict = None):
-        url_suffix = (
-            f"/accounts/{self.account_id}/runs/{run_id}/artifacts/run_results.json"
+    def get_artifact_path(self, run_id: int, name: str) -> str:
+        """stream the artifact into the artifact cache without parsing it
+
+        Args:
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+
+        Returns:
+            str: path of the cached artifact
+        """
+        if self.artifact_cache is None:
+            raise ValueError("An artifact_cache is required to store artifacts on disk")
+
+        path = self.artifact_cache.get_path(self.account_id, run_id, name)
+        if path is not None:
+            return path
+
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{name}"
+        with self.session.get(self.api_base + url_suffix, stream=True) as response:
+            response.raise_for_status()
+            with self.artifact_cache.writer(self.account_id, run_id, name) as f:
+                self._stream(url_suffix, response, f)
+        return self.artifact_cache.path(self.account_id, run_id, name)
+
+    def _stream(self, url_suffix: str, response: "requests.Response", f):
+        labels = {"client": "sync", "endpoint": endpoint(url_suffix)}
+        size = 0
+        with METRICS.timer("api_request_seconds", **labels):
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+                size += len(chunk)
+        METRICS.inc("api_requests_total", status=response.status_code, **labels)
+        METRICS.inc("api_response_bytes_total", size, **labels)
+
+    def get_run_manifest_path(self, run_id: int) -> str:
+        """path of the cached manifest.json of a finished run, see manifest.py
+        for reading only parts of it"""
+        return self.get_artifact_path(run_id, MANIFEST_FILE)
+
+    def get_run_manifest_index(self, run_id: int) -> ManifestIndex:
+        """compact index of the manifest of a finished run, built once when the
+        manifest is first downloaded and cached next to it. The manifest is only
+        downloaded when the index is not cached"""
+        index = cached_manifest_index(self.artifact_cache, self.account_id, run_id)
+        if index is not None:
+            return index
+        manifest_path = self.get_run_manifest_path(run_id)
+        return ensure_manifest_index(
+            self.artifact_cache, self.account_id, run_id, manifest_path
         )
-        response = self._get(url_suffix, params)
-        return response
 
-    def get_run_manifest(self, run_id: int, params: dict = None):
-        url_suffix = (
-            f"/accounts/{self.account_id}/runs/{run_id}/artifacts/manifest.json"
+    def get_run_artifacts(self, run_id: int, params: dict = None, cache: bool = True):
+        """run_results.json of the run, set cache to False for runs still in progress"""
+        return self._get_artifact(run_id, "run_results.json", params, cache)
+
+    def get_run_manifest(self, run_id: int, params: dict = None, cache: bool = True):
+        """manifest.json of the run, set cache to False for runs still in progress"""
+        return self._get_artifact(run_id, "manifest.json", params, cache)
+
+    def download_artifact(
+        self, run_id: int, name: str, path: str, compression: Optional[str] = None
+    ) -> bool:
+        """stream the raw artifact to path without parsing it, path is only created
+        once the whole artifact is written
+
+        Args:
+            run_id (int): run the artifact belongs to
+            name (str): artifact file name, ie manifest.json
+            path (str): file to write
+            compression (Optional[str]): one of export.COMPRESSIONS or None
+
+        Returns:
+            bool: False when the api has no such artifact for the run, other errors
+            raise
+        """
+        url_suffix = f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{name}"
+        with self.session.get(self.api_base + url_suffix, stream=True) as response:
+            if response.status_code == 404:
+                return False
+            response.raise_for_status()
+            with atomic_writer(path, compression) as f:
+                self._stream(url_suffix, response, f)
+        return True
+
+    def download_run_artifacts(
+        self,
+        run_id: int,
+        directory: str = ".",
+        compression: Optional[str] = None,
+        skip_existing: bool = False,
+    ) -> ExportSummary:
+        """download run_results, catalog and manifest of a run into its directory
+        below directory, see export.export_path"""
+        return self._export(
+            [
+                (run_id, name, export_path(directory, run_id, name, compression))
+                for name in ARTIFACT_FILES
+            ],
+            compression,
+            skip_existing,
         )
-        response = self._get(url_suffix, params)
-        return response
 
-    def download_run_artifacts(self, run_id: int):
-        for file in ("run_results.json", "catalog.json", "manifest.json"):
-            with open(file, "w") as f:
-                try:
-                    url_suffix = (
-                        f"/accounts/{self.account_id}/runs/{run_id}/artifacts/{file}"
-                    )
-                    response = self._get(url_suffix)
-                    f.write(json.dumps(response))
-                except requests.exceptions.HTTPError:
-                    pass
+    def export_run_artifacts(
+        self,
+        run_ids: Iterable[int],
+        directory: str,
+        names: Iterable[str] = ARTIFACT_FILES,
+        compression: Optional[str] = None,
+        skip_existing: bool = True,
+    ) -> ExportSummary:
+        """download the artifacts of many runs concurrently (bounded by max_workers)
+        into one directory per run, see export.export_path
+
+        Args:
+            run_ids (Iterable[int]): runs to export
+            directory (str): export root directory
+            names (Iterable[str]): artifact file names to export
+            compression (Optional[str]): one of export.COMPRESSIONS or None
+            skip_existing (bool): keep files which are already exported
+
+        Returns:
+            ExportSummary: written, skipped and missing artifacts
+        """
+        names = list(names)
+        return self._export(
+            [
+                (run_id, name, export_path(directory, run_id, name, compression))
+                for run_id in run_ids
+                for name in names
+            ],
+            compression,
+            skip_existing,
+        )
+
+    def _export(
+        self,
+        downloads: List[Tuple[int, str, str]],
+        compression: Optional[str],
+        skip_existing: bool,
+    ) -> ExportSummary:
+        summary = ExportSummary()
+        if skip_existing:
+            exists = [os.path.exists(path) for _, _, path in downloads]
+            summary.skipped = [d[2] for d, skip in zip(downloads, exists) if skip]
+            downloads = [d for d, skip in zip(downloads, exists) if not skip]
+
+        with ThreadPoolExecutor(max_workers=max(self.max_workers, 1)) as executor:
+            found = executor.map(
+                lambda d: self.download_artifact(*d, compression), downloads
+            )
+            for (run_id, name, path), exists in zip(downloads, found):
+                if exists:
+                    summary.written.append(path)
+                else:
+                    summary.missing.append((run_id, name))
+        return summary
 
 
 @dataclass
 class DbtCloudResponse:
     """
     Wrapper for the respons from DbtCloud class
+
+    Iterating over the response yields itself once per page. The first page is the
+    one already fetched, once its pagination block gives the total count all the
+    remaining offsets are requested concurrently (bounded by client.max_workers)
+    and handed out in order.
     """
 
     client: DbtCloud
@@ -77,6 +309,7 @@ class DbtCloudResponse:
 
     def __iter__(self):
         self._iteration = 0
+        self._pages = None
         return self
 
     def __next__(self):
@@ -84,28 +317,79 @@ class DbtCloudResponse:
         if self._iteration == 1:
             return self
 
+        if self._pages is None:
+            self._pages = self._fetch_remaining_pages(getattr(self, "_max_items", None))
+
+        try:
+            self.response = next(self._pages)
+        except StopIteration:
+            self._pages = iter(())
+            raise
+        self.count += self.response.get("extra").get("pagination").get("count")
+        return self
+
+    def _remaining_offsets(self, max_items: int = None) -> list:
         if self.response.get("status").get("is_success") is False:
             raise RuntimeError("Error while requesting data.")
 
         if self.response.get("extra") is None:
-            raise StopIteration
+            return []
 
-        self.total_count: int = (
-            self.response.get("extra").get("pagination").get("total_count")
-        )
-        self.count: int = self.response.get("extra").get("pagination").get("count")
-        self.offset: int = self.response.get("extra").get("filters").get("offset")
-
-        if self.total_count > self.offset:
-            self.offset += self.response.get("extra").get("pagination").get("count")
-            self.params = {"offset": self.offset}
-            self.response = self.client._get(
-                url_suffix=self.url_suffix, params=self.params
+        pagination = self.response.get("extra").get("pagination")
+        filters = self.response.get("extra").get("filters")
+        self.total_count: int = pagination.get("total_count")
+        self.count: int = pagination.get("count")
+        self.offset: int = filters.get("offset") or 0
+
+        page_size = filters.get("limit") or self.count
+        if not page_size:
+            return []
+        end = self.total_count
+        if max_items is not None:
+            end = min(end, self.offset + max_items)
+        return list(range(self.offset + self.count, end, page_size))
+
+    def _fetch_remaining_pages(self, max_items: int = None):
+        offsets = self._remaining_offsets(max_items)
+        if not offsets:
+            return iter(())
+
+        def fetch(offset):
+            params = {**(self.params or {}), "offset": offset}
+            METRICS.inc(
+                "api_pages_total", client="sync", endpoint=endpoint(self.url_suffix)
             )
-            self.count += self.response.get("extra").get("pagination").get("count")
-            return self
-        else:
-            raise StopIteration
+            return self.client._get(url_suffix=self.url_suffix, params=params)
+
+        workers = max(1, min(self.client.max_workers, len(offsets)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pages = list(executor.map(fetch, offsets))
+
+        for page in pages:
+            if page.get("status").get("is_success") is False:
+                raise RuntimeError("Error while requesting data.")
+        return iter(pages)
+
+    def collect(self, max_items: int = None) -> dict:
+        """fetch every page and return a single response with all the data
+
+        Args:
+            max_items (int, optional): stop requesting pages after this many items
+
+        Returns:
+            dict: first page response with "data" extended by all following pages
+        """
+        data = []
+        first = None
+        self._max_items = max_items
+        for page in self:
+            if first is None:
+                first = page.response
+            data.extend(page.response.get("data") or [])
+        self._max_items = None
+        if max_items is not None:
+            data = data[:max_items]
+        return {**first, "data": data}
 
     def get(self, key, default=None):
         return self.response.get(key, default)
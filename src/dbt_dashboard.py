@@ -1,29 +1,97 @@
+import asyncio
+from dataclasses import dataclass
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import aiohttp
+import numpy as np
 import pandas as pd
+from src.async_classes import AsyncDbtCloud, EventLoopThread
 from src.classes import DbtCloud
+from src.manifest import MANIFEST_INDEX_FILE, ManifestIndex
+from src.run_store import RunStore
+from src.shared.cache import SharedCache
+from src.shared.memo import Memo
+from src.shared.metrics import METRICS
+from src.triage import RunTriage, triage_run
+
+RUNS_PARAMS = {"order_by": "-finished_at", "limit": 500}
+JOBS_PARAMS = {"order_by": "-created_at", "limit": 200}
+RUN_TIMESTAMP_COLUMNS = pd.Index(
+    ["created_at", "updated_at", "dequeued_at", "started_at", "finished_at"]
+)
+RUN_FLAG_COLUMNS = pd.Index(
+    ["is_complete", "is_success", "is_error", "is_cancelled", "in_progress"]
+)
+REQUIRED_COLUMNS_RUNS = [
+    "id",
+    "project_name",
+    "project_id",
+    "status_humanized",
+    "finished_at",
+    "run_duration",
+    "is_success",
+    "is_complete",
+    "job_id",
+    "account_id",
+]
+REQUIRED_COLUMNS_JOBS = ["name", "next_run"]
+SUCCESS_STYLE = "background-color: #3e9456"
+FAILURE_STYLE = "background-color: #a62100"
+
+
+def _to_datetime(column: pd.Series) -> pd.Series:
+    try:
+        return pd.to_datetime(column, utc=True, format="ISO8601")
+    except (TypeError, ValueError):
+        # pandas < 2.0 has no ISO8601 format but parses mixed precision ISO strings
+        return pd.to_datetime(column, utc=True)
+
+
+def runs_to_frame(all_runs: dict) -> pd.DataFrame:
+    """turn the runs api response into a typed dataframe indexed by run id,
+    timestamps are parsed and status flags made boolean in one pass per column
+
+    Args:
+        all_runs (dict): all runs as response from DBT api class
+
+    Returns:
+        pd.DataFrame: dataframe with one row per run
+    """
+    df = pd.DataFrame.from_records(all_runs["data"])
+    if df.empty:
+        return df
 
+    for column in RUN_TIMESTAMP_COLUMNS.intersection(df.columns):
+        df[column] = _to_datetime(df[column])
+    for column in RUN_FLAG_COLUMNS.intersection(df.columns):
+        df[column] = df[column].fillna(False).astype(bool)
+    return df.set_index(df["id"].to_numpy()).rename_axis(None)
 
-def only_latest_runs(all_runs: dict) -> pd.DataFrame:
+
+def only_latest_runs(all_runs) -> pd.DataFrame:
     """from all runs return only latest finished per job
 
     Args:
-        all_runs (dict): all runs as response from DBT api class
+        all_runs (dict | pd.DataFrame): all runs as response from DBT api class,
+            or as returned by runs_to_frame
 
     Returns:
         pd.DataFrame: dataframe of latest runs for each job
     """
-    runs = {}
-    for run in all_runs["data"]:
-        new_time = run["started_at"]
-        existing_time = runs.get(run["job_id"], {}).get("started_at")
-        if existing_time:
-            if new_time and new_time > existing_time:
-                runs[run["job_id"]] = run
-            else:
-                continue
-        else:
-            runs[run["job_id"]] = run
+    runs = all_runs if isinstance(all_runs, pd.DataFrame) else runs_to_frame(all_runs)
+    if runs.empty:
+        return runs
 
-    return pd.DataFrame.from_dict(runs, orient="index")
+    # idxmax keeps the first of runs started at the same time, jobs without any
+    # started run keep their last run like the original loop did
+    started = runs["started_at"].notna()
+    latest_ids = runs.loc[started].groupby("job_id", sort=False)["started_at"].idxmax()
+    not_started = runs.loc[~runs["job_id"].isin(latest_ids.index)].drop_duplicates(
+        "job_id", keep="last"
+    )
+    latest = pd.concat([runs.loc[latest_ids.to_numpy()], not_started])
+    return latest.set_index(latest["job_id"].to_numpy()).rename_axis(None)
 
 
 def unique_jobs(all_jobs: dict) -> pd.DataFrame:
@@ -35,11 +103,140 @@ def unique_jobs(all_jobs: dict) -> pd.DataFrame:
     Returns:
         pd.DataFrame: dataframe of unique jobs
     """
-    jobs = {}
-    for job in all_jobs["data"]:
-        if not jobs.get(job["id"]):
-            jobs[job["id"]] = job
-    return pd.DataFrame.from_dict(jobs, orient="index")
+    jobs = pd.DataFrame.from_records(all_jobs["data"])
+    if jobs.empty:
+        return jobs
+    jobs = jobs.drop_duplicates("id", keep="first")
+    return jobs.set_index(jobs["id"].to_numpy()).rename_axis(None)
+
+
+def run_selection_index(runs: pd.DataFrame) -> Dict[Tuple[str, str], int]:
+    """map every (job name, project name) to the index label of its row, built once
+    so selecting a run is a dict lookup instead of a boolean mask over all rows
+
+    Args:
+        runs (pd.DataFrame): merged runs and jobs with a unique index
+
+    Returns:
+        Dict[Tuple[str, str], int]: selection key to index label, the first row wins
+        when a key repeats
+    """
+    keys = zip(runs["name"].iloc[::-1], runs["project_name"].iloc[::-1])
+    return dict(zip(keys, runs.index[::-1]))
+
+
+def join_runs_jobs(
+    all_runs: dict, all_jobs: dict, project_mapping: Dict[str, str]
+) -> pd.DataFrame:
+    """latest run of every job joined with the job, indexed by job id
+
+    Args:
+        all_runs (dict): runs as returned by fetch_runs_and_jobs
+        all_jobs (dict): jobs as returned by fetch_runs_and_jobs
+        project_mapping (Dict[str, str]): project name by project id
+
+    Returns:
+        pd.DataFrame: REQUIRED_COLUMNS_JOBS and REQUIRED_COLUMNS_RUNS of every job
+    """
+    df_latest_runs = only_latest_runs(all_runs)
+    df_unique_jobs = unique_jobs(all_jobs)
+    if df_latest_runs.empty or df_unique_jobs.empty:
+        return pd.DataFrame(columns=REQUIRED_COLUMNS_JOBS + REQUIRED_COLUMNS_RUNS)
+
+    df_latest_runs["project_name"] = (
+        df_latest_runs["project_id"].astype(str).map(project_mapping)
+    )
+
+    df_latest_runs = df_latest_runs[REQUIRED_COLUMNS_RUNS]
+    df_unique_jobs = df_unique_jobs[REQUIRED_COLUMNS_JOBS]
+
+    return df_unique_jobs.merge(df_latest_runs, left_index=True, right_index=True)
+
+
+def split_runs(merged_df: pd.DataFrame, filter_list: List[int]) -> tuple:
+    """finished runs of the filtered projects, split by success, and the
+    run_selection_index of all of them"""
+    merged_df = merged_df.loc[
+        (merged_df.is_complete == True)  # NOQA: E712
+        & (merged_df["project_id"].isin(filter_list))
+    ]
+    failed_runs_df = merged_df.loc[merged_df.is_success == False]  # NOQA: E712
+    successful_runs_df = merged_df.loc[merged_df.is_success == True]  # NOQA: E712
+
+    return (
+        failed_runs_df,
+        successful_runs_df,
+        merged_df,
+        run_selection_index(merged_df),
+    )
+
+
+def choose_runs(
+    merged_df: pd.DataFrame, filter_list: List[int], chosen: str
+) -> Tuple[pd.DataFrame, List[Tuple[str, str]], Dict[Tuple[str, str], int]]:
+    """the runs to show for the filters, latest finished first
+
+    Args:
+        merged_df (pd.DataFrame): runs and jobs as returned by join_runs_jobs
+        filter_list (List[int]): project ids to show
+        chosen (str): all, failed or successful
+
+    Returns:
+        Tuple[pd.DataFrame, List[Tuple[str, str]], Dict[Tuple[str, str], int]]:
+        chosen runs, their (job name, project name) in order and the
+        run_selection_index of all finished runs of the projects
+    """
+    failed_runs_df, successful_runs_df, all_runs_df, selection = split_runs(
+        merged_df, filter_list
+    )
+    chosen_mapping = {
+        "all": all_runs_df,
+        "successful": successful_runs_df,
+        "failed": failed_runs_df,
+    }
+    chosen_df = chosen_mapping[chosen].sort_values("finished_at", ascending=False)
+    options = list(zip(chosen_df["name"], chosen_df["project_name"]))
+    return chosen_df, options, selection
+
+
+def chosen_runs(
+    all_runs: dict,
+    all_jobs: dict,
+    project_mapping: Dict[str, str],
+    filter_list: List[int],
+    chosen: str,
+    memo: Memo,
+) -> Tuple[pd.DataFrame, List[Tuple[str, str]], Dict[Tuple[str, str], int]]:
+    """the runs to show for the filters, latest finished first, memoized by the
+    version of runs and jobs so reruns with unchanged data and filters skip all
+    dataframe work. The joined frame is memoized by version alone, so changing the
+    filters only filters again
+
+    Args:
+        all_runs (dict): runs as returned by combine_runs_and_jobs
+        all_jobs (dict): jobs as returned by combine_runs_and_jobs
+        project_mapping (Dict[str, str]): project names by project id
+        filter_list (List[int]): project ids to show
+        chosen (str): all, failed or successful
+        memo (Memo): memo shared by all sessions
+
+    Returns:
+        Tuple[pd.DataFrame, List[Tuple[str, str]], Dict[Tuple[str, str], int]]:
+        shared frame which must not be mutated, its (job name, project name) in
+        order and their run_selection_index
+    """
+    version = runs_and_jobs_version(all_runs, all_jobs)
+    filters = tuple(sorted(filter_list))
+
+    def merged():
+        with METRICS.timer("render_step_seconds", step="merge_runs_jobs"):
+            return join_runs_jobs(all_runs, all_jobs, project_mapping)
+
+    def view():
+        merged_df = memo.get(("merged", version), merged)
+        return choose_runs(merged_df, filter_list, chosen)
+
+    return memo.get(("chosen", version, filters, chosen), view)
 
 
 def get_all_runs(dbt: DbtCloud) -> dict:
@@ -51,58 +248,351 @@ def get_all_runs(dbt: DbtCloud) -> dict:
     Returns:
         dict: 500 latest runs
     """
-    all_runs = dbt.list_runs(params={"order_by": "-finished_at", "limit": 500}).response
+    all_runs = dbt.list_runs(params=RUNS_PARAMS).response
     return all_runs
 
 
-def get_all_jobs(dbt: DbtCloud) -> dict:
-    """returns 200 jobs
+async def fetch_runs_and_jobs(
+    dbt: AsyncDbtCloud, store: Optional[RunStore] = None
+) -> Tuple[dict, dict]:
+    """get latest runs and jobs with the calls in flight together
 
     Args:
-        dbt (DbtCloud): dbt class instance for calling api
+        dbt (AsyncDbtCloud): async dbt class instance for calling api
+        store (Optional[RunStore]): when given the store is synced incrementally
+            and the latest stored run of every job and all stored jobs are returned,
+            together with the store version they were read at, otherwise the last
+            500 runs and 200 jobs are fetched
 
     Returns:
-        dict: list of all created jobs
+        Tuple[dict, dict]: latest runs and jobs api responses
     """
-    all_jobs = dbt.list_jobs(params={"order_by": "-created_at", "limit": 200}).response
-    return all_jobs
+    if store is None:
+        runs, jobs = await asyncio.gather(
+            dbt.list_runs(params=RUNS_PARAMS), dbt.list_jobs(params=JOBS_PARAMS)
+        )
+        return runs.response, jobs.response
 
+    await asyncio.gather(sync_runs(dbt, store), sync_jobs(dbt, store))
+    return read_runs_and_jobs(store)
 
-def historical_runs(all_runs: dict, job_id: int) -> pd.DataFrame:
-    """for job type find all historical runs in get_all_runs response
+
+def read_runs_and_jobs(store: RunStore) -> Tuple[dict, dict]:
+    """latest stored run of every job and all stored jobs, without calling the api,
+    for stores kept up to date by someone else, ie the webhook sidecar
 
     Args:
-        all_runs (dict): from the list of all runs find any that matche the same job id
-        job_id (int): chosen job id
+        store (RunStore): run store to read
 
     Returns:
-        pd.DataFrame: dataframe of historical runs fo given job id
+        Tuple[dict, dict]: runs and jobs as returned by fetch_runs_and_jobs
+    """
+    # one snapshot, a write landing between the reads would tag newer data with a
+    # version merges of the older data are memoized under
+    with store.read_transaction():
+        version = store.version
+        return (
+            {"data": store.latest_runs(), "version": version},
+            {"data": store.jobs(), "version": version},
+        )
+
+
+def combine_runs_and_jobs(
+    accounts_runs_and_jobs: Dict[int, Tuple[dict, dict]]
+) -> Tuple[dict, dict]:
+    """merge the runs and jobs of several accounts, every run and job is tagged
+    with its account id
+
+    Args:
+        accounts_runs_and_jobs (Dict[int, Tuple[dict, dict]]): runs and jobs as
+            returned by fetch_runs_and_jobs by account id
+
+    Returns:
+        Tuple[dict, dict]: runs and jobs of all accounts, versioned when every
+        account's runs and jobs are
     """
-    historical_runs = {}
-    for run in all_runs["data"]:
-        if run["job_id"] == job_id:
-            historical_runs[run["id"]] = run
-    return pd.DataFrame.from_dict(historical_runs, orient="index")
+    responses = []
+    for index in (0, 1):
+        combined = {
+            "data": [
+                item if "account_id" in item else {**item, "account_id": account_id}
+                for account_id, runs_and_jobs in accounts_runs_and_jobs.items()
+                for item in runs_and_jobs[index]["data"]
+            ]
+        }
+        versions = [
+            runs_and_jobs[index].get("version")
+            for runs_and_jobs in accounts_runs_and_jobs.values()
+        ]
+        if None not in versions:
+            combined["version"] = tuple(zip(accounts_runs_and_jobs, versions))
+        responses.append(combined)
+    return responses[0], responses[1]
+
+
+def runs_and_jobs_version(all_runs: dict, all_jobs: dict) -> Hashable:
+    """identify the content of runs and jobs, to key results derived from them
 
+    Args:
+        all_runs (dict): runs as returned by fetch_runs_and_jobs
+        all_jobs (dict): jobs as returned by fetch_runs_and_jobs
 
-def fetch_run_artifacts(
-    dbt: DbtCloud, chosen_df: pd.DataFrame, run_name: tuple
-) -> dict:
-    """find run id in response dataframe and fetch run artifacts
-    with the given run id
+    Returns:
+        Hashable: the run store version they were read at, otherwise a fingerprint
+        of the ids and update times of every run and job
+    """
+    if "version" in all_runs and "version" in all_jobs:
+        return all_runs["version"], all_jobs["version"]
+    return hash(
+        tuple(
+            (item["id"], item.get("updated_at"))
+            for response in (all_runs, all_jobs)
+            for item in response["data"]
+        )
+    )
+
+
+async def sync_runs(
+    dbt: AsyncDbtCloud,
+    store: RunStore,
+    page_size: int = 100,
+    max_runs: int = 10000,
+) -> int:
+    """bring the run store up to date, runs are requested latest finished first only
+    until a page reaches a run which is already stored as finished. Runs that were
+    still in progress at the previous sync are requested again by id, and removed
+    from the store when they no longer exist
 
     Args:
-        dbt (DbtCloud): dbt class for calling api
-        chosen_df (pd.DataFrame): dataframe of combined run and job data
-        run_name (tuple): job name and related project name
+        dbt (AsyncDbtCloud): async dbt class instance for calling api
+        store (RunStore): local run store to update
+        page_size (int): number of runs per request
+        max_runs (int): maximum number of runs backfilled by the first sync, runs
+            written by webhooks before it do not count as synced
 
     Returns:
-        dict: dbt api run artifact json response
+        int: number of runs added, changed or removed from the store
     """
-    run_row = chosen_df.loc[
-        (chosen_df["name"] == run_name[0]) & (chosen_df["project_name"] == run_name[1])
-    ]
-    return dbt.get_run_artifacts(run_row["id"].item())
+    params = {"order_by": "-finished_at", "limit": page_size}
+    if not store.is_synced("runs"):
+        response = await dbt.list_runs(params=params)
+        backfill = await response.collect(max_items=max_runs)
+        changed = store.upsert(backfill["data"])
+        store.mark_synced("runs")
+        return changed
+
+    pending = set(store.pending_run_ids())
+    new_runs = []
+    offset = 0
+    while True:
+        page = await dbt.list_runs(params={**params, "offset": offset})
+        runs = page.get("data") or []
+        unseen = [run for run in runs if not store.is_finished(run["id"])]
+        new_runs.extend(unseen)
+        offset += page_size
+        if len(unseen) < len(runs) or len(runs) < page_size:
+            break
+
+    pending.difference_update(run["id"] for run in new_runs)
+    pending_ids = sorted(pending)
+    rechecked = await asyncio.gather(
+        *(dbt.get_run(run_id) for run_id in pending_ids), return_exceptions=True
+    )
+    deleted = []
+    for run_id, response in zip(pending_ids, rechecked):
+        if isinstance(response, aiohttp.ClientResponseError) and response.status == 404:
+            # the run was deleted since, asking for it again would fail every sync
+            deleted.append(run_id)
+        elif isinstance(response, BaseException):
+            raise response
+        else:
+            new_runs.append(response["data"])
+    return store.upsert(new_runs) + store.delete(deleted)
+
+
+async def sync_jobs(dbt: AsyncDbtCloud, store: RunStore, page_size: int = 100) -> int:
+    """store every job of the account, all pages are requested concurrently
+
+    Args:
+        dbt (AsyncDbtCloud): async dbt class instance for calling api
+        store (RunStore): local store to update
+        page_size (int): number of jobs per request
+
+    Returns:
+        int: number of jobs added or changed in the store
+    """
+    response = await dbt.list_jobs(
+        params={"order_by": "-created_at", "limit": page_size}
+    )
+    jobs = await response.collect()
+    changed = store.upsert_jobs(jobs["data"])
+    store.mark_synced("jobs")
+    return changed
+
+
+def runs_and_jobs_key(dbt: AsyncDbtCloud) -> tuple:
+    """shared cache key of the latest runs and jobs of the account"""
+    return (dbt.account_id, "runs_and_jobs")
+
+
+def artifact_key(dbt: AsyncDbtCloud, run_id: int, name: str) -> tuple:
+    """shared cache key of an artifact of a run"""
+    return (dbt.account_id, run_id, name)
+
+
+async def fetch_run_results(
+    dbt: AsyncDbtCloud,
+    run_id: int,
+    complete: bool = True,
+    cache: Optional[SharedCache] = None,
+) -> Optional[dict]:
+    """fetch run results of a run, or None when the run has no artifacts
+
+    Args:
+        dbt (AsyncDbtCloud): async dbt class instance for calling api
+        run_id (int): run id
+        complete (bool): whether the run has finished, artifacts of unfinished runs
+            are not cached on disk and expire from the shared cache
+        cache (Optional[SharedCache]): process wide cache to look the results up in
+
+    Returns:
+        Optional[dict]: dbt api run artifact json response
+    """
+
+    async def fetch():
+        try:
+            return await dbt.get_run_artifacts(run_id, cache=complete)
+        except aiohttp.ClientResponseError as error:
+            # only a run without artifacts is an answer worth caching, other errors
+            # propagate and the next render asks again
+            if error.status == 404:
+                return None
+            raise
+
+    if cache is None:
+        return await fetch()
+    ttl = math.inf if complete else None
+    return await cache.get(artifact_key(dbt, run_id, "run_results.json"), fetch, ttl)
+
+
+async def fetch_run_details(
+    dbt: AsyncDbtCloud,
+    run_id: Optional[int],
+    historical_run_id: Optional[int],
+    historical_run_complete: bool = True,
+    cache: Optional[SharedCache] = None,
+) -> Tuple[Optional[dict], Optional[ManifestIndex], Optional[dict]]:
+    """fetch run results and manifest of the chosen run together with the run
+    results of a historical run, all requests are issued concurrently. The manifest
+    is streamed to the artifact cache and only its compact index is opened
+
+    Args:
+        dbt (AsyncDbtCloud): async dbt class instance for calling api
+        run_id (Optional[int]): chosen run id, None to skip its artifacts
+        historical_run_id (Optional[int]): historical run id, None to skip it
+        historical_run_complete (bool): whether the historical run has finished,
+            artifacts of unfinished runs are not cached
+        cache (Optional[SharedCache]): process wide cache shared by all sessions,
+            artifacts of finished runs never expire from it
+
+    Returns:
+        Tuple[Optional[dict], Optional[ManifestIndex], Optional[dict]]: run results
+        and manifest index of the chosen run and run results of the historical run,
+        the historical run results are None when it has no artifacts
+    """
+
+    async def nothing():
+        return None
+
+    async def run_results():
+        if cache is None:
+            return await dbt.get_run_artifacts(run_id)
+        key = artifact_key(dbt, run_id, "run_results.json")
+        return await cache.get(key, lambda: dbt.get_run_artifacts(run_id), math.inf)
+
+    async def manifest_index():
+        if cache is None:
+            return await dbt.get_run_manifest_index(run_id)
+        key = artifact_key(dbt, run_id, MANIFEST_INDEX_FILE)
+        return await cache.get(
+            key, lambda: dbt.get_run_manifest_index(run_id), math.inf
+        )
+
+    return await asyncio.gather(
+        run_results() if run_id else nothing(),
+        manifest_index() if run_id else nothing(),
+        fetch_run_results(dbt, historical_run_id, historical_run_complete, cache)
+        if historical_run_id
+        else nothing(),
+    )
+
+
+@dataclass
+class RunDetails:
+    """triage of a chosen run and the run results of a historical run of its job,
+    triage and manifest are None for cancelled runs"""
+
+    triage: Optional[RunTriage]
+    manifest: Optional[ManifestIndex]
+    historical_run_result: Optional[dict]
+
+
+def load_run_details(
+    event_loop: EventLoopThread,
+    dbt: AsyncDbtCloud,
+    run_row: pd.Series,
+    historical_run_id: Optional[int],
+    historical_run_complete: bool = True,
+    cache: Optional[SharedCache] = None,
+) -> RunDetails:
+    """fetch the artifacts of a run chosen from chosen_runs on the event loop and
+    triage it in the calling thread, so the loop is free for other sessions
+
+    Args:
+        event_loop (EventLoopThread): event loop the api calls run on
+        dbt (AsyncDbtCloud): async dbt class instance of the account of the run
+        run_row (pd.Series): row of the run in the chosen runs frame
+        historical_run_id (Optional[int]): historical run id, None to skip it
+        historical_run_complete (bool): whether the historical run has finished
+        cache (Optional[SharedCache]): process wide cache shared by all sessions
+
+    Returns:
+        RunDetails: triage and manifest of the run and the historical run results
+    """
+    cancelled = run_row["status_humanized"] == "Cancelled"
+    with METRICS.timer("render_step_seconds", step="run_details"):
+        run_results, manifest, historical_run_result = event_loop.run(
+            fetch_run_details(
+                dbt,
+                None if cancelled else int(run_row["id"]),
+                historical_run_id,
+                historical_run_complete,
+                cache,
+            )
+        )
+    triage = None
+    if not cancelled:
+        with METRICS.timer("render_step_seconds", step="triage"):
+            triage = triage_run(run_results, manifest)
+    return RunDetails(triage, manifest, historical_run_result)
+
+
+def historical_runs(all_runs, job_id: int) -> pd.DataFrame:
+    """for job type find all historical runs in get_all_runs response
+
+    Args:
+        all_runs (dict | pd.DataFrame): from the list of all runs find any that matche
+            the same job id, either the api response or as returned by runs_to_frame
+        job_id (int): chosen job id
+
+    Returns:
+        pd.DataFrame: dataframe of historical runs fo given job id
+    """
+    runs = all_runs if isinstance(all_runs, pd.DataFrame) else runs_to_frame(all_runs)
+    if runs.empty:
+        return runs
+    history = runs.loc[runs["job_id"].to_numpy() == job_id]
+    return history.loc[~history.index.duplicated(keep="last")]
 
 
 def find_failed_results(run_artifacts: dict) -> list:
@@ -122,16 +612,39 @@ def find_failed_results(run_artifacts: dict) -> list:
     return failed_steps
 
 
-def highlight(series: pd.Series) -> list:
-    """return list same width as row to apply styling
+def highlight(frame: pd.DataFrame) -> pd.DataFrame:
+    """styling of every cell, the row color follows is_success, for
+    Styler.apply with axis=None so the whole frame is styled in one operation
+
+    Args:
+        frame (pd.DataFrame): the shown part of the chosen dataframe
+
+    Returns:
+        pd.DataFrame: frame shaped css styles
+    """
+    colors = np.where(frame["is_success"] >= 1, SUCCESS_STYLE, FAILURE_STYLE)
+    return pd.DataFrame(
+        np.repeat(colors[:, np.newaxis], frame.shape[1], axis=1),
+        index=frame.index,
+        columns=frame.columns,
+    )
+
+
+def page_count(rows: int, page_size: int) -> int:
+    """number of pages needed for rows, at least one"""
+    return max(math.ceil(rows / page_size), 1)
+
+
+def frame_page(frame: pd.DataFrame, number: int, page_size: int) -> pd.DataFrame:
+    """rows of the given one based page of an already sorted frame
 
     Args:
-        series (pd.Series): one row of data from chosen datafram
+        frame (pd.DataFrame): sorted dataframe
+        number (int): page number, starting at 1
+        page_size (int): rows per page
 
     Returns:
-        list: list same size as series with styling to apply
+        pd.DataFrame: at most page_size rows
     """
-    if series.is_success >= 1:
-        return ["background-color: #3e9456"] * (len(series))
-    else:
-        return ["background-color: #a62100"] * (len(series))
+    start = (number - 1) * page_size
+    return frame.iloc[start : start + page_size]
@@ -0,0 +1,104 @@
+"""Bulk export of run artifacts for offline analysis
+
+    API_TOKEN=... python -m src.export ACCOUNT_ID RUN_ID [RUN_ID ...] \
+        [--directory artifacts] [--compression gzip]
+"""
+import argparse
+import bz2
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import gzip
+import lzma
+import os
+import sys
+import tempfile
+from typing import List, Optional, Tuple
+
+ARTIFACT_FILES = ("run_results.json", "catalog.json", "manifest.json")
+# compression name: (open function, file suffix), only stdlib codecs so the export
+# needs no extra dependency
+COMPRESSIONS = {
+    "gzip": (gzip.open, ".gz"),
+    "bz2": (bz2.open, ".bz2"),
+    "xz": (lzma.open, ".xz"),
+}
+
+
+@dataclass
+class ExportSummary:
+    """paths written and skipped by an export and the artifacts the api had not"""
+
+    written: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    missing: List[Tuple[int, str]] = field(default_factory=list)
+
+
+def export_path(
+    directory: str, run_id: int, name: str, compression: Optional[str] = None
+) -> str:
+    """where an export puts an artifact, one directory per run
+
+    Args:
+        directory (str): export root directory
+        run_id (int): run the artifact belongs to
+        name (str): artifact file name, ie manifest.json
+        compression (Optional[str]): one of COMPRESSIONS or None
+
+    Returns:
+        str: path of the exported artifact
+    """
+    suffix = COMPRESSIONS[compression][1] if compression else ""
+    return os.path.join(directory, str(run_id), name + suffix)
+
+
+@contextmanager
+def atomic_writer(path: str, compression: Optional[str] = None):
+    """binary file object which replaces path only once the block exits without
+    an error, so an interrupted download never leaves a partial or empty file
+
+    Args:
+        path (str): final path of the file
+        compression (Optional[str]): one of COMPRESSIONS or None
+
+    Yields:
+        BinaryIO: file object compressing on write when compression is set
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        opener = COMPRESSIONS[compression][0] if compression else open
+        with opener(tmp_path, "wb") as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def main(argv: Optional[List[str]] = None):
+    from src.classes import DbtCloud
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("account_id", type=int)
+    parser.add_argument("run_ids", type=int, nargs="+")
+    parser.add_argument("--directory", default="artifacts")
+    parser.add_argument("--compression", choices=sorted(COMPRESSIONS))
+    parser.add_argument("--max-workers", type=int, default=8)
+    args = parser.parse_args(argv)
+
+    dbt = DbtCloud(args.account_id, max_workers=args.max_workers)
+    summary = dbt.export_run_artifacts(
+        args.run_ids, args.directory, compression=args.compression
+    )
+    sys.stdout.write(
+        f"written {len(summary.written)}, skipped {len(summary.skipped)}, "
+        f"missing {len(summary.missing)}\n"
+    )
+    for run_id, name in summary.missing:
+        sys.stdout.write(f"missing {name} for run {run_id}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+from typing import Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# resource types which hold data that goes stale when an upstream node fails
+STALE_RESOURCE_TYPES = ["model", "snapshot", "seed"]
+
+
+def _to_csr(sources: np.ndarray, targets: np.ndarray, size: int) -> tuple:
+    order = np.argsort(sources, kind="stable")
+    offsets = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=size), out=offsets[1:])
+    return offsets, targets[order]
+
+
+def _neighbours(offsets: np.ndarray, indices: np.ndarray, ids: np.ndarray):
+    starts = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    total = lengths.sum()
+    # every neighbour sits at the start of its id plus its rank among the neighbours
+    # of that id, which gathers all of them without a python level loop
+    ranks = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return indices[np.repeat(starts, lengths) + ranks]
+
+
+class Lineage:
+    """
+    The depends_on graph of a manifest as compressed sparse row arrays in both
+    directions. Nodes are integer positions, so walking the graph of a project with
+    tens of thousands of nodes only touches flat int arrays and one visited mask
+    """
+
+    def __init__(
+        self,
+        unique_ids: np.ndarray,
+        resource_types: np.ndarray,
+        parents: np.ndarray,
+        children: np.ndarray,
+    ):
+        size = len(unique_ids)
+        self.unique_ids = unique_ids
+        self.resource_types = resource_types
+        self.positions = {unique_id: i for i, unique_id in enumerate(unique_ids)}
+        self._child_offsets, self._child_indices = _to_csr(parents, children, size)
+        self._parent_offsets, self._parent_indices = _to_csr(children, parents, size)
+
+    @classmethod
+    def from_edges(
+        cls, nodes: Sequence[Tuple[int, str, str]], edges: Sequence[Tuple[int, int]]
+    ) -> "Lineage":
+        """build the graph from the rows of a manifest index
+
+        Args:
+            nodes (Sequence[Tuple[int, str, str]]): id, unique id and resource type
+            edges (Sequence[Tuple[int, int]]): parent id and child id
+
+        Returns:
+            Lineage: graph with the nodes renumbered to consecutive positions
+        """
+        ids = np.array([node[0] for node in nodes], dtype=np.int64)
+        unique_ids = np.array([node[1] for node in nodes], dtype=object)
+        resource_types = np.array([node[2] for node in nodes], dtype=object)
+        edges = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        # ids are sorted, searchsorted maps them to positions
+        parents = np.searchsorted(ids, edges[:, 0])
+        children = np.searchsorted(ids, edges[:, 1])
+        return cls(unique_ids, resource_types, parents, children)
+
+    def __len__(self) -> int:
+        return len(self.unique_ids)
+
+    def to_positions(self, unique_ids: Iterable[str]) -> np.ndarray:
+        """positions of the unique ids which are part of the graph"""
+        return np.array(
+            [self.positions[u] for u in unique_ids if u in self.positions],
+            dtype=np.int64,
+        )
+
+    def _walk(self, offsets: np.ndarray, indices: np.ndarray, start) -> np.ndarray:
+        visited = np.zeros(len(self), dtype=bool)
+        frontier = np.unique(np.asarray(start, dtype=np.int64))
+        while len(frontier):
+            frontier = _neighbours(offsets, indices, frontier)
+            frontier = np.unique(frontier[~visited[frontier]])
+            visited[frontier] = True
+        return np.flatnonzero(visited)
+
+    def descendants(self, positions) -> np.ndarray:
+        """positions of every node downstream of the given ones, excluding them
+        unless they are downstream of each other"""
+        return self._walk(self._child_offsets, self._child_indices, positions)
+
+    def ancestors(self, positions) -> np.ndarray:
+        """positions of every node upstream of the given ones, excluding them
+        unless they are upstream of each other"""
+        return self._walk(self._parent_offsets, self._parent_indices, positions)
+
+    def children(self, position: int) -> np.ndarray:
+        return self._child_indices[
+            self._child_offsets[position] : self._child_offsets[position + 1]
+        ]
+
+    def parents(self, position: int) -> np.ndarray:
+        return self._parent_indices[
+            self._parent_offsets[position] : self._parent_offsets[position + 1]
+        ]
+
+
+def failure_impact(lineage: Lineage, failed_ids: Iterable[str]) -> pd.DataFrame:
+    """downstream impact of every failed node and the failed nodes upstream of it
+
+    Args:
+        lineage (Lineage): graph of the run's manifest
+        failed_ids (Iterable[str]): unique ids of the failed nodes
+
+    Returns:
+        pd.DataFrame: per failed unique id the stale downstream nodes, the affected
+        exposures and the failed ancestors which have no failed ancestor themselves
+    """
+    failed = lineage.to_positions(failed_ids)
+    is_failed = np.zeros(len(lineage), dtype=bool)
+    is_failed[failed] = True
+    stale_type = np.isin(lineage.resource_types, STALE_RESOURCE_TYPES)
+    exposure_type = lineage.resource_types == "exposure"
+
+    failed_ancestors = {}
+    for position in failed:
+        ancestors = lineage.ancestors([position])
+        failed_ancestors[position] = ancestors[is_failed[ancestors]]
+    roots = {
+        position
+        for position, upstream in failed_ancestors.items()
+        if not len(upstream)
+    }
+
+    rows = []
+    for position in failed:
+        downstream = lineage.descendants([position])
+        stale = lineage.unique_ids[downstream[stale_type[downstream]]]
+        exposures = lineage.unique_ids[downstream[exposure_type[downstream]]]
+        root_causes = [
+            lineage.unique_ids[p] for p in failed_ancestors[position] if p in roots
+        ]
+        rows.append(
+            {
+                "unique_id": lineage.unique_ids[position],
+                "stale": len(stale),
+                "stale_nodes": list(stale),
+                "exposures": list(exposures),
+                "root_causes": root_causes,
+            }
+        )
+    return pd.DataFrame.from_records(
+        rows, columns=["unique_id", "stale", "stale_nodes", "exposures", "root_causes"]
+    )
+
+
+def shared_ancestors(lineage: Lineage, failed_ids: Iterable[str]) -> pd.DataFrame:
+    """the most downstream nodes which are upstream of more than one failed node,
+    the likely root causes when several steps fail at once
+
+    Args:
+        lineage (Lineage): graph of the run's manifest
+        failed_ids (Iterable[str]): unique ids of the failed nodes
+
+    Returns:
+        pd.DataFrame: per shared ancestor its resource type and the failed nodes
+        downstream of it, most failures first
+    """
+    failed = lineage.to_positions(failed_ids)
+    ancestors: List[np.ndarray] = [lineage.ancestors([p]) for p in failed]
+    if not ancestors:
+        counts = np.zeros(len(lineage), dtype=np.int64)
+    else:
+        counts = np.bincount(np.concatenate(ancestors), minlength=len(lineage))
+    shared = np.flatnonzero(counts > 1)
+    # drop shared ancestors which are upstream of another shared ancestor
+    lowest = np.setdiff1d(shared, lineage.ancestors(shared))
+
+    rows = [
+        {
+            "unique_id": lineage.unique_ids[position],
+            "resource_type": lineage.resource_types[position],
+            "failures": [
+                lineage.unique_ids[failure]
+                for failure, upstream in zip(failed, ancestors)
+                if position in upstream
+            ],
+        }
+        for position in lowest
+    ]
+    impact = pd.DataFrame.from_records(
+        rows, columns=["unique_id", "resource_type", "failures"]
+    )
+    impact["count"] = impact["failures"].map(len)
+    return impact.sort_values("count", ascending=False).drop(columns="count")
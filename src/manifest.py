@@ -0,0 +1,375 @@
+import json
+import sqlite3
+import threading
+from typing import (
+    TYPE_CHECKING,
+    BinaryIO,
+    Dict,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+import zlib
+
+import ijson
+
+from src.artifact_cache import ArtifactCache, open_artifact
+
+if TYPE_CHECKING:
+    from src.lineage import Lineage
+
+MANIFEST_FILE = "manifest.json"
+# bump the version whenever MANIFEST_INDEX_SCHEMA changes so cached indexes rebuild
+MANIFEST_INDEX_FILE = "manifest.index.v3.sqlite"
+# top level manifest sections which hold graph members
+MANIFEST_GRAPH_SECTIONS = ("nodes", "sources", "exposures")
+# zlib only looks back 32KB, a larger preset dictionary would never be used
+NODE_DICTIONARY_SIZE = 32 * 1024
+
+
+MANIFEST_INDEX_SCHEMA = """
+CREATE TABLE metadata (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE paths (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL);
+CREATE TABLE nodes (
+    id INTEGER PRIMARY KEY,
+    unique_id TEXT UNIQUE NOT NULL,
+    resource_type TEXT,
+    path_id INTEGER REFERENCES paths (id),
+    body BLOB NOT NULL
+);
+CREATE TABLE dictionary (data BLOB NOT NULL);
+CREATE TABLE edges (
+    parent_id INTEGER NOT NULL,
+    child_id INTEGER NOT NULL,
+    PRIMARY KEY (parent_id, child_id)
+) WITHOUT ROWID;
+"""
+
+
+class ManifestNode(NamedTuple):
+    """the fields of a manifest node the dashboard shows for a failed step"""
+
+    unique_id: str
+    resource_type: str
+    original_file_path: str
+    raw_sql: str
+    depends_on: dict
+
+
+def _encode_node(node: dict) -> bytes:
+    return json.dumps(node, separators=(",", ":")).encode()
+
+
+def iter_manifest(f: BinaryIO) -> Iterator[Tuple[str, Optional[str], object]]:
+    """parse a manifest once and yield its metadata and graph members in file order,
+    every top level section is dispatched to its own item builder so nothing else
+    of the manifest is ever built
+
+    Args:
+        f (BinaryIO): manifest.json file object
+
+    Yields:
+        Tuple[str, Optional[str], object]: ("metadata", None, metadata) and
+        (section, unique_id, node) for every member of MANIFEST_GRAPH_SECTIONS
+    """
+    backend = ijson.get_backend(ijson.backend)
+    built = ijson.sendable_list()
+    builders = {
+        section: backend.kvitems_basecoro(built, section)
+        for section in MANIFEST_GRAPH_SECTIONS
+    }
+    builders["metadata"] = backend.items_basecoro(built, "metadata")
+    section = builder = None
+    for event in backend.parse(f, use_float=True):
+        if event[0] == "":
+            if event[1] == "map_key":
+                section = event[2]
+                builder = builders.get(section)
+            continue
+        if builder is None:
+            continue
+        builder.send(event)
+        if built:
+            for item in built:
+                if section == "metadata":
+                    yield section, None, item
+                else:
+                    yield section, item[0], item[1]
+            del built[:]
+
+
+def train_node_dictionary(
+    nodes: Iterable[dict], size: int = NODE_DICTIONARY_SIZE
+) -> bytes:
+    """preset dictionary for compressing the nodes of a manifest one by one. Nodes
+    of a project repeat the same keys, config blocks and paths, so a sample of them
+    primes zlib with those strings and every node compresses as if it was part of
+    one big document. The most common resource types go last, as zlib finds recent
+    strings cheapest
+
+    Args:
+        nodes (Iterable[dict]): sample of the nodes, ie the first ones of the manifest
+        size (int): maximum dictionary size in bytes
+
+    Returns:
+        bytes: zlib preset dictionary
+    """
+    by_type: Dict[str, list] = {}
+    for node in nodes:
+        by_type.setdefault(node.get("resource_type"), []).append(node)
+
+    per_type = size // max(len(by_type), 1)
+    parts = []
+    for nodes in sorted(by_type.values(), key=len):
+        part = b""
+        for node in nodes:
+            if len(part) >= per_type:
+                break
+            part += _encode_node(node)
+        parts.append(part[:per_type])
+    return b"".join(parts)[-size:]
+
+
+def build_manifest_index(manifest_path: str, index_path: str, samples: int = 1000):
+    """stream every node, source and exposure of a manifest into a compact sqlite
+    index, file paths are interned in their own table as many nodes (tests) share the
+    path of a schema file. Unique ids are interned to integer ids as well, so the
+    depends_on graph is stored as integer edges. Every node is kept whole, zlib
+    compressed on its own with a dictionary trained on the first samples nodes, so
+    any node can be read back without decompressing the others. The manifest is
+    parsed once, the sampled nodes are held until the dictionary is trained
+
+    Args:
+        manifest_path (str): path of a manifest.json file
+        index_path (str): path of the sqlite file to create
+        samples (int): number of nodes to train the compression dictionary on
+    """
+    connection = sqlite3.connect(index_path)
+    try:
+        connection.executescript(MANIFEST_INDEX_SCHEMA)
+        metadata = {}
+        path_ids = {}
+        node_ids = {}
+        edges = []
+
+        def intern(path: Optional[str]) -> Optional[int]:
+            if path is None:
+                return None
+            return path_ids.setdefault(path, len(path_ids) + 1)
+
+        def intern_node(unique_id: str) -> int:
+            return node_ids.setdefault(unique_id, len(node_ids) + 1)
+
+        def row(unique_id: str, node: dict, dictionary: bytes) -> tuple:
+            node_id = intern_node(unique_id)
+            edges.extend(
+                (intern_node(parent), node_id)
+                for parent in node.get("depends_on", {}).get("nodes") or []
+            )
+            compressor = zlib.compressobj(9, zdict=dictionary)
+            return (
+                node_id,
+                unique_id,
+                node.get("resource_type"),
+                intern(node.get("original_file_path")),
+                compressor.compress(_encode_node(node)) + compressor.flush(),
+            )
+
+        with open_artifact(manifest_path) as f:
+            members = iter_manifest(f)
+            sampled = []
+            for section, unique_id, value in members:
+                if section == "metadata":
+                    metadata = value
+                    continue
+                sampled.append((unique_id, value))
+                if len(sampled) == samples:
+                    break
+            dictionary = train_node_dictionary(node for _, node in sampled)
+
+            def rows() -> Iterator[tuple]:
+                nonlocal metadata
+                for unique_id, node in sampled:
+                    yield row(unique_id, node, dictionary)
+                sampled.clear()
+                for section, unique_id, value in members:
+                    if section == "metadata":
+                        metadata = value
+                        continue
+                    yield row(unique_id, value, dictionary)
+
+            connection.executemany(
+                "INSERT INTO nodes (id, unique_id, resource_type, path_id, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows(),
+            )
+        connection.executemany(
+            "INSERT INTO metadata (key, value) VALUES (?, ?)",
+            [(key, json.dumps(value)) for key, value in metadata.items()],
+        )
+        connection.execute("INSERT INTO dictionary (data) VALUES (?)", (dictionary,))
+        connection.executemany(
+            "INSERT INTO paths (id, path) VALUES (?, ?)",
+            [(path_id, path) for path, path_id in path_ids.items()],
+        )
+        # parents which are not in the manifest, ie disabled nodes, are left out
+        connection.executemany(
+            "INSERT OR IGNORE INTO edges (parent_id, child_id) "
+            "SELECT ?, ? WHERE EXISTS (SELECT 1 FROM nodes WHERE id = ?)",
+            ((parent, child, parent) for parent, child in edges),
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+class ManifestIndex:
+    """
+    Read only view of an index built by build_manifest_index, nodes are looked up
+    by primary key and decompressed one by one without ever loading the manifest
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._connection = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._lineage: Optional["Lineage"] = None
+        self.metadata = {
+            key: json.loads(value)
+            for key, value in self._query("SELECT key, value FROM metadata")
+        }
+        self._dictionary = self._query("SELECT data FROM dictionary")[0][0]
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    @property
+    def adapter_type(self) -> Optional[str]:
+        return self.metadata.get("adapter_type")
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM nodes")[0][0]
+
+    def __contains__(self, unique_id: str) -> bool:
+        rows = self._query("SELECT 1 FROM nodes WHERE unique_id = ?", (unique_id,))
+        return bool(rows)
+
+    def node(self, unique_id: str) -> Optional[ManifestNode]:
+        """look up a single node
+
+        Args:
+            unique_id (str): unique id of the node
+
+        Returns:
+            Optional[ManifestNode]: the node or None when it is not in the manifest
+        """
+        return self.nodes([unique_id]).get(unique_id)
+
+    def nodes(self, unique_ids: Iterable[str]) -> Dict[str, ManifestNode]:
+        """look up several nodes in one query
+
+        Args:
+            unique_ids (Iterable[str]): unique ids of the nodes
+
+        Returns:
+            Dict[str, ManifestNode]: found nodes by unique id
+        """
+        return {
+            unique_id: ManifestNode(
+                unique_id,
+                resource_type,
+                path,
+                document.get("raw_sql", document.get("raw_code")),
+                document.get("depends_on", {}),
+            )
+            for unique_id, resource_type, path, document in self._rows(unique_ids)
+        }
+
+    def _rows(self, unique_ids: Iterable[str]) -> Iterator[tuple]:
+        unique_ids = list(unique_ids)
+        # stay below the sqlite limit of bound parameters per statement
+        for start in range(0, len(unique_ids), 500):
+            batch = unique_ids[start : start + 500]
+            rows = self._query(
+                "SELECT unique_id, resource_type, path, body "
+                "FROM nodes LEFT JOIN paths ON paths.id = nodes.path_id "
+                f"WHERE unique_id IN ({', '.join('?' * len(batch))})",
+                tuple(batch),
+            )
+            for unique_id, resource_type, path, body in rows:
+                decompressor = zlib.decompressobj(zdict=self._dictionary)
+                document = json.loads(decompressor.decompress(body))
+                yield unique_id, resource_type, path, document
+
+    def lineage(self) -> "Lineage":
+        """the depends_on graph of the manifest, built on first use
+
+        Returns:
+            Lineage: graph of every node, source and exposure
+        """
+        # numpy and pandas are loaded with the first graph, the api clients which
+        # import this module do not need them
+        from src.lineage import Lineage
+
+        with self._lock:
+            if self._lineage is None:
+                nodes = self._connection.execute(
+                    "SELECT id, unique_id, resource_type FROM nodes ORDER BY id"
+                ).fetchall()
+                edges = self._connection.execute(
+                    "SELECT parent_id, child_id FROM edges"
+                ).fetchall()
+                self._lineage = Lineage.from_edges(nodes, edges)
+            return self._lineage
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def cached_manifest_index(
+    artifact_cache: ArtifactCache, account_id: int, run_id: int
+) -> Optional[ManifestIndex]:
+    """open the index of a manifest when it is cached, the manifest itself may have
+    been evicted since the index was built
+
+    Args:
+        artifact_cache (ArtifactCache): cache holding the index
+        account_id (int): dbt cloud account id
+        run_id (int): run the manifest belongs to
+
+    Returns:
+        Optional[ManifestIndex]: index of the manifest, None when it is not cached
+    """
+    index_path = artifact_cache.get_path(account_id, run_id, MANIFEST_INDEX_FILE)
+    return None if index_path is None else ManifestIndex(index_path)
+
+
+def ensure_manifest_index(
+    artifact_cache: ArtifactCache, account_id: int, run_id: int, manifest_path: str
+) -> ManifestIndex:
+    """open the index of a cached manifest, building it next to the manifest the
+    first time
+
+    Args:
+        artifact_cache (ArtifactCache): cache holding the manifest
+        account_id (int): dbt cloud account id
+        run_id (int): run the manifest belongs to
+        manifest_path (str): path of the cached manifest.json
+
+    Returns:
+        ManifestIndex: index of the manifest
+    """
+    index_path = artifact_cache.get_path(account_id, run_id, MANIFEST_INDEX_FILE)
+    if index_path is None:
+        with artifact_cache.staging_path(
+            account_id, run_id, MANIFEST_INDEX_FILE
+        ) as staging_path:
+            build_manifest_index(manifest_path, staging_path)
+        index_path = artifact_cache.path(account_id, run_id, MANIFEST_INDEX_FILE)
+    return ManifestIndex(index_path)
@@ -0,0 +1,145 @@
+import asyncio
+from typing import List
+
+import aiohttp
+import pandas as pd
+
+from src.async_classes import AsyncDbtCloud
+from src.run_store import RunStore
+
+TIMING_COLUMNS = ["run_id", "finished_at", "unique_id", "status", "execution_time"]
+
+
+def node_results_from_run_results(run_results: dict) -> List[tuple]:
+    """the compact part of run_results.json kept for every node
+
+    Args:
+        run_results (dict): dbt api run artifact json response
+
+    Returns:
+        List[tuple]: unique id, status and execution time of each node
+    """
+    return [
+        (result["unique_id"], result["status"], result.get("execution_time"))
+        for result in run_results["results"]
+    ]
+
+
+async def ingest_job_history(
+    dbt: AsyncDbtCloud,
+    store: RunStore,
+    job_id: int,
+    runs: int = 100,
+    concurrency: int = 4,
+) -> int:
+    """store node results of the latest finished runs of a job which are not
+    ingested yet. Only a few run_results.json are held at once, each one is reduced
+    to its node timings and dropped
+
+    Args:
+        dbt (AsyncDbtCloud): async dbt class instance for calling api
+        store (RunStore): store to write node results to
+        job_id (int): job to ingest
+        runs (int): number of latest runs to cover
+        concurrency (int): maximum number of run results downloaded at once
+
+    Returns:
+        int: number of runs ingested
+    """
+    run_ids = [
+        run["id"]
+        for run in store.runs(job_id=job_id, limit=runs)
+        if run.get("is_complete") and not run.get("is_cancelled")
+    ]
+    ingested = store.ingested_run_ids(run_ids)
+    missing = [run_id for run_id in run_ids if run_id not in ingested]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def ingest(run_id: int):
+        async with semaphore:
+            try:
+                run_results = await dbt.get_run_artifacts(run_id)
+            except aiohttp.ClientResponseError as error:
+                if error.status != 404:
+                    raise
+                run_results = {"results": []}
+        store.add_node_results(run_id, node_results_from_run_results(run_results))
+
+    await asyncio.gather(*(ingest(run_id) for run_id in missing))
+    return len(missing)
+
+
+def node_timings(store: RunStore, job_id: int, runs: int = 100) -> pd.DataFrame:
+    """per node time series of the latest runs of a job
+
+    Args:
+        store (RunStore): store holding ingested node results
+        job_id (int): job to read
+        runs (int): number of latest runs to read
+
+    Returns:
+        pd.DataFrame: one row per node and run
+    """
+    timings = pd.DataFrame.from_records(
+        store.node_results(job_id, runs), columns=TIMING_COLUMNS
+    )
+    timings["execution_time"] = pd.to_numeric(timings["execution_time"])
+    return timings
+
+
+def node_duration_stats(timings: pd.DataFrame) -> pd.DataFrame:
+    """execution time statistics per node, slowest p95 first
+
+    Args:
+        timings (pd.DataFrame): as returned by node_timings
+
+    Returns:
+        pd.DataFrame: runs, p50, p95, mean and max execution time by unique id
+    """
+    durations = timings.groupby("unique_id")["execution_time"]
+    stats = pd.DataFrame(
+        {
+            "runs": durations.count(),
+            "p50": durations.quantile(0.5),
+            "p95": durations.quantile(0.95),
+            "mean": durations.mean(),
+            "max": durations.max(),
+        }
+    )
+    return stats.sort_values("p95", ascending=False)
+
+
+def duration_regressions(
+    timings: pd.DataFrame,
+    baseline_runs: int = 10,
+    ratio: float = 1.5,
+    min_seconds: float = 5,
+) -> pd.DataFrame:
+    """nodes whose execution time in the latest run exceeds the median of the runs
+    before it by the given ratio
+
+    Args:
+        timings (pd.DataFrame): as returned by node_timings
+        baseline_runs (int): number of earlier runs the median is taken over
+        ratio (float): minimum latest / baseline ratio to report
+        min_seconds (float): ignore nodes faster than this in the latest run
+
+    Returns:
+        pd.DataFrame: latest and baseline execution time and ratio by unique id,
+        largest ratio first
+    """
+    ordered = timings.sort_values("finished_at", ascending=False)
+    position = ordered.groupby("unique_id").cumcount()
+    latest = ordered.loc[position == 0].set_index("unique_id")["execution_time"]
+    baseline = (
+        ordered.loc[(position > 0) & (position <= baseline_runs)]
+        .groupby("unique_id")["execution_time"]
+        .median()
+    )
+    regressions = pd.DataFrame({"latest": latest, "baseline": baseline}).dropna()
+    regressions = regressions.loc[regressions["baseline"] > 0]
+    regressions["ratio"] = regressions["latest"] / regressions["baseline"]
+    regressions = regressions.loc[
+        (regressions["ratio"] >= ratio) & (regressions["latest"] >= min_seconds)
+    ]
+    return regressions.sort_values("ratio", ascending=False)
@@ -1,46 +1,111 @@
-from typing import Tuple
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+import asyncio
+import math
 import os
-import requests
+import pandas as pd
 import streamlit as st
 
 from src.dbt_dashboard import (
-    find_failed_results,
-    get_all_jobs,
+    chosen_runs,
+    combine_runs_and_jobs,
+    fetch_run_results,
+    fetch_runs_and_jobs,
     get_all_runs,
+    frame_page,
     historical_runs,
-    only_latest_runs,
-    unique_jobs,
-    fetch_run_artifacts,
+    load_run_details,
+    page_count,
+    read_runs_and_jobs,
+    runs_and_jobs_key,
     highlight,
 )
-from src.classes import DbtCloud
+from src.artifact_cache import ArtifactCache
+from src.async_classes import (
+    AsyncDbtCloud,
+    ConcurrencyLimiter,
+    EventLoopThread,
+    RateLimiter,
+)
+from src.lineage import failure_impact, shared_ancestors
+from src.manifest import ManifestIndex
+from src.node_performance import (
+    duration_regressions,
+    ingest_job_history,
+    node_duration_stats,
+    node_timings,
+)
+from src.poller import Poller
+from src.run_store import RunStore
+from src.run_trends import job_trends, rolling_run_stats, run_history
+from src.shared.cache import SharedCache
+from src.shared.memo import Memo
+from src.shared.metrics import METRICS, hit_ratio
+from src.triage import RunTriage, triage_run
 
 PROJECT_MAPPING = st.secrets["PROJECT_MAPPING"]
-ACCOUNT_ID = int(os.environ["ACCOUNT_ID"])
+# comma separated, ACCOUNT_ID is still read when there is a single account
+ACCOUNT_IDS = [
+    int(account_id)
+    for account_id in os.environ.get("ACCOUNT_IDS", os.environ.get("ACCOUNT_ID", ""))
+    .split(",")
+    if account_id.strip()
+]
 PROJECT_REPO_URL_MAPPING = st.secrets["PROJECT_REPO_URL_MAPPING"]
-
+REFRESH_INTERVAL_SECONDS = int(os.environ.get("REFRESH_INTERVAL_SECONDS", 30))
+RUN_STORE_PATH = os.environ.get("RUN_STORE_PATH", ".run_store.sqlite")
+ENABLE_POLLER = os.environ.get("ENABLE_POLLER", "false").lower() in ("1", "true")
+# the webhook sidecar keeps the run store up to date, see src/webhook.py
+WEBHOOK_INGEST = os.environ.get("WEBHOOK_INGEST", "false").lower() in ("1", "true")
+RECONCILE_INTERVAL_SECONDS = int(os.environ.get("RECONCILE_INTERVAL_SECONDS", 900))
+RUNS_PAGE_SIZE = int(os.environ.get("RUNS_PAGE_SIZE", 50))
+NODE_HISTORY_RUNS = int(os.environ.get("NODE_HISTORY_RUNS", 100))
+TREND_HISTORY_RUNS = int(os.environ.get("TREND_HISTORY_RUNS", 200))
+SHARED_CACHE_MAX_ENTRIES = int(os.environ.get("SHARED_CACHE_MAX_ENTRIES", 128))
+ARTIFACT_CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", ".artifact_cache")
+ARTIFACT_CACHE_MAX_BYTES = int(
+    os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+)
+# 0 stores artifacts uncompressed
+ARTIFACT_CACHE_COMPRESSLEVEL = int(os.environ.get("ARTIFACT_CACHE_COMPRESSLEVEL", 6))
+MAX_CONCURRENT_REQUESTS = int(os.environ.get("MAX_CONCURRENT_REQUESTS", 16))
+ACCOUNT_REQUESTS_PER_SECOND = float(os.environ.get("ACCOUNT_REQUESTS_PER_SECOND", 10))
+ACCOUNT_REQUEST_BURST = int(os.environ.get("ACCOUNT_REQUEST_BURST", 4))
+
+# module level, so it lives as long as the server process and all sessions share it
+SHARED_CACHE = SharedCache(SHARED_CACHE_MAX_ENTRIES, ttl=REFRESH_INTERVAL_SECONDS)
+# dataframes derived from the shared runs and jobs, by data version and filters
+MERGE_MEMO = Memo(max_entries=32)
+# requests in flight over all accounts
+REQUEST_LIMITER = ConcurrencyLimiter(MAX_CONCURRENT_REQUESTS)
+# node history ingests running on the shared loop, by account and job id
+HISTORY_INGESTS: Dict[Tuple[int, int], Future] = {}
+
+METRICS.gauge("shared_cache_lookups", lambda: SHARED_CACHE.hits, result="hit")
+METRICS.gauge("shared_cache_lookups", lambda: SHARED_CACHE.stale_hits, result="stale")
+METRICS.gauge("shared_cache_lookups", lambda: SHARED_CACHE.misses, result="miss")
+METRICS.gauge("merge_memo_lookups", lambda: MERGE_MEMO.hits, result="hit")
+METRICS.gauge("merge_memo_lookups", lambda: MERGE_MEMO.misses, result="miss")
 
 CHOSEN_DF_MAPPING = {"all": get_all_runs}
-REQUIRED_COLUMNS_RUNS = [
-    "id",
-    "project_name",
-    "project_id",
-    "status_humanized",
-    "finished_at",
-    "run_duration",
-    "is_success",
-    "is_complete",
-    "job_id",
-]
-REQUIRED_COLUMNS_JOBS = ["name", "next_run"]
 
 
 class UnknownAdapterException(Exception):
     pass
 
 
-def render_page():  # NOQA: CFQ001
-    """This renders the dbt dashboard, it fetches the latest runs and the
+def render_page():
+    """This renders the dbt dashboard and, when enabled, the debug metrics of the
+    render that just finished
+    """
+    with METRICS.timer("render_step_seconds", step="page"):
+        render_dashboard()
+    if st.sidebar.checkbox("Show debug metrics", value=False):
+        show_debug_panel()
+
+
+def render_dashboard():  # NOQA: CFQ001
+    """This renders the dashboard, it fetches the latest runs and the
     corresponding details for the given job in the run
     """
     st.sidebar.title("Configuration")
@@ -49,6 +114,9 @@ def render_page():  # NOQA: CFQ001
         "Failed or Successful runs", ["all", "failed", "successful"]
     )
 
+    show_performance = st.sidebar.checkbox("Show node performance", value=False)
+    show_trends = st.sidebar.checkbox("Show job duration trends", value=False)
+
     st.sidebar.subheader("Filter by project")
     project_dict = {
         project_id: st.sidebar.checkbox(project, value=True)
@@ -57,10 +125,13 @@ def render_page():  # NOQA: CFQ001
 
     filter_list = [int(key) for key, value in project_dict.items() if value]
 
-    dbt = DbtCloud(account_id=ACCOUNT_ID)
-    all_runs, all_jobs = fetch_dbt_data(dbt)
-    failed_runs_df, successful_runs_df, all_runs_df = merge_runs_jobs_to_df(
-        all_runs, all_jobs, filter_list
+    clients = [get_dbt_client(account_id) for account_id in ACCOUNT_IDS]
+    all_runs, all_jobs = fetch_dbt_data(clients)
+    if not all_runs["data"] or not all_jobs["data"]:
+        st.info("There are no runs to show yet")
+        return
+    chosen_df, run_options, selection = chosen_runs(
+        all_runs, all_jobs, PROJECT_MAPPING, filter_list, chosen, MERGE_MEMO
     )
 
     st.text(
@@ -70,53 +141,68 @@ def render_page():  # NOQA: CFQ001
         """
     )
     select_text = "Select a run to view last run artifacts: "
-    chosen_mapping = {
-        "all": all_runs_df,
-        "successful": successful_runs_df,
-        "failed": failed_runs_df,
-    }
-
-    chosen_df = chosen_mapping[chosen]
-    # styling has to be applied only to the shown df instance and not the one used for later iteration
-    st.dataframe(
-        chosen_df.sort_values("finished_at", ascending=False, axis=0)
-        .style.apply(highlight, axis=1)
-        .set_properties(**{"color": "#FFF"})
+    pages = page_count(len(chosen_df), RUNS_PAGE_SIZE)
+    page_number = 1
+    if pages > 1:
+        page_number = st.number_input(
+            f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1
+        )
+    # styling has to be applied only to the shown page and not the df used for later
+    # iteration, only the rows of one page are ever rendered
+    with METRICS.timer("render_step_seconds", step="runs_table"):
+        st.dataframe(
+            frame_page(chosen_df, int(page_number), RUNS_PAGE_SIZE)
+            .style.apply(highlight, axis=None)
+            .set_properties(**{"color": "#FFF"})
+        )
+    if show_trends:
+        with METRICS.timer("render_step_seconds", step="job_trends"):
+            show_job_trends(clients, all_jobs)
+    run_name = st.selectbox(select_text, run_options)
+
+    if run_name is None:
+        st.text("No runs found")
+        return
+
+    run_row = chosen_df.loc[selection[run_name]]
+    dbt = get_dbt_client(int(run_row["account_id"]))
+    job_id = int(run_row["job_id"])
+    historical_df = None
+    if job_id:
+        store = get_run_store(dbt.account_id)
+        history = {"data": store.runs(job_id=job_id, limit=10)}
+        historical_df = historical_runs(history, job_id)
+
+    # the historical selectbox is rendered further down, its last value is known from
+    # the session state so its artifacts can be requested together with the others
+    historical_run_id = st.session_state.get("historical_run")
+    if historical_df is not None and historical_run_id not in historical_df.index:
+        historical_run_id = next(iter(historical_df.index), None)
+
+    historical_run_complete = bool(
+        historical_run_id is None or historical_df.loc[historical_run_id, "is_complete"]
     )
-    run_name = st.selectbox(
-        select_text,
-        list(
-            zip(
-                chosen_df.sort_values("finished_at", ascending=False, axis=0)["name"],
-                chosen_df.sort_values("finished_at", ascending=False, axis=0)[
-                    "project_name"
-                ],
-            )
-        ),
+    details = load_run_details(
+        get_event_loop(),
+        dbt,
+        run_row,
+        historical_run_id,
+        historical_run_complete,
+        SHARED_CACHE,
     )
+    triage, manifest = details.triage, details.manifest
 
-    job_id = chosen_df.loc[
-        (chosen_df["name"] == run_name[0]) & (chosen_df["project_name"] == run_name[1])
-    ]["job_id"].item()
-    if (
-        chosen_df.loc[
-            (chosen_df["name"] == run_name[0])
-            & (chosen_df["project_name"] == run_name[1])
-        ].status_humanized.item()
-        != "Cancelled"
-    ):
-        run_results = fetch_run_artifacts(dbt, chosen_df, run_name)
-        manifest = dbt.get_run_manifest(
-            run_results["metadata"]["env"]["DBT_CLOUD_RUN_ID"]
-        )
-        adapter = manifest["metadata"]["adapter_type"]
+    if triage is not None:
+        adapter = manifest.adapter_type
         base_url = PROJECT_REPO_URL_MAPPING.get(adapter)
         if base_url is None:
             raise UnknownAdapterException(
                 f"The adapter type {adapter} was not found in the PROJECT_REPO_URL_MAPPING"
             )
 
-        failed_steps = find_failed_results(run_results)
+        show_triage_summary(triage)
+        with METRICS.timer("render_step_seconds", step="failure_impact"):
+            show_failure_impact(triage, manifest)
 
         st.text(
             """
@@ -124,7 +210,7 @@ def render_page():  # NOQA: CFQ001
             """
         )
         if st.button("Show latest run results"):
-            list_failed(failed_steps, run_results, manifest, base_url)
+            list_failed(triage.failures, base_url)
 
     else:
         st.text("Run was cancelled, no run artifacts available")
@@ -136,85 +222,413 @@ def render_page():  # NOQA: CFQ001
         Previous runs for job: {run_name}
         """
         )
-        historical_df = historical_runs(all_runs, job_id).head(10)
         st.table(historical_df[["finished_at", "is_success", "is_error"]])
+        show_run_durations(dbt, job_id)
         select_run = st.selectbox(
-            "Select historical run to inspect", list(historical_df.index)
+            "Select historical run to inspect",
+            list(historical_df.index),
+            key="historical_run",
         )
-        try:
-            run_result = dbt.get_run_artifacts(select_run)
-        except requests.HTTPError:
+        run_result = details.historical_run_result
+        if select_run != historical_run_id:
+            run_result = get_event_loop().run(
+                fetch_run_results(
+                    dbt,
+                    select_run,
+                    bool(historical_df.loc[select_run, "is_complete"]),
+                    SHARED_CACHE,
+                )
+            )
+        if run_result is None:
             st.text("No run artifacts available")
-            run_result = None
         if run_result and st.button("Show historic run results"):
-            failed_steps = find_failed_results(run_result)
-            list_failed(failed_steps, run_result, manifest, base_url)
+            list_failed(triage_run(run_result, manifest).failures, base_url)
+
+        if show_performance:
+            with METRICS.timer("render_step_seconds", step="node_performance"):
+                show_node_performance(dbt, job_id)
 
 
-@st.cache(ttl=10 * 60)
-def fetch_dbt_data(dbt: DbtCloud) -> Tuple[dict, dict]:
-    """call dbt api for all latest runs and jobs
+@st.cache_resource
+def get_event_loop() -> EventLoopThread:
+    """start one event loop thread per process which all sessions submit api calls to
+
+    Returns:
+        EventLoopThread: shared event loop
+    """
+    return EventLoopThread()
+
+
+@st.cache_resource
+def get_dbt_client(account_id: int) -> AsyncDbtCloud:
+    """create one dbt cloud client per process so its connection pool is reused
+    across reruns and sessions
 
     Args:
-        dbt (DbtCloud): dbt cloud api instance
+        account_id (int): dbt cloud account id
+
+    Returns:
+        AsyncDbtCloud: shared dbt cloud api instance
+    """
+    return AsyncDbtCloud(
+        account_id=account_id,
+        artifact_cache=get_artifact_cache(),
+        rate_limiter=RateLimiter(ACCOUNT_REQUESTS_PER_SECOND, ACCOUNT_REQUEST_BURST),
+        concurrency_limiter=REQUEST_LIMITER,
+    )
+
+
+@st.cache_resource
+def get_artifact_cache() -> ArtifactCache:
+    """one artifact cache per process, shared by the clients of every account
 
     Returns:
-        Tuple[dict, dict]: dict of both runs and jobs
+        ArtifactCache: shared artifact cache
     """
-    all_runs = get_all_runs(dbt)
-    all_jobs = get_all_jobs(dbt)
+    return ArtifactCache(
+        ARTIFACT_CACHE_DIR,
+        ARTIFACT_CACHE_MAX_BYTES,
+        ARTIFACT_CACHE_COMPRESSLEVEL or None,
+    )
+
+
+@st.cache_resource
+def get_run_store(account_id: int) -> RunStore:
+    """open the run store once per process, refreshes only request runs it is missing
 
-    return all_runs, all_jobs
+    Args:
+        account_id (int): dbt cloud account id
 
+    Returns:
+        RunStore: shared run store
+    """
+    return RunStore(RUN_STORE_PATH, account_id)
 
-def merge_runs_jobs_to_df(all_runs, all_jobs, filter_list):
 
-    df_latest_runs = only_latest_runs(all_runs)
-    df_unique_jobs = unique_jobs(all_jobs)
+@st.cache_resource
+def get_poller(account_id: int) -> Poller:
+    """start the background poller once per process, it keeps runs, jobs and the
+    artifacts of failed runs in the shared cache up to date. With WEBHOOK_INGEST it
+    only reconciles the store with the api every RECONCILE_INTERVAL_SECONDS, which
+    corrects missed webhooks and runs whose completion never arrived
 
-    df_latest_runs["project_name"] = (
-        df_latest_runs["project_id"].astype(str).map(PROJECT_MAPPING)
+    Args:
+        account_id (int): dbt cloud account id
+
+    Returns:
+        Poller: running poller
+    """
+    interval = RECONCILE_INTERVAL_SECONDS if WEBHOOK_INGEST else REFRESH_INTERVAL_SECONDS
+    poller = Poller(
+        get_dbt_client(account_id),
+        get_run_store(account_id),
+        SHARED_CACHE,
+        get_event_loop(),
+        interval=interval,
     )
+    poller.start()
+    return poller
 
-    df_latest_runs = df_latest_runs[REQUIRED_COLUMNS_RUNS]
-    df_unique_jobs = df_unique_jobs[REQUIRED_COLUMNS_JOBS]
 
-    merged_df = df_unique_jobs.merge(df_latest_runs, left_index=True, right_index=True)
-    merged_df = merged_df.loc[
-        (merged_df.is_complete == True)  # NOQA: E712
-        & (merged_df["project_id"].isin(filter_list))
-    ]
-    failed_runs_df = merged_df.loc[merged_df.is_success == False]  # NOQA: E712
-    successful_runs_df = merged_df.loc[merged_df.is_success == True]  # NOQA: E712
+def fetch_dbt_data(clients: List[AsyncDbtCloud]) -> Tuple[dict, dict]:
+    """sync runs and jobs of every account into the run store and read the latest
+    run of every job, the accounts are fetched together so latency does not grow
+    with their number. Results are shared by all sessions and refreshed in the
+    background once they are older than REFRESH_INTERVAL_SECONDS
+
+    With WEBHOOK_INGEST the sidecar writes finished runs to the run store, which is
+    only read again once its version changed. The api is synced here only until the
+    first full sync of an account completed, later syncs are left to its poller
+
+    Args:
+        clients (List[AsyncDbtCloud]): dbt cloud api instance of every account
+
+    Returns:
+        Tuple[dict, dict]: dict of both latest runs and jobs of all accounts
+    """
+
+    def fetch(dbt: AsyncDbtCloud):
+        store = get_run_store(dbt.account_id)
+        if WEBHOOK_INGEST and store.is_synced():
+            return SHARED_CACHE.get(
+                (*runs_and_jobs_key(dbt), store.version),
+                lambda: asyncio.get_event_loop().run_in_executor(
+                    None, read_runs_and_jobs, store
+                ),
+                math.inf,
+            )
+        return SHARED_CACHE.get(
+            runs_and_jobs_key(dbt), lambda: fetch_runs_and_jobs(dbt, store)
+        )
+
+    async def fetch_all():
+        return await asyncio.gather(
+            *(fetch(dbt) for dbt in clients), return_exceptions=True
+        )
+
+    with METRICS.timer("render_step_seconds", step="fetch_dbt_data"):
+        results = get_event_loop().run(fetch_all())
+    accounts_runs_and_jobs = {}
+    for dbt, result in zip(clients, results):
+        if isinstance(result, Exception):
+            st.warning(f"Fetching runs of account {dbt.account_id} failed: {result}")
+            continue
+        accounts_runs_and_jobs[dbt.account_id] = result
+    return combine_runs_and_jobs(accounts_runs_and_jobs)
 
-    return failed_runs_df, successful_runs_df, merged_df
 
+def run_stats(dbt: AsyncDbtCloud) -> pd.DataFrame:
+    """rolling run statistics of every job of the account, memoized by the
+    version of its run store so they are computed once per sync
 
-def list_failed(failed_steps, run_results, manifest, base_url):
+    Args:
+        dbt (AsyncDbtCloud): dbt cloud api instance of the account
+
+    Returns:
+        pd.DataFrame: shared frame as returned by rolling_run_stats, which must
+        not be mutated
+    """
+    store = get_run_store(dbt.account_id)
+    return MERGE_MEMO.get(
+        ("run_stats", dbt.account_id, store.version),
+        lambda: rolling_run_stats(run_history(store, TREND_HISTORY_RUNS)),
+    )
+
+
+def show_job_trends(clients: List[AsyncDbtCloud], all_jobs: dict):
+    """output the jobs of every account whose latest runs got slower than the
+    runs before them
+
+    Args:
+        clients (List[AsyncDbtCloud]): dbt cloud api instance of every account
+        all_jobs (dict): jobs as returned by fetch_dbt_data
+    """
+    trends = pd.concat(
+        [
+            job_trends(run_stats(dbt)).assign(account_id=dbt.account_id)
+            for dbt in clients
+        ]
+    )
+    names = pd.DataFrame.from_records(
+        all_jobs["data"], columns=["id", "account_id", "name"]
+    ).rename(columns={"id": "job_id"})
+    trends = (
+        trends.rename_axis("job_id")
+        .reset_index()
+        .merge(names, on=["job_id", "account_id"], how="left")
+        .set_index("name")
+        .sort_values("slowdown", ascending=False)
+    )
+    st.title("Job duration trends")
+    st.text("Median duration of the latest 10 runs against the runs before (seconds)")
+    st.table(
+        trends.loc[trends["slowdown"] > 1].head(20)[
+            [
+                "latest_seconds",
+                "recent_median_seconds",
+                "older_median_seconds",
+                "slowdown",
+                "recent_outliers",
+                "recent_success_rate",
+                "older_success_rate",
+                "recent_queued_seconds",
+                "older_queued_seconds",
+            ]
+        ]
+    )
+
+
+def show_run_durations(dbt: AsyncDbtCloud, job_id: int):
+    """output the duration of the latest runs of the job against its rolling
+    median, and the runs which took unusually long
+
+    Args:
+        dbt (AsyncDbtCloud): dbt cloud api instance
+        job_id (int): selected job id
+    """
+    stats = run_stats(dbt)
+    job_stats = stats.loc[stats["job_id"].to_numpy() == job_id]
+    if job_stats.empty:
+        return
+    st.text("Run duration and rolling median of the previous runs (seconds)")
+    st.line_chart(job_stats.set_index("finished_at")[["run_seconds", "median_seconds"]])
+    outliers = job_stats.loc[job_stats["is_outlier"]]
+    if len(outliers):
+        st.text("Unusually long runs")
+        st.table(
+            outliers.set_index("run_id")[
+                ["finished_at", "run_seconds", "median_seconds", "is_success"]
+            ]
+        )
+
+
+def show_triage_summary(triage: RunTriage):
+    """output counts by status and resource type and the slowest nodes of a run
+
+    Args:
+        triage (RunTriage): triage of the selected run
+    """
+    st.subheader("Run summary")
+    if triage.status_counts.empty:
+        st.text("The run has no node results")
+        return
+    for column, (status, count) in zip(
+        st.columns(len(triage.status_counts)), triage.status_counts.items()
+    ):
+        column.metric(status, int(count))
+    st.table(triage.resource_type_counts)
+    st.text("Slowest nodes")
+    st.table(triage.slowest)
+
+
+def show_failure_impact(triage: RunTriage, manifest: ManifestIndex):
+    """output what every failure leaves stale downstream and the upstream nodes
+    several failures have in common
+
+    Args:
+        triage (RunTriage): triage of the selected run
+        manifest (ManifestIndex): index of the manifest of the run
+    """
+    if triage.failures.empty:
+        return
+    lineage = manifest.lineage()
+    failed_ids = triage.failures["unique_id"]
+    st.subheader("Failure impact")
+    st.table(
+        failure_impact(lineage, failed_ids)[
+            ["unique_id", "stale", "exposures", "root_causes"]
+        ]
+    )
+    shared = shared_ancestors(lineage, failed_ids)
+    if len(shared):
+        st.text("Upstream nodes shared by several failures")
+        st.table(shared)
+
+
+def show_node_performance(dbt: AsyncDbtCloud, job_id: int):
+    """output the slowest nodes and the nodes which got slower in the latest run
+    from the node timings stored so far, the timings of runs not ingested yet are
+    collected in the background
+
+    Args:
+        dbt (AsyncDbtCloud): dbt cloud api instance
+        job_id (int): selected job id
+    """
+    store = get_run_store(dbt.account_id)
+    previous = HISTORY_INGESTS.get((dbt.account_id, job_id))
+    if previous is not None and previous.done() and previous.exception():
+        st.warning(f"Collecting node timings failed: {previous.exception()}")
+    ingest = ingest_in_background(dbt, store, job_id)
+    timings = node_timings(store, job_id, runs=NODE_HISTORY_RUNS)
+
+    st.title("Node performance")
+    if not ingest.done():
+        st.info("Node timings of more runs are being collected, rerun to see them")
+    if timings.empty:
+        st.text("No node timings available for this job")
+        return
+    st.text(f"Slowest nodes over the last {timings['run_id'].nunique()} runs (seconds)")
+    st.table(node_duration_stats(timings).head(20))
+    st.text("Nodes slower in the latest run than in the runs before (seconds)")
+    st.table(duration_regressions(timings))
+
+
+def ingest_in_background(dbt: AsyncDbtCloud, store: RunStore, job_id: int) -> Future:
+    """ingest node results of the latest runs of the job on the shared loop without
+    waiting for it, a job has at most one ingest running for all sessions
+
+    Args:
+        dbt (AsyncDbtCloud): dbt cloud api instance
+        store (RunStore): store to write node results to
+        job_id (int): job to ingest
+
+    Returns:
+        Future: ingest running or finished for the job
+    """
+    key = (dbt.account_id, job_id)
+    ingest = HISTORY_INGESTS.get(key)
+    if ingest is None or ingest.done():
+        ingest = asyncio.run_coroutine_threadsafe(
+            ingest_job_history(dbt, store, job_id, runs=NODE_HISTORY_RUNS),
+            get_event_loop().loop,
+        )
+        HISTORY_INGESTS[key] = ingest
+    return ingest
+
+
+def show_debug_panel():
+    """output cache hit ratios and the recorded latencies in the sidebar, with the
+    metrics of the process to download as prometheus text or JSON
+    """
+    st.sidebar.subheader("Debug metrics")
+    snapshot = METRICS.snapshot()
+    lookups = {
+        (name, entry["labels"]["result"]): entry["value"]
+        for kind in ("counters", "gauges")
+        for name, series in snapshot[kind].items()
+        if name.endswith("lookups") or name.endswith("lookups_total")
+        for entry in series
+    }
+    for name, label in [
+        ("shared_cache_lookups", "Shared cache hit ratio"),
+        ("merge_memo_lookups", "Merge memo hit ratio"),
+        ("artifact_cache_lookups_total", "Artifact cache hit ratio"),
+    ]:
+        hits = lookups.get((name, "hit"), 0) + lookups.get((name, "stale"), 0)
+        ratio = hit_ratio(hits, lookups.get((name, "miss"), 0))
+        st.sidebar.metric(label, f"{ratio:.0%}")
+
+    rows = [
+        {
+            "metric": name,
+            "labels": ", ".join(f"{k}={v}" for k, v in entry["labels"].items()),
+            "count": entry["count"],
+            "mean seconds": entry["sum"] / entry["count"] if entry["count"] else 0.0,
+        }
+        for name, series in sorted(snapshot["histograms"].items())
+        for entry in series
+    ]
+    st.sidebar.dataframe(pd.DataFrame.from_records(rows))
+    counters = [
+        {
+            "metric": name,
+            "labels": ", ".join(f"{k}={v}" for k, v in entry["labels"].items()),
+            "value": entry["value"],
+        }
+        for name, series in sorted(snapshot["counters"].items())
+        for entry in series
+    ]
+    st.sidebar.dataframe(pd.DataFrame.from_records(counters))
+    st.sidebar.download_button(
+        "Download metrics (prometheus)", METRICS.to_prometheus(), "metrics.prom"
+    )
+    st.sidebar.download_button(
+        "Download metrics (JSON)", METRICS.to_json(), "metrics.json"
+    )
+
+
+def list_failed(failures: pd.DataFrame, base_url: str):
     """output failed results with details from run results and manifest as expandable
 
     Args:
-        failed_steps ([type]): [description]
-        run_results ([type]): [description]
-        manifest ([type]): [description]
-        base_url ([type]): [description]
+        failures (pd.DataFrame): failures of a RunTriage, joined with manifest fields
+        base_url (str): repository url the file paths are relative to
     """
-    if len(failed_steps):
+    if len(failures):
         st.text("Failed steps")
-        for failed in failed_steps:
-            unique_id = failed[0]
-            path = manifest["nodes"][unique_id]["original_file_path"]
+        for index, failure in failures.iterrows():
+            path = failure["original_file_path"]
 
-            with st.beta_expander(f"{failed[1]}   : {failed[0]}"):
+            with st.expander(f"{index}   : {failure['unique_id']}"):
                 link = f"[{path}]({base_url}{path})"
                 st.markdown(link, unsafe_allow_html=True)
-                info_json = create_info_json(manifest, failed, run_results)
+                info_json = create_info_json(failure)
                 st.json(info_json)
     else:
         st.text("No failed steps found")
 
 
-def create_info_json(manifest: dict, failed: tuple, run_results: dict) -> dict:
+def create_info_json(failure: pd.Series) -> dict:
 
     """Create json blob containing useful info pulled from manifest and run results
     Order here is for sake of presentation within streamlit app
@@ -224,11 +638,18 @@ def create_info_json(manifest: dict, failed: tuple, run_results: dict) -> dict:
     """
 
     info_blob = {}
-    info_blob["Type"] = manifest["nodes"][failed[0]]["resource_type"]
-    info_blob["Status"] = run_results["results"][failed[1]]["status"]
-    info_blob["Message"] = run_results["results"][failed[1]]["message"]
-    info_blob["Raw SQL"] = manifest["nodes"][failed[0]]["raw_sql"]
-    info_blob["Timing"] = run_results["results"][failed[1]]["timing"]
-    info_blob["Depends On"] = manifest["nodes"][failed[0]]["depends_on"]
+    info_blob["Type"] = failure["resource_type"]
+    info_blob["Status"] = failure["status"]
+    info_blob["Message"] = failure["message"]
+    info_blob["Raw SQL"] = failure["raw_sql"]
+    info_blob["Timing"] = failure["timing"]
+    info_blob["Depends On"] = failure["depends_on"]
 
     return info_blob
+
+
+# started with the process instead of the first render, see src/poller.py for
+# starting it with the container
+if ENABLE_POLLER or WEBHOOK_INGEST:
+    for account_id in ACCOUNT_IDS:
+        get_poller(account_id)
@@ -0,0 +1,173 @@
+"""Background poller keeping runs, jobs and the artifacts of failed runs warm
+
+The dashboard starts one per account with ENABLE_POLLER, and with WEBHOOK_INGEST one
+reconciling the run store with the api every RECONCILE_INTERVAL_SECONDS. To have the
+run store and the artifact cache warm before anyone opens the dashboard, ie after
+scaling to zero, start it with the container instead:
+
+    API_TOKEN=... ACCOUNT_IDS=... python -m src.poller
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Set
+
+import aiohttp
+
+from src.artifact_cache import ArtifactCache
+from src.async_classes import AsyncDbtCloud, EventLoopThread, RateLimiter
+from src.dbt_dashboard import fetch_run_details, fetch_runs_and_jobs, runs_and_jobs_key
+from src.run_store import RunStore
+from src.shared.cache import SharedCache
+
+logger = logging.getLogger(__name__)
+
+
+def is_failed(run: dict) -> bool:
+    """whether the run finished without success and was not cancelled"""
+    return bool(
+        run.get("is_complete")
+        and not run.get("is_success")
+        and not run.get("is_cancelled")
+    )
+
+
+class Poller:
+    """
+    Background task on the shared event loop which keeps the dashboard data warm.
+    On every tick it syncs runs and jobs into the store and the shared cache, then
+    downloads run results and builds the manifest index of the latest run of every
+    job that failed, as those are the runs people open. Page renders then only
+    read data which is already local
+    """
+
+    def __init__(
+        self,
+        dbt: AsyncDbtCloud,
+        store: RunStore,
+        cache: SharedCache,
+        loop: EventLoopThread,
+        interval: float = 30,
+    ):
+        self.dbt = dbt
+        self.store = store
+        self.cache = cache
+        self.loop = loop
+        self.interval = interval
+        self._prefetched: Set[int] = set()
+        self._future = None
+
+    @property
+    def running(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def start(self):
+        if not self.running:
+            self._future = asyncio.run_coroutine_threadsafe(self._run(), self.loop.loop)
+
+    def stop(self):
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Polling dbt cloud failed")
+            await asyncio.sleep(self.interval)
+
+    async def poll_once(self) -> int:
+        """refresh runs and jobs and prefetch artifacts of newly failed runs
+
+        Returns:
+            int: number of failed runs whose artifacts were prefetched
+        """
+        # joins a sync sessions already started instead of syncing the store twice
+        runs_and_jobs = await self.cache.refresh(
+            runs_and_jobs_key(self.dbt),
+            lambda: fetch_runs_and_jobs(self.dbt, self.store),
+        )
+
+        latest_runs, _ = runs_and_jobs
+        failed = [
+            run["id"]
+            for run in latest_runs["data"]
+            if is_failed(run) and run["id"] not in self._prefetched
+        ]
+        results = await asyncio.gather(
+            *(
+                fetch_run_details(self.dbt, run_id, None, cache=self.cache)
+                for run_id in failed
+            ),
+            return_exceptions=True,
+        )
+        prefetched = 0
+        for run_id, result in zip(failed, results):
+            if isinstance(result, aiohttp.ClientResponseError) and result.status == 404:
+                # the run produced no artifacts, there is nothing to retry
+                self._prefetched.add(run_id)
+                continue
+            if isinstance(result, Exception):
+                logger.warning("Prefetching run %s failed: %s", run_id, result)
+                continue
+            self._prefetched.add(run_id)
+            prefetched += 1
+        return prefetched
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    account_ids = [
+        int(account_id)
+        for account_id in os.environ.get(
+            "ACCOUNT_IDS", os.environ.get("ACCOUNT_ID", "")
+        ).split(",")
+        if account_id.strip()
+    ]
+    artifact_cache = ArtifactCache(
+        os.environ.get("ARTIFACT_CACHE_DIR", ".artifact_cache"),
+        int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 2 * 1024 ** 3)),
+        int(os.environ.get("ARTIFACT_CACHE_COMPRESSLEVEL", 6)) or None,
+    )
+    run_store_path = os.environ.get("RUN_STORE_PATH", ".run_store.sqlite")
+    requests_per_second = float(os.environ.get("ACCOUNT_REQUESTS_PER_SECOND", 10))
+    request_burst = int(os.environ.get("ACCOUNT_REQUEST_BURST", 4))
+    interval = int(os.environ.get("REFRESH_INTERVAL_SECONDS", 30))
+    if os.environ.get("WEBHOOK_INGEST", "false").lower() in ("1", "true"):
+        interval = int(os.environ.get("RECONCILE_INTERVAL_SECONDS", 900))
+    loop = EventLoopThread()
+    cache = SharedCache()
+    pollers = [
+        Poller(
+            AsyncDbtCloud(
+                account_id,
+                artifact_cache=artifact_cache,
+                rate_limiter=RateLimiter(requests_per_second, request_burst),
+            ),
+            RunStore(run_store_path, account_id),
+            cache,
+            loop,
+            interval=interval,
+        )
+        for account_id in account_ids
+    ]
+    for poller in pollers:
+        poller.start()
+    logger.info("Polling accounts %s", account_ids)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for poller in pollers:
+            poller.stop()
+        loop.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,489 @@
+from contextlib import contextmanager
+import json
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    account_id INTEGER NOT NULL,
+    job_id INTEGER,
+    project_id INTEGER,
+    environment_id INTEGER,
+    status INTEGER,
+    status_humanized TEXT,
+    is_complete INTEGER NOT NULL,
+    is_success INTEGER,
+    is_error INTEGER,
+    is_cancelled INTEGER,
+    created_at TEXT,
+    started_at TEXT,
+    finished_at TEXT,
+    queued_seconds REAL,
+    run_seconds REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_job_finished ON runs (account_id, job_id, finished_at);
+CREATE INDEX IF NOT EXISTS runs_job_started ON runs (account_id, job_id, started_at);
+CREATE INDEX IF NOT EXISTS runs_finished ON runs (account_id, finished_at);
+CREATE INDEX IF NOT EXISTS runs_pending ON runs (account_id) WHERE is_complete = 0;
+-- covers run_durations, the history of every job is read without the data column
+CREATE INDEX IF NOT EXISTS runs_job_durations ON runs (
+    account_id, job_id, finished_at, is_complete, is_cancelled, is_success,
+    queued_seconds, run_seconds
+);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    account_id INTEGER NOT NULL,
+    project_id INTEGER,
+    environment_id INTEGER,
+    name TEXT,
+    state INTEGER,
+    created_at TEXT,
+    next_run TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_account ON jobs (account_id);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    id INTEGER PRIMARY KEY,
+    unique_id TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS node_results (
+    run_id INTEGER NOT NULL,
+    node_id INTEGER NOT NULL,
+    status TEXT,
+    execution_time REAL,
+    PRIMARY KEY (run_id, node_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS node_result_runs (
+    run_id INTEGER PRIMARY KEY
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# tables synced from the api, see RunStore.is_synced
+TABLES = ("runs", "jobs")
+RUN_COLUMNS = (
+    "id",
+    "account_id",
+    "job_id",
+    "project_id",
+    "environment_id",
+    "status",
+    "status_humanized",
+    "is_complete",
+    "is_success",
+    "is_error",
+    "is_cancelled",
+    "created_at",
+    "started_at",
+    "finished_at",
+    "queued_seconds",
+    "run_seconds",
+    "data",
+)
+JOB_COLUMNS = (
+    "id",
+    "account_id",
+    "project_id",
+    "environment_id",
+    "name",
+    "state",
+    "created_at",
+    "next_run",
+    "data",
+)
+
+
+def duration_to_seconds(duration: Optional[str]) -> Optional[float]:
+    """convert a dbt api duration like "00:01:23" to seconds
+
+    Args:
+        duration (Optional[str]): duration as returned by the api
+
+    Returns:
+        Optional[float]: seconds or None when the duration is missing or malformed
+    """
+    if not duration:
+        return None
+    try:
+        hours, minutes, seconds = duration.split(":")
+        return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    except ValueError:
+        return None
+
+
+class RunStore:
+    """
+    Persistent store of dbt runs and jobs in SQLite, kept up to date incrementally.
+    A finished run never changes, so only runs that are new or were still in progress
+    at the last sync have to be requested again. Runs are indexed by job and
+    finished_at so the history of a job can be queried without loading other runs.
+
+    The whole api payload is kept in the data column, the typed columns next to it
+    are what queries filter and sort on
+    """
+
+    def __init__(self, path: str, account_id: int):
+        self.path = path
+        self.account_id = account_id
+        # reentrant, so queries can run inside read_transaction
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            # readers in other processes (ie a webhook sidecar) do not block writers
+            self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(SCHEMA)
+
+    def _query(self, sql: str, params: tuple = ()) -> list:
+        with self._lock:
+            return self._connection.execute(sql, params).fetchall()
+
+    @contextmanager
+    def read_transaction(self):
+        """read the version and data of the store in one snapshot, writes committed
+        meanwhile, by this process or another, are not seen until the block exits
+
+        Yields:
+            RunStore: the store
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                yield self
+            finally:
+                self._connection.execute("COMMIT")
+
+    def __len__(self) -> int:
+        return self._query(
+            "SELECT COUNT(*) FROM runs WHERE account_id = ?", (self.account_id,)
+        )[0][0]
+
+    def __contains__(self, run_id: int) -> bool:
+        return bool(
+            self._query(
+                "SELECT 1 FROM runs WHERE id = ? AND account_id = ?",
+                (run_id, self.account_id),
+            )
+        )
+
+    @property
+    def version(self) -> int:
+        """counter increased by every write that changed the runs or jobs of the
+        account, in any process"""
+        rows = self._query(
+            "SELECT value FROM meta WHERE key = ?", (f"version_{self.account_id}",)
+        )
+        return rows[0][0] if rows else 0
+
+    def is_synced(self, *tables: str) -> bool:
+        """whether the runs or jobs of the account were synced from the api in full
+        at least once, as opposed to only holding runs written by webhooks
+
+        Args:
+            tables (str): runs and/or jobs, both when none are given
+
+        Returns:
+            bool: whether every table was synced
+        """
+        keys = [f"synced_{table}_{self.account_id}" for table in tables or TABLES]
+        rows = self._query(
+            f"SELECT COUNT(*) FROM meta WHERE key IN ({', '.join('?' * len(keys))})",
+            tuple(keys),
+        )
+        return rows[0][0] == len(keys)
+
+    def mark_synced(self, table: str):
+        """record that the runs or jobs of the account were synced in full"""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES (?, 1)",
+                (f"synced_{table}_{self.account_id}",),
+            )
+
+    def is_finished(self, run_id: int) -> bool:
+        """whether the run is stored and was complete when it was stored"""
+        return bool(
+            self._query(
+                "SELECT 1 FROM runs "
+                "WHERE id = ? AND account_id = ? AND is_complete = 1",
+                (run_id, self.account_id),
+            )
+        )
+
+    def pending_run_ids(self) -> List[int]:
+        """ids of stored runs which had not finished at the last sync"""
+        rows = self._query(
+            "SELECT id FROM runs WHERE account_id = ? AND is_complete = 0",
+            (self.account_id,),
+        )
+        return [row[0] for row in rows]
+
+    def _run_row(self, run: dict) -> tuple:
+        return (
+            run["id"],
+            self.account_id,
+            run.get("job_id"),
+            run.get("project_id"),
+            run.get("environment_id"),
+            run.get("status"),
+            run.get("status_humanized"),
+            bool(run.get("is_complete")),
+            run.get("is_success"),
+            run.get("is_error"),
+            run.get("is_cancelled"),
+            run.get("created_at"),
+            run.get("started_at"),
+            run.get("finished_at"),
+            duration_to_seconds(run.get("queued_duration")),
+            duration_to_seconds(run.get("run_duration")),
+            json.dumps(run, sort_keys=True),
+        )
+
+    def _job_row(self, job: dict) -> tuple:
+        return (
+            job["id"],
+            self.account_id,
+            job.get("project_id"),
+            job.get("environment_id"),
+            job.get("name"),
+            job.get("state"),
+            job.get("created_at"),
+            job.get("next_run"),
+            json.dumps(job, sort_keys=True),
+        )
+
+    def _upsert(self, table: str, columns: tuple, rows: List[tuple]) -> int:
+        placeholders = ", ".join("?" * len(columns))
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders}) "
+            f"ON CONFLICT (id) DO UPDATE SET {updates} "
+            f"WHERE {table}.data != excluded.data"
+        )
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(sql, rows)
+            changed = self._connection.total_changes - before
+            if changed:
+                self._bump_version()
+        return changed
+
+    def _bump_version(self):
+        self._connection.execute(
+            "INSERT INTO meta (key, value) VALUES (?, 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1",
+            (f"version_{self.account_id}",),
+        )
+
+    def upsert(self, runs: Iterable[dict]) -> int:
+        """insert new runs and replace stored ones with the same id
+
+        Args:
+            runs (Iterable[dict]): runs as returned by the dbt api
+
+        Returns:
+            int: number of runs which were added or changed
+        """
+        return self._upsert("runs", RUN_COLUMNS, [self._run_row(run) for run in runs])
+
+    def delete(self, run_ids: Iterable[int]) -> int:
+        """remove runs which no longer exist in dbt Cloud
+
+        Args:
+            run_ids (Iterable[int]): ids of the runs
+
+        Returns:
+            int: number of runs which were removed
+        """
+        rows = [(run_id, self.account_id) for run_id in run_ids]
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                "DELETE FROM runs WHERE id = ? AND account_id = ?", rows
+            )
+            changed = self._connection.total_changes - before
+            if changed:
+                self._bump_version()
+        return changed
+
+    def upsert_jobs(self, jobs: Iterable[dict]) -> int:
+        """insert new jobs and replace stored ones with the same id
+
+        Args:
+            jobs (Iterable[dict]): jobs as returned by the dbt api
+
+        Returns:
+            int: number of jobs which were added or changed
+        """
+        return self._upsert("jobs", JOB_COLUMNS, [self._job_row(job) for job in jobs])
+
+    def runs(
+        self, job_id: int = None, limit: int = None, since: str = None
+    ) -> List[dict]:
+        """stored runs latest finished first, unfinished runs come last
+
+        Args:
+            job_id (int, optional): only runs of this job
+            limit (int, optional): maximum number of runs
+            since (str, optional): only runs finished at or after this timestamp
+
+        Returns:
+            List[dict]: runs as returned by the dbt api
+        """
+        sql = "SELECT data FROM runs WHERE account_id = ?"
+        params = [self.account_id]
+        if job_id is not None:
+            sql += " AND job_id = ?"
+            params.append(job_id)
+        if since is not None:
+            sql += " AND finished_at >= ?"
+            params.append(since)
+        sql += " ORDER BY finished_at DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [json.loads(row[0]) for row in self._query(sql, tuple(params))]
+
+    def latest_runs(self) -> List[dict]:
+        """the latest started run of every job
+
+        Returns:
+            List[dict]: one run per job as returned by the dbt api
+        """
+        # sqlite returns the bare column from the row holding the MAX
+        rows = self._query(
+            "SELECT data, MAX(started_at) FROM runs "
+            "WHERE account_id = ? GROUP BY job_id",
+            (self.account_id,),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def jobs(self) -> List[dict]:
+        """all stored jobs, latest created first
+
+        Returns:
+            List[dict]: jobs as returned by the dbt api
+        """
+        rows = self._query(
+            "SELECT data FROM jobs WHERE account_id = ? ORDER BY created_at DESC",
+            (self.account_id,),
+        )
+        return [json.loads(row[0]) for row in rows]
+
+    def run_durations(self, runs_per_job: int = None) -> List[tuple]:
+        """timing of the latest finished runs of every job in one query, read from
+        the typed columns only so no api payload is parsed. Cancelled runs are left
+        out, their duration says nothing about the job
+
+        Args:
+            runs_per_job (int, optional): number of latest runs per job
+
+        Returns:
+            List[tuple]: job id, run id, finished_at, is_success, queued seconds and
+            run seconds, by job and oldest first
+        """
+        sql = (
+            "SELECT job_id, id, finished_at, is_success, queued_seconds, run_seconds "
+            "FROM (SELECT job_id, id, finished_at, is_success, queued_seconds, "
+            "run_seconds, ROW_NUMBER() OVER ("
+            "PARTITION BY job_id ORDER BY finished_at DESC) AS position "
+            "FROM runs WHERE account_id = ? AND is_complete = 1 "
+            "AND job_id IS NOT NULL AND NOT COALESCE(is_cancelled, 0))"
+        )
+        params = [self.account_id]
+        if runs_per_job is not None:
+            sql += " WHERE position <= ?"
+            params.append(runs_per_job)
+        sql += " ORDER BY job_id, finished_at"
+        return self._query(sql, tuple(params))
+
+    def ingested_run_ids(self, run_ids: Iterable[int]) -> Set[int]:
+        """which of the runs already have their node results stored
+
+        Args:
+            run_ids (Iterable[int]): run ids to check
+
+        Returns:
+            Set[int]: run ids with stored node results
+        """
+        run_ids = list(run_ids)
+        ingested = set()
+        for start in range(0, len(run_ids), 500):
+            batch = run_ids[start : start + 500]
+            rows = self._query(
+                "SELECT run_id FROM node_result_runs "
+                f"WHERE run_id IN ({', '.join('?' * len(batch))})",
+                tuple(batch),
+            )
+            ingested.update(row[0] for row in rows)
+        return ingested
+
+    def add_node_results(
+        self, run_id: int, results: Iterable[Tuple[str, str, Optional[float]]]
+    ):
+        """store status and execution time of every node of a run, node unique ids
+        are interned so each result row is a few integers and a float. A run without
+        results is recorded too so it is not requested again
+
+        Args:
+            run_id (int): run the results belong to
+            results (Iterable[Tuple[str, str, Optional[float]]]): unique id, status
+                and execution time of each node
+        """
+        results = list(results)
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO nodes (unique_id) VALUES (?)",
+                [(unique_id,) for unique_id, _, _ in results],
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO node_results "
+                "(run_id, node_id, status, execution_time) "
+                "SELECT ?, id, ?, ? FROM nodes WHERE unique_id = ?",
+                [
+                    (run_id, status, execution_time, unique_id)
+                    for unique_id, status, execution_time in results
+                ],
+            )
+            self._connection.execute(
+                "INSERT OR IGNORE INTO node_result_runs (run_id) VALUES (?)", (run_id,)
+            )
+
+    def node_results(self, job_id: int, limit: int = None) -> List[tuple]:
+        """node results of the latest finished runs of a job
+
+        Args:
+            job_id (int): job to read the results of
+            limit (int, optional): number of latest runs to read
+
+        Returns:
+            List[tuple]: run id, finished_at, unique id, status and execution time
+        """
+        sql = (
+            "SELECT runs.id, runs.finished_at, nodes.unique_id, node_results.status, "
+            "node_results.execution_time FROM ("
+            "SELECT id, finished_at FROM runs "
+            "WHERE account_id = ? AND job_id = ? AND is_complete = 1 "
+            "ORDER BY finished_at DESC"
+        )
+        params = [self.account_id, job_id]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        sql += (
+            ") AS runs JOIN node_results ON node_results.run_id = runs.id "
+            "JOIN nodes ON nodes.id = node_results.node_id"
+        )
+        return self._query(sql, tuple(params))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
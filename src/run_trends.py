@@ -0,0 +1,120 @@
+import pandas as pd
+
+from src.run_store import RunStore
+
+HISTORY_COLUMNS = [
+    "job_id",
+    "run_id",
+    "finished_at",
+    "is_success",
+    "queued_seconds",
+    "run_seconds",
+]
+
+
+def run_history(store: RunStore, runs_per_job: int = 200) -> pd.DataFrame:
+    """duration, queue time and outcome of the latest runs of every job
+
+    Args:
+        store (RunStore): store holding the synced runs
+        runs_per_job (int): number of latest finished runs per job
+
+    Returns:
+        pd.DataFrame: one row per run, by job and oldest first
+    """
+    history = pd.DataFrame.from_records(
+        store.run_durations(runs_per_job), columns=HISTORY_COLUMNS
+    )
+    history["finished_at"] = pd.to_datetime(history["finished_at"], utc=True)
+    history["is_success"] = history["is_success"].fillna(False).astype(bool)
+    for column in ("queued_seconds", "run_seconds"):
+        history[column] = pd.to_numeric(history[column])
+    return history
+
+
+def rolling_run_stats(
+    history: pd.DataFrame,
+    window: int = 20,
+    min_periods: int = 5,
+    iqr_factor: float = 3,
+    min_seconds: float = 60,
+) -> pd.DataFrame:
+    """rolling statistics of the runs of every job, computed for all jobs in one
+    batched pass. Each run is compared with the window of runs before it, so a
+    slow run does not raise its own baseline
+
+    A run is an outlier when its duration exceeds the third quartile of the
+    previous runs by iqr_factor interquartile ranges and their median by at least
+    min_seconds, which keeps jitter of short jobs from being reported
+
+    Args:
+        history (pd.DataFrame): as returned by run_history
+        window (int): number of previous runs the statistics cover
+        min_periods (int): fewer previous runs give no statistics and no outliers
+        iqr_factor (float): interquartile ranges above the third quartile
+        min_seconds (float): minimum seconds above the median
+
+    Returns:
+        pd.DataFrame: history with the rolling median, p25 and p75 duration, the
+        success rate and median queue time, and an is_outlier flag per run
+    """
+    jobs = history["job_id"]
+    previous = history.groupby("job_id")[
+        ["run_seconds", "queued_seconds", "is_success"]
+    ].shift(1)
+    previous["is_success"] = previous["is_success"].astype(float)
+
+    def rolling(column: str, function: str, *args) -> pd.Series:
+        window_of = previous[column].groupby(jobs).rolling(window, min_periods)
+        # drop the job level, the rows align with history by their index again
+        return getattr(window_of, function)(*args).droplevel(0)
+
+    stats = history.copy()
+    stats["median_seconds"] = rolling("run_seconds", "median")
+    stats["p25_seconds"] = rolling("run_seconds", "quantile", 0.25)
+    stats["p75_seconds"] = rolling("run_seconds", "quantile", 0.75)
+    stats["success_rate"] = rolling("is_success", "mean")
+    stats["median_queued_seconds"] = rolling("queued_seconds", "median")
+
+    iqr = stats["p75_seconds"] - stats["p25_seconds"]
+    stats["is_outlier"] = (
+        stats["run_seconds"] > stats["p75_seconds"] + iqr_factor * iqr
+    ) & (stats["run_seconds"] >= stats["median_seconds"] + min_seconds)
+    return stats
+
+
+def job_trends(stats: pd.DataFrame, recent_runs: int = 10) -> pd.DataFrame:
+    """per job comparison of its latest runs with the runs before them
+
+    Args:
+        stats (pd.DataFrame): as returned by rolling_run_stats
+        recent_runs (int): number of latest runs compared with the older ones
+
+    Returns:
+        pd.DataFrame: by job id the number of runs, latest duration, median
+        duration and queue time and success rate of the recent and the older runs,
+        the slowdown ratio of the medians and the recent outliers, largest
+        slowdown first
+    """
+    from_end = stats.groupby("job_id").cumcount(ascending=False)
+    recent = stats.loc[from_end < recent_runs].groupby("job_id")
+    older = stats.loc[from_end >= recent_runs].groupby("job_id")
+
+    trends = pd.DataFrame(
+        {
+            "runs": stats.groupby("job_id").size(),
+            "latest_seconds": recent["run_seconds"].last(),
+            "recent_median_seconds": recent["run_seconds"].median(),
+            "older_median_seconds": older["run_seconds"].median(),
+            "recent_success_rate": recent["is_success"].mean(),
+            "older_success_rate": older["is_success"].mean(),
+            "recent_queued_seconds": recent["queued_seconds"].median(),
+            "older_queued_seconds": older["queued_seconds"].median(),
+            "recent_outliers": recent["is_outlier"].sum(),
+        }
+    )
+    trends["slowdown"] = trends["recent_median_seconds"] / trends[
+        "older_median_seconds"
+    ].where(trends["older_median_seconds"] > 0)
+    trends["recent_outliers"] = trends["recent_outliers"].astype(int)
+    return trends.sort_values("slowdown", ascending=False)
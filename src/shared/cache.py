@@ -0,0 +1,134 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+
+
+class SharedCache:
+    """
+    Process wide cache for the results of api calls, shared by every Streamlit
+    session. Concurrent misses for the same key wait on a single fetch, and expired
+    entries keep being served while one refresh runs in the background.
+
+    All coroutines have to run on the same event loop, see EventLoopThread, which is
+    what makes the bookkeeping safe without locks
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    async def get(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable],
+        ttl: Optional[float] = None,
+    ):
+        """return the cached value for key, fetching it when missing
+
+        Args:
+            key (Hashable): cache key
+            fetch (Callable[[], Awaitable]): creates the coroutine fetching the value
+            ttl (Optional[float]): seconds the value is fresh for, defaults to self.ttl,
+                use math.inf for values which never change
+
+        Returns:
+            the cached or fetched value, possibly stale while it is being refreshed
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if entry.expires_at > time.monotonic():
+                self.hits += 1
+                return entry.value
+            self.stale_hits += 1
+            if key not in self._inflight:
+                refresh = self._start_fetch(key, fetch, ttl)
+                refresh.add_done_callback(self._log_failed_refresh)
+            return entry.value
+
+        self.misses += 1
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start_fetch(key, fetch, ttl)
+        # a session going away must not cancel the fetch other sessions wait on
+        return await asyncio.shield(future)
+
+    async def refresh(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable],
+        ttl: Optional[float] = None,
+    ):
+        """fetch the value for key again even when it is still fresh, joining the
+        fetch already in flight for key instead of starting another one
+
+        Args:
+            key (Hashable): cache key
+            fetch (Callable[[], Awaitable]): creates the coroutine fetching the value
+            ttl (Optional[float]): seconds the value is fresh for, see get
+
+        Returns:
+            the fetched value
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._start_fetch(key, fetch, ttl)
+        return await asyncio.shield(future)
+
+    def _start_fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable], ttl: Optional[float]
+    ) -> asyncio.Future:
+        future = asyncio.ensure_future(self._fetch(key, fetch, ttl))
+        self._inflight[key] = future
+        return future
+
+    async def _fetch(
+        self, key: Hashable, fetch: Callable[[], Awaitable], ttl: Optional[float]
+    ):
+        try:
+            value = await fetch()
+            self.put(key, value, ttl)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _log_failed_refresh(future: asyncio.Future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning("Refreshing cache entry failed", exc_info=future.exception())
+
+    def put(self, key: Hashable, value, ttl: Optional[float] = None):
+        """store a value, evicting the least recently used entries past max_entries"""
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = CacheEntry(value, time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+import threading
+from typing import Any, Callable, Hashable
+
+
+class Memo:
+    """
+    Thread safe, size bounded memo for results derived from cached data, ie
+    dataframes built from the runs and jobs of a given version. Keys have to
+    identify the inputs completely, entries never expire and the least recently
+    used ones are evicted past max_entries.
+
+    Values are shared by every Streamlit session, callers must not mutate them
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, compute: Callable[[], Any]):
+        """return the memoized value for key, computing it when missing
+
+        Args:
+            key (Hashable): memo key
+            compute (Callable[[], Any]): computes the value
+
+        Returns:
+            the memoized or computed value
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # computed outside the lock, two sessions missing together both compute
+        # but neither blocks the other sessions
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
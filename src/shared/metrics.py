@@ -0,0 +1,168 @@
+import bisect
+from contextlib import contextmanager
+import json
+import math
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Tuple
+
+# seconds, covering a cached lookup up to a full manifest download
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, math.inf)
+
+
+class Histogram:
+    """counts of observed values per bucket, with their sum and count"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[Tuple[float, int]]:
+        """(upper bound, observations up to it) per bucket, as prometheus expects"""
+        total = 0
+        cumulative = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return cumulative
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], **extra) -> str:
+    pairs = list(key) + sorted(extra.items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+
+class Metrics:
+    """
+    Process wide registry of counters, latency histograms and gauges for the hot
+    paths of the dashboard, exportable as prometheus text or JSON. Recording takes
+    a lock, it is called from the session threads and the event loop thread alike.
+
+    Gauges are functions read at export time, ie the hit counters of a cache
+    """
+
+    def __init__(self, prefix: str = "dbt_dashboard"):
+        self.prefix = prefix
+        self._counters: Dict[Tuple[str, Hashable], float] = {}
+        self._histograms: Dict[Tuple[str, Hashable], Histogram] = {}
+        self._gauges: Dict[Tuple[str, Hashable], Callable[[], float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """observe the seconds the block takes, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def gauge(self, name: str, function: Callable[[], float], **labels):
+        """register a function whose value is exported as a gauge"""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = function
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        """every metric as plain data, histograms with their cumulative buckets
+
+        Returns:
+            dict: counters, histograms and gauges by name, one entry per label set
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [
+                (key, histogram.cumulative(), histogram.sum, histogram.count)
+                for key, histogram in self._histograms.items()
+            ]
+            gauges = list(self._gauges.items())
+
+        snapshot = {"counters": {}, "histograms": {}, "gauges": {}}
+        for (name, labels), value in counters:
+            snapshot["counters"].setdefault(name, []).append(
+                {"labels": dict(labels), "value": value}
+            )
+        for (name, labels), buckets, total, count in histograms:
+            snapshot["histograms"].setdefault(name, []).append(
+                {
+                    "labels": dict(labels),
+                    "buckets": {_format_bound(bound): n for bound, n in buckets},
+                    "sum": total,
+                    "count": count,
+                }
+            )
+        for (name, labels), function in gauges:
+            snapshot["gauges"].setdefault(name, []).append(
+                {"labels": dict(labels), "value": function()}
+            )
+        return snapshot
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """every metric in the prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = []
+        for kind in ("counters", "gauges"):
+            for name, series in sorted(snapshot[kind].items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} {kind[:-1]}")
+                for entry in series:
+                    labels = _format_labels(_label_key(entry["labels"]))
+                    lines.append(f"{metric}{labels} {entry['value']}")
+        for name, series in sorted(snapshot["histograms"].items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} histogram")
+            for entry in series:
+                key = _label_key(entry["labels"])
+                for bound, count in entry["buckets"].items():
+                    labels = _format_labels(key, le=bound)
+                    lines.append(f"{metric}_bucket{labels} {count}")
+                lines.append(f"{metric}_sum{_format_labels(key)} {entry['sum']}")
+                lines.append(f"{metric}_count{_format_labels(key)} {entry['count']}")
+        return "\n".join(lines) + "\n"
+
+
+def hit_ratio(hits: float, misses: float) -> float:
+    """share of lookups served from a cache, 0 before the first lookup"""
+    total = hits + misses
+    return hits / total if total else 0.0
+
+
+# module level, so every instrumented module records into the same registry
+METRICS = Metrics()
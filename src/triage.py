@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.manifest import ManifestIndex
+
+PASSING_STATUSES = ["success", "pass"]
+RESULT_COLUMNS = [
+    "unique_id",
+    "status",
+    "message",
+    "execution_time",
+    "started_at",
+    "completed_at",
+    "timing",
+]
+MANIFEST_COLUMNS = ["resource_type", "original_file_path", "raw_sql", "depends_on"]
+
+
+@dataclass
+class RunTriage:
+    """
+    Summary of one run: every node result, counts by status and resource type,
+    the slowest nodes and the failed nodes joined with their manifest fields
+    """
+
+    results: pd.DataFrame
+    status_counts: pd.Series
+    resource_type_counts: pd.DataFrame
+    slowest: pd.DataFrame
+    failures: pd.DataFrame
+
+
+def results_to_frame(run_results: dict) -> pd.DataFrame:
+    """turn run_results.json into a dataframe with one row per node in a single pass,
+    the index is the position of the result in run_results["results"]
+
+    Args:
+        run_results (dict): dbt api run artifact json response
+
+    Returns:
+        pd.DataFrame: node results with the execute timing flattened
+    """
+    columns = {column: [] for column in RESULT_COLUMNS}
+    for result in run_results["results"]:
+        timing = result.get("timing") or []
+        execute = next((step for step in timing if step.get("name") == "execute"), {})
+        columns["unique_id"].append(result["unique_id"])
+        columns["status"].append(result["status"])
+        columns["message"].append(result.get("message"))
+        columns["execution_time"].append(result.get("execution_time"))
+        columns["started_at"].append(execute.get("started_at"))
+        columns["completed_at"].append(execute.get("completed_at"))
+        columns["timing"].append(timing)
+
+    # a run without results still gets string columns
+    results = pd.DataFrame(columns).astype({"unique_id": object, "status": object})
+    results["execution_time"] = pd.to_numeric(results["execution_time"])
+    results["resource_type"] = results["unique_id"].str.split(".", n=1).str[0]
+    return results
+
+
+def triage_run(run_results: dict, manifest: ManifestIndex, top: int = 10) -> RunTriage:
+    """build the triage view of a run, the manifest is queried once for all failures
+
+    Args:
+        run_results (dict): dbt api run artifact json response
+        manifest (ManifestIndex): index of the manifest of the run
+        top (int): number of slowest nodes to keep
+
+    Returns:
+        RunTriage: summary of the run
+    """
+    results = results_to_frame(run_results)
+    status_counts = results["status"].value_counts()
+    resource_type_counts = pd.crosstab(results["resource_type"], results["status"])
+    slowest = results.nlargest(top, "execution_time")[
+        ["unique_id", "resource_type", "status", "execution_time"]
+    ]
+
+    failures = results.loc[~results["status"].isin(PASSING_STATUSES)]
+    nodes = manifest.nodes(failures["unique_id"])
+    node_fields = pd.DataFrame.from_records(
+        [node._asdict() for node in nodes.values()],
+        columns=["unique_id"] + MANIFEST_COLUMNS,
+    )
+    # the manifest resource_type wins, the one from the unique_id is a fallback
+    failures = (
+        failures.drop(columns="resource_type")
+        .reset_index()
+        .merge(node_fields, on="unique_id", how="left")
+        .set_index("index")
+        .rename_axis(None)
+    )
+    failures["resource_type"] = failures["resource_type"].fillna(
+        failures["unique_id"].str.split(".", n=1).str[0]
+    )
+    return RunTriage(results, status_counts, resource_type_counts, slowest, failures)
@@ -0,0 +1,288 @@
+"""Sidecar ingesting dbt Cloud job run webhooks into the run store and artifact cache
+
+    WEBHOOK_SECRET=... API_TOKEN=... python -m src.webhook serve [--port 8080] \
+        [--record webhooks]
+    WEBHOOK_SECRET=... python -m src.webhook replay webhooks/*.json \
+        [--url http://127.0.0.1:8080/]
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import hmac
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import os
+import sys
+import threading
+from typing import Dict, List, Optional
+
+from src.artifact_cache import ArtifactCache
+from src.classes import API_BASE, DbtCloud
+from src.run_store import RunStore
+from src.shared.metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# dbt Cloud sends the hex HMAC-SHA256 of the body, keyed with the webhook secret
+SIGNATURE_HEADER = "Authorization"
+RUN_EVENTS = ("job.run.started", "job.run.completed", "job.run.errored")
+FINISHED_EVENTS = ("job.run.completed", "job.run.errored")
+RUN_RESULTS_FILE = "run_results.json"
+# the body is read before its signature is checked, anyone can send one this large
+MAX_BODY_BYTES = 1024 ** 2
+
+
+def signature(secret: str, body: bytes) -> str:
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret: str, body: bytes, received: str) -> bool:
+    """whether the body was signed with the secret, in constant time"""
+    return hmac.compare_digest(signature(secret, body), received or "")
+
+
+class WebhookIngest:
+    """
+    Applies job run events to the run store and artifact cache the dashboard reads,
+    so a finished run shows up without the dashboard calling the api. Only the run
+    of the event and its job are requested, and for finished runs their run results
+    and manifest index are cached ahead of the first session opening them.
+
+    Clients and stores are created per account on the first event of the account
+    """
+
+    def __init__(
+        self,
+        run_store_path: str,
+        artifact_cache: ArtifactCache,
+        api_base: str = API_BASE,
+    ):
+        self.run_store_path = run_store_path
+        self.artifact_cache = artifact_cache
+        self.api_base = api_base
+        self._clients: Dict[int, DbtCloud] = {}
+        self._stores: Dict[int, RunStore] = {}
+        self._lock = threading.Lock()
+
+    def _account(self, account_id: int):
+        with self._lock:
+            if account_id not in self._clients:
+                self._clients[account_id] = DbtCloud(
+                    account_id,
+                    api_base=self.api_base,
+                    artifact_cache=self.artifact_cache,
+                )
+                self._stores[account_id] = RunStore(self.run_store_path, account_id)
+            return self._clients[account_id], self._stores[account_id]
+
+    def ingest(self, event: dict) -> Optional[int]:
+        """store the run of a job run event and cache the artifacts of finished runs
+
+        Args:
+            event (dict): webhook payload
+
+        Returns:
+            Optional[int]: id of the stored run, None for other events
+        """
+        event_type = event.get("eventType")
+        if event_type not in RUN_EVENTS:
+            METRICS.inc("webhook_events_total", event_type=event_type, result="ignored")
+            return None
+
+        run_id = int(event["data"]["runId"])
+        dbt, store = self._account(int(event["accountId"]))
+        with METRICS.timer("webhook_ingest_seconds", event_type=event_type):
+            run = dbt.get_run(run_id)["data"]
+            store.upsert_jobs([dbt.get_job(run["job_id"])["data"]])
+            store.upsert([run])
+            if event_type in FINISHED_EVENTS and run.get("is_complete"):
+                self._cache_artifacts(dbt, run_id)
+        METRICS.inc("webhook_events_total", event_type=event_type, result="ingested")
+        return run_id
+
+    def _cache_artifacts(self, dbt: DbtCloud, run_id: int):
+        import requests
+
+        try:
+            dbt.get_artifact_path(run_id, RUN_RESULTS_FILE)
+            dbt.get_run_manifest_index(run_id)
+        except requests.exceptions.HTTPError as error:
+            # runs failing before compilation have no artifacts
+            logger.info("Run %s has no artifacts: %s", run_id, error)
+
+    def ingest_logged(self, event: dict):
+        try:
+            self.ingest(event)
+        except Exception:
+            METRICS.inc(
+                "webhook_events_total",
+                event_type=event.get("eventType"),
+                result="error",
+            )
+            logger.exception("Ingesting webhook event %s failed", event.get("eventId"))
+
+    def close(self):
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: "WebhookServer"
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            return self._send(400, b"invalid content length")
+        if not 0 <= length <= MAX_BODY_BYTES:
+            return self._send(413, b"payload too large")
+        body = self.rfile.read(length)
+        if not verify_signature(
+            self.server.secret, body, self.headers.get(SIGNATURE_HEADER)
+        ):
+            METRICS.inc("webhook_events_total", result="bad_signature")
+            return self._send(403, b"invalid signature")
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return self._send(400, b"invalid json")
+        if not isinstance(event, dict):
+            return self._send(400, b"invalid event")
+
+        if self.server.record_directory:
+            self.server.record(event, body)
+        # dbt Cloud gives up on slow receivers, the api calls happen after answering
+        self.server.executor.submit(self.server.ingest.ingest_logged, event)
+        self._send(202, b"accepted")
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            return self._send(200, METRICS.to_prometheus().encode())
+        self._send(200, b"ok")
+
+    def _send(self, code: int, body: bytes):
+        self.send_response(code)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, message: str, *args):
+        logger.debug(message, *args)
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """
+    Http endpoint for dbt Cloud webhooks, events with a valid signature are
+    answered right away and ingested by a small pool of workers. GET /metrics
+    exports the metrics of the sidecar, any other GET is a health check.
+
+    With a record_directory every verified payload is also written there as is,
+    to be replayed later, see replay
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple,
+        secret: str,
+        ingest: WebhookIngest,
+        workers: int = 4,
+        record_directory: Optional[str] = None,
+    ):
+        super().__init__(address, WebhookHandler)
+        self.secret = secret
+        self.ingest = ingest
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.record_directory = record_directory
+        if record_directory:
+            os.makedirs(record_directory, exist_ok=True)
+
+    def record(self, event: dict, body: bytes):
+        # the event id comes from the payload, it must not name a path elsewhere
+        name = os.path.basename(str(event.get("eventId") or "")).lstrip(".")
+        name = name or signature(self.secret, body)[:16]
+        with open(os.path.join(self.record_directory, f"{name}.json"), "wb") as f:
+            f.write(body)
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=True)
+        self.ingest.close()
+
+
+def replay(paths: List[str], url: str, secret: str) -> List[int]:
+    """post recorded payloads to a running sidecar, signed with the secret
+
+    Args:
+        paths (List[str]): recorded webhook payload files
+        url (str): url of the sidecar
+        secret (str): webhook secret the sidecar verifies with
+
+    Returns:
+        List[int]: http status of every payload
+    """
+    import requests
+
+    statuses = []
+    with requests.Session() as session:
+        for path in paths:
+            with open(path, "rb") as f:
+                body = f.read()
+            response = session.post(
+                url,
+                data=body,
+                headers={
+                    SIGNATURE_HEADER: signature(secret, body),
+                    "Content-Type": "application/json",
+                },
+            )
+            statuses.append(response.status_code)
+    return statuses
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="receive webhooks")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8080)
+    serve.add_argument("--workers", type=int, default=4)
+    serve.add_argument("--record", help="directory to record verified payloads to")
+    replayed = commands.add_parser("replay", help="post recorded payloads")
+    replayed.add_argument("paths", nargs="+")
+    replayed.add_argument("--url", default="http://127.0.0.1:8080/")
+    args = parser.parse_args(argv)
+    secret = os.environ["WEBHOOK_SECRET"]
+
+    if args.command == "replay":
+        for path, status in zip(args.paths, replay(args.paths, args.url, secret)):
+            sys.stdout.write(f"{status} {path}\n")
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    ingest = WebhookIngest(
+        os.environ.get("RUN_STORE_PATH", ".run_store.sqlite"),
+        ArtifactCache(
+            os.environ.get("ARTIFACT_CACHE_DIR", ".artifact_cache"),
+            int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", 2 * 1024 ** 3)),
+            int(os.environ.get("ARTIFACT_CACHE_COMPRESSLEVEL", 6)) or None,
+        ),
+    )
+    server = WebhookServer(
+        (args.host, args.port), secret, ingest, args.workers, args.record
+    )
+    logger.info("Receiving dbt Cloud webhooks on %s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
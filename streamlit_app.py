@@ -1,17 +1,33 @@
 import streamlit as st
-from src.pages.dbt_dashboard import render_page as render_page_dbt_dashboard
 from src.shared.environment import Auth
-from PIL import Image
 
 st.set_page_config(page_icon="⚙️", page_title="DBT Dashboard")
 
-image = Image.open("./images/logo.png")
-st.image(image, width=75)
+
+@st.cache_data
+def load_image(path: str) -> bytes:
+    """read an image once per process instead of opening it on every rerun
+
+    Args:
+        path (str): image file
+
+    Returns:
+        bytes: encoded image as st.image takes it
+    """
+    with open(path, "rb") as f:
+        return f.read()
+
+
+st.image(load_image("./images/logo.png"), width=75)
 
 
 def main():
     set_up_app()
     set_up_auth()
+    # imported once logged in, the title and login render before pandas, numpy
+    # and aiohttp are loaded on a cold start
+    from src.pages.dbt_dashboard import render_page as render_page_dbt_dashboard
+
     render_page_dbt_dashboard()
 
 
@@ -36,8 +52,7 @@ def set_up_app():
         )
 
         st.text("")
-        image = Image.open("./images/dbt_screenshot.png")
-        st.image(image, width=600)
+        st.image(load_image("./images/dbt_screenshot.png"), width=600)
         st.text("")
         st.markdown(
             """
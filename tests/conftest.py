@@ -0,0 +1,47 @@
+"""Fixtures of the test suite, every api call goes to a local fake dbt Cloud"""
+import asyncio
+import os
+
+import pytest
+
+from benchmarks.fake_dbt_cloud import FakeAccount, FakeDbtCloudServer
+from src.artifact_cache import ArtifactCache
+from src.async_classes import AsyncDbtCloud
+
+ACCOUNT_ID = 1
+RUNS = 250
+JOBS = 20
+NODES = 50
+
+os.environ.setdefault("API_TOKEN", "test")
+
+
+def run(coroutine):
+    """run coroutine on a fresh event loop, for the sync tests of async code"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+@pytest.fixture()
+def fake_api() -> FakeDbtCloudServer:
+    account = FakeAccount(ACCOUNT_ID, runs=RUNS, jobs=JOBS, nodes=NODES)
+    with FakeDbtCloudServer(account) as server:
+        yield server
+
+
+@pytest.fixture()
+def artifact_cache(tmp_path) -> ArtifactCache:
+    return ArtifactCache(str(tmp_path / "artifacts"))
+
+
+@pytest.fixture()
+def async_client(fake_api: FakeDbtCloudServer, artifact_cache: ArtifactCache):
+    return AsyncDbtCloud(
+        ACCOUNT_ID,
+        api_base=fake_api.api_base,
+        backoff_factor=0.01,
+        artifact_cache=artifact_cache,
+    )
@@ -0,0 +1,191 @@
+import os
+import threading
+
+import aiohttp
+import pytest
+
+from benchmarks.fake_dbt_cloud import MAX_PAGE_SIZE
+from src.async_classes import ConcurrencyLimiter
+from src.manifest import MANIFEST_FILE
+from tests.conftest import ACCOUNT_ID, JOBS, RUNS, run
+
+
+def test_list_runs_collects_every_page(async_client, fake_api):
+    async def collect():
+        async with async_client:
+            runs = await async_client.list_runs(params={"limit": MAX_PAGE_SIZE})
+            return await runs.collect()
+
+    all_runs = run(collect())
+    assert [r["id"] for r in all_runs["data"]] == list(range(RUNS, 0, -1))
+    assert fake_api.requests == -(-RUNS // MAX_PAGE_SIZE)
+
+
+def test_collect_stops_at_max_items(async_client, fake_api):
+    async def collect():
+        async with async_client:
+            runs = await async_client.list_runs(params={"limit": MAX_PAGE_SIZE})
+            return await runs.collect(max_items=120)
+
+    all_runs = run(collect())
+    assert len(all_runs["data"]) == 120
+    assert fake_api.requests == 2
+
+
+def test_list_jobs_single_page(async_client):
+    async def collect():
+        async with async_client:
+            jobs = await async_client.list_jobs()
+            return await jobs.collect()
+
+    assert len(run(collect())["data"]) == JOBS
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retries_rate_limits_and_server_errors(async_client, fake_api, status):
+    fake_api.fail_next(status, status)
+
+    async def get_run():
+        async with async_client:
+            return await async_client.get_run(1)
+
+    assert run(get_run())["data"]["id"] == 1
+    assert fake_api.requests == 3
+
+
+def test_raises_once_retries_are_exhausted(async_client, fake_api):
+    fake_api.fail_next(*[503] * (async_client.max_retries + 1))
+
+    async def get_run():
+        async with async_client:
+            return await async_client.get_run(1)
+
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        run(get_run())
+    assert error.value.status == 503
+    assert fake_api.requests == async_client.max_retries + 1
+
+
+def test_not_found_is_not_retried(async_client, fake_api):
+    async def get_run():
+        async with async_client:
+            return await async_client.get_run(RUNS + 1)
+
+    with pytest.raises(aiohttp.ClientResponseError) as error:
+        run(get_run())
+    assert error.value.status == 404
+    assert fake_api.requests == 1
+
+
+def test_artifacts_are_cached(async_client, fake_api):
+    async def get_artifacts():
+        async with async_client:
+            first = await async_client.get_run_artifacts(1)
+            second = await async_client.get_run_artifacts(1)
+            return first, second
+
+    first, second = run(get_artifacts())
+    assert first == second
+    assert fake_api.requests == 1
+
+
+def test_missing_artifact_is_not_downloaded(async_client, tmp_path):
+    path = tmp_path / "missing.json"
+
+    async def download():
+        async with async_client:
+            return await async_client.download_artifact(1, "missing.json", str(path))
+
+    assert run(download()) is False
+    assert not path.exists()
+
+
+def test_download_errors_are_raised(async_client, fake_api, tmp_path):
+    fake_api.fail_next(*[503] * (async_client.max_retries + 1))
+
+    async def download():
+        async with async_client:
+            return await async_client.download_artifact(
+                1, "run_results.json", str(tmp_path / "r.json")
+            )
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        run(download())
+
+
+def test_download_run_artifacts_by_run(async_client, tmp_path):
+    async def download():
+        async with async_client:
+            await async_client.download_run_artifacts(1, str(tmp_path))
+            return await async_client.download_run_artifacts(2, str(tmp_path))
+
+    summary = run(download())
+    assert (tmp_path / "1" / "manifest.json").exists()
+    assert str(tmp_path / "2" / "manifest.json") in summary.written
+
+
+def test_limiter_slot_is_held_until_the_body_is_read(async_client):
+    async_client.concurrency_limiter = ConcurrencyLimiter(1)
+    semaphore = async_client.concurrency_limiter.semaphore
+
+    async def read():
+        async with async_client:
+            url_suffix = f"/accounts/{async_client.account_id}/runs/1/"
+            async with async_client._response(url_suffix) as response:
+                held = semaphore.locked()
+                await response.read()
+            return held, semaphore.locked()
+
+    assert run(read()) == (True, False)
+
+
+def test_artifact_path_commits_off_the_event_loop(async_client, artifact_cache):
+    commit = artifact_cache.commit
+    threads = []
+
+    def record_thread(*args):
+        threads.append(threading.current_thread())
+        return commit(*args)
+
+    artifact_cache.commit = record_thread
+
+    async def download():
+        async with async_client:
+            return (
+                await async_client.get_artifact_path(1, "manifest.json"),
+                threading.current_thread(),
+            )
+
+    path, loop_thread = run(download())
+    assert path == artifact_cache.get_path(ACCOUNT_ID, 1, "manifest.json")
+    assert len(threads) == 1 and threads[0] is not loop_thread
+
+
+def test_interrupted_artifact_download_leaves_nothing(async_client, artifact_cache):
+    async def interrupted(url_suffix, response, f):
+        f.write(b"{")
+        raise aiohttp.ClientPayloadError("connection lost")
+
+    async def download():
+        async with async_client:
+            return await async_client.get_artifact_path(1, "manifest.json")
+
+    async_client._stream = interrupted
+    with pytest.raises(aiohttp.ClientPayloadError):
+        run(download())
+    assert [files for _, _, files in os.walk(artifact_cache.directory) if files] == []
+
+
+def test_cached_manifest_index_skips_the_manifest(async_client, fake_api):
+    async def manifest_index():
+        async with async_client:
+            return await async_client.get_run_manifest_index(1)
+
+    run(manifest_index()).close()
+    os.remove(async_client.artifact_cache.path(ACCOUNT_ID, 1, MANIFEST_FILE))
+    requests = fake_api.requests
+
+    index = run(manifest_index())
+    assert len(index) and index.adapter_type
+    index.close()
+    assert fake_api.requests == requests
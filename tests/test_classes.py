@@ -0,0 +1,74 @@
+import gzip
+import os
+
+import pytest
+import requests
+
+from src.classes import DbtCloud
+from src.export import ARTIFACT_FILES
+from src.manifest import MANIFEST_FILE
+from tests.conftest import ACCOUNT_ID
+
+
+@pytest.fixture()
+def client(fake_api) -> DbtCloud:
+    return DbtCloud(ACCOUNT_ID, api_base=fake_api.api_base, backoff_factor=0)
+
+
+def test_download_run_artifacts_keeps_every_run(client, tmp_path):
+    first = client.download_run_artifacts(1, str(tmp_path))
+    second = client.download_run_artifacts(2, str(tmp_path))
+
+    assert sorted(first.written + second.written) == sorted(
+        str(tmp_path / str(run_id) / name)
+        for run_id in (1, 2)
+        for name in ARTIFACT_FILES
+    )
+    assert first.missing == second.missing == []
+
+
+def test_download_run_artifacts_compressed(client, tmp_path):
+    summary = client.download_run_artifacts(1, str(tmp_path), compression="gzip")
+
+    path = tmp_path / "1" / "run_results.json.gz"
+    assert str(path) in summary.written
+    with gzip.open(path) as f:
+        assert f.read().startswith(b"{")
+
+
+def test_download_run_artifacts_overwrites(client, tmp_path):
+    path = tmp_path / "1" / "run_results.json"
+    path.parent.mkdir()
+    path.write_text("stale")
+
+    client.download_run_artifacts(1, str(tmp_path))
+    assert path.read_text() != "stale"
+
+
+def test_missing_artifact_is_reported(client, tmp_path):
+    summary = client.export_run_artifacts([1], str(tmp_path), names=["missing.json"])
+    assert summary.missing == [(1, "missing.json")]
+
+
+def test_server_errors_are_raised(client, fake_api, tmp_path):
+    fake_api.fail_next(*[503] * (client.max_retries + 1))
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.download_artifact(1, "run_results.json", str(tmp_path / "r.json"))
+
+
+def test_cached_manifest_index_skips_the_manifest(fake_api, artifact_cache):
+    client = DbtCloud(
+        ACCOUNT_ID,
+        api_base=fake_api.api_base,
+        backoff_factor=0,
+        artifact_cache=artifact_cache,
+    )
+    client.get_run_manifest_index(1).close()
+    # the manifest is evicted before its much smaller index
+    os.remove(artifact_cache.path(ACCOUNT_ID, 1, MANIFEST_FILE))
+    requests = fake_api.requests
+
+    index = client.get_run_manifest_index(1)
+    assert len(index) and index.adapter_type
+    index.close()
+    assert fake_api.requests == requests
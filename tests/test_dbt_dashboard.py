@@ -0,0 +1,134 @@
+import aiohttp
+import pytest
+
+from src.dbt_dashboard import (
+    artifact_key,
+    fetch_run_results,
+    read_runs_and_jobs,
+    sync_jobs,
+    sync_runs,
+)
+from src.run_store import RunStore
+from src.shared.cache import SharedCache
+from tests.conftest import ACCOUNT_ID, JOBS, RUNS, run
+
+
+def test_run_without_artifacts_is_cached_as_none(async_client, fake_api):
+    cache = SharedCache()
+
+    async def fetch_twice():
+        async with async_client:
+            first = await fetch_run_results(async_client, RUNS + 1, True, cache)
+            second = await fetch_run_results(async_client, RUNS + 1, True, cache)
+            return first, second
+
+    assert run(fetch_twice()) == (None, None)
+    assert fake_api.requests == 1
+
+
+def test_server_errors_are_not_cached(async_client, fake_api):
+    cache = SharedCache()
+    fake_api.fail_next(*[503] * (async_client.max_retries + 1))
+
+    async def fetch():
+        async with async_client:
+            return await fetch_run_results(async_client, 1, True, cache)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        run(fetch())
+    assert artifact_key(async_client, 1, "run_results.json") not in cache
+    assert run(fetch())["results"]
+
+
+def test_read_runs_and_jobs_is_one_snapshot(fake_api, tmp_path, monkeypatch):
+    account = fake_api.accounts[ACCOUNT_ID]
+    reader = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    writer = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    writer.upsert_jobs([account.job(1)])
+    writer.upsert([account.run(1)])
+    latest_runs = reader.latest_runs
+
+    def write_in_between():
+        # another process, ie the webhook sidecar, stores a run meanwhile
+        writer.upsert([account.run(1 + JOBS)])
+        return latest_runs()
+
+    monkeypatch.setattr(reader, "latest_runs", write_in_between)
+    runs, jobs = read_runs_and_jobs(reader)
+
+    assert runs["version"] == jobs["version"] == 2
+    assert [run["id"] for run in runs["data"]] == [1]
+    assert reader.version == 3
+
+
+def test_first_sync_backfills_runs_stored_by_webhooks(async_client, fake_api, tmp_path):
+    store = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    # the sidecar stored the latest run before the dashboard synced the account
+    store.upsert([fake_api.accounts[ACCOUNT_ID].run(RUNS)])
+    assert not store.is_synced()
+
+    async def sync():
+        async with async_client:
+            await sync_runs(async_client, store)
+            await sync_jobs(async_client, store)
+
+    run(sync())
+    assert len(store) == RUNS
+    assert store.is_synced("runs") and store.is_synced("jobs") and store.is_synced()
+
+
+def sync(async_client, store):
+    async def sync_store():
+        async with async_client:
+            return await sync_runs(async_client, store)
+
+    return run(sync_store())
+
+
+@pytest.fixture()
+def synced_store(async_client, fake_api, tmp_path) -> RunStore:
+    store = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    sync(async_client, store)
+    return store
+
+
+def test_incremental_sync_adds_new_runs(async_client, fake_api, synced_store):
+    fake_api.accounts[ACCOUNT_ID].runs = RUNS + 3
+    requests = fake_api.requests
+
+    assert sync(async_client, synced_store) == 3
+    assert len(synced_store) == RUNS + 3
+    # the first page reaches stored runs, nothing older is requested
+    assert fake_api.requests == requests + 1
+
+
+def test_incremental_sync_updates_finished_runs(async_client, fake_api, synced_store):
+    in_progress = {**fake_api.accounts[ACCOUNT_ID].run(1), "is_complete": False}
+    synced_store.upsert([in_progress])
+    assert synced_store.pending_run_ids() == [1]
+
+    assert sync(async_client, synced_store) == 1
+    assert synced_store.pending_run_ids() == []
+    assert synced_store.is_finished(1)
+
+
+def test_incremental_sync_removes_deleted_runs(async_client, fake_api, synced_store):
+    deleted = {**fake_api.accounts[ACCOUNT_ID].run(1), "id": RUNS + 100}
+    synced_store.upsert([{**deleted, "is_complete": False}])
+
+    assert sync(async_client, synced_store) == 1
+    assert RUNS + 100 not in synced_store
+    assert synced_store.pending_run_ids() == []
+    # later syncs do not ask for the deleted run again
+    assert sync(async_client, synced_store) == 0
+
+
+def test_incremental_sync_raises_server_errors(async_client, fake_api, synced_store):
+    in_progress = {**fake_api.accounts[ACCOUNT_ID].run(1), "is_complete": False}
+    synced_store.upsert([in_progress])
+    # the page of latest runs succeeds, the run requested again by id does not
+    fake_api.fail_next(None, *[503] * (async_client.max_retries + 1))
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        sync(async_client, synced_store)
+    assert synced_store.pending_run_ids() == [1]
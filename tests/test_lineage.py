@@ -0,0 +1,86 @@
+import pytest
+
+from src.lineage import Lineage, failure_impact, shared_ancestors
+
+SOURCE = "source.shop.raw.orders"
+STG_ORDERS = "model.shop.stg_orders"
+STG_PAYMENTS = "model.shop.stg_payments"
+ORDERS = "model.shop.orders"
+DASHBOARD = "exposure.shop.dashboard"
+TEST = "test.shop.unique_orders_id"
+
+#   source -> stg_orders   -> orders -> dashboard
+#          -> stg_payments ->        -> test
+NODES = [
+    (1, SOURCE, "source"),
+    (2, STG_ORDERS, "model"),
+    (3, STG_PAYMENTS, "model"),
+    (4, ORDERS, "model"),
+    (5, DASHBOARD, "exposure"),
+    (6, TEST, "test"),
+]
+EDGES = [(1, 2), (1, 3), (2, 4), (3, 4), (4, 5), (4, 6)]
+
+
+@pytest.fixture()
+def lineage() -> Lineage:
+    return Lineage.from_edges(NODES, EDGES)
+
+
+def ids(lineage: Lineage, positions) -> set:
+    return set(lineage.unique_ids[positions])
+
+
+def test_walks_both_directions(lineage):
+    assert ids(lineage, lineage.descendants([lineage.positions[STG_ORDERS]])) == {
+        ORDERS,
+        DASHBOARD,
+        TEST,
+    }
+    assert ids(lineage, lineage.ancestors([lineage.positions[ORDERS]])) == {
+        SOURCE,
+        STG_ORDERS,
+        STG_PAYMENTS,
+    }
+
+
+def test_failure_impact(lineage):
+    # unknown ids, ie of nodes removed since the run, are left out
+    impact = failure_impact(lineage, [STG_ORDERS, ORDERS, "model.shop.removed"])
+    impact = impact.set_index("unique_id")
+
+    assert list(impact.index) == [STG_ORDERS, ORDERS]
+    assert impact.at[STG_ORDERS, "stale"] == 1
+    assert impact.at[STG_ORDERS, "stale_nodes"] == [ORDERS]
+    assert impact.at[STG_ORDERS, "exposures"] == [DASHBOARD]
+    assert impact.at[STG_ORDERS, "root_causes"] == []
+    # orders failed downstream of stg_orders, which is where to look first
+    assert impact.at[ORDERS, "stale"] == 0
+    assert impact.at[ORDERS, "exposures"] == [DASHBOARD]
+    assert impact.at[ORDERS, "root_causes"] == [STG_ORDERS]
+
+
+def test_shared_ancestors_are_the_most_downstream(lineage):
+    shared = shared_ancestors(lineage, [ORDERS, TEST])
+
+    # the source is upstream of both too, but so are the staging models below it
+    assert set(shared["unique_id"]) == {STG_ORDERS, STG_PAYMENTS}
+    assert set(shared["resource_type"]) == {"model"}
+    assert all(failures == [ORDERS, TEST] for failures in shared["failures"])
+
+
+def test_shared_ancestors_of_sibling_failures(lineage):
+    shared = shared_ancestors(lineage, [STG_ORDERS, STG_PAYMENTS])
+
+    assert shared.to_dict("records") == [
+        {
+            "unique_id": SOURCE,
+            "resource_type": "source",
+            "failures": [STG_ORDERS, STG_PAYMENTS],
+        }
+    ]
+
+
+@pytest.mark.parametrize("failed", [[], [DASHBOARD]])
+def test_nothing_shared_without_several_failures(lineage, failed):
+    assert shared_ancestors(lineage, failed).empty
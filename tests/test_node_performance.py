@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import pytest
+
+from src.node_performance import (
+    duration_regressions,
+    ingest_job_history,
+    node_duration_stats,
+    node_timings,
+)
+from src.run_store import RunStore
+from tests.conftest import ACCOUNT_ID, JOBS, NODES, RUNS, run
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture()
+def store() -> RunStore:
+    store = RunStore(":memory:", ACCOUNT_ID)
+    yield store
+    store.close()
+
+
+def add_runs(store: RunStore, execution_times: Dict[str, List[float]]):
+    """one run of job 1 per execution time of the nodes, oldest first"""
+    runs = len(next(iter(execution_times.values())))
+    for run_id in range(1, runs + 1):
+        finished_at = START + timedelta(hours=run_id)
+        store.upsert(
+            [
+                {
+                    "id": run_id,
+                    "job_id": 1,
+                    "is_complete": True,
+                    "finished_at": finished_at.isoformat(),
+                }
+            ]
+        )
+        store.add_node_results(
+            run_id,
+            [
+                (unique_id, "success", times[run_id - 1])
+                for unique_id, times in execution_times.items()
+            ],
+        )
+
+
+def test_ingest_job_history(async_client, fake_api, store):
+    account = fake_api.accounts[ACCOUNT_ID]
+    runs_of_job = [account.run(run_id) for run_id in range(1, RUNS + 1, JOBS)]
+    # a run without artifacts is recorded with no results, not requested again
+    store.upsert([*runs_of_job, {**account.run(RUNS + 1), "job_id": 1}])
+
+    async def ingest():
+        async with async_client:
+            return await ingest_job_history(async_client, store, 1)
+
+    assert run(ingest()) == len(runs_of_job) + 1
+    requests = fake_api.requests
+    assert run(ingest()) == 0
+    assert fake_api.requests == requests
+
+    timings = node_timings(store, 1)
+    assert len(timings) == len(runs_of_job) * NODES
+    assert set(timings["run_id"]) == {run["id"] for run in runs_of_job}
+    assert timings["execution_time"].notna().all()
+
+
+def test_node_duration_stats(store):
+    add_runs(
+        store,
+        {
+            "model.shop.orders": [float(seconds) for seconds in range(1, 21)],
+            "model.shop.customers": [2.0] * 20,
+        },
+    )
+    stats = node_duration_stats(node_timings(store, 1))
+
+    assert stats.index.tolist() == ["model.shop.orders", "model.shop.customers"]
+    assert stats.loc["model.shop.orders"].to_dict() == {
+        "runs": 20,
+        "p50": 10.5,
+        "p95": pytest.approx(19.05),
+        "mean": 10.5,
+        "max": 20,
+    }
+    assert stats.at["model.shop.customers", "p95"] == 2
+
+
+def test_node_timings_read_the_latest_runs(store):
+    add_runs(store, {"model.shop.orders": [float(seconds) for seconds in range(20)]})
+    timings = node_timings(store, 1, runs=5)
+
+    assert sorted(timings["execution_time"]) == [15, 16, 17, 18, 19]
+
+
+def test_duration_regressions(store):
+    add_runs(
+        store,
+        {
+            # twice as slow as usual in the latest run
+            "model.shop.orders": [10.0] * 10 + [20.0],
+            # three times as slow, but still too fast to report
+            "model.shop.customers": [1.0] * 10 + [3.0],
+            "model.shop.payments": [30.0] * 10 + [35.0],
+            # slower for several runs already, its baseline is slow too
+            "model.shop.refunds": [1.0] * 5 + [10.0] * 6,
+        },
+    )
+    regressions = duration_regressions(
+        node_timings(store, 1), baseline_runs=5, ratio=1.5, min_seconds=5
+    )
+
+    assert regressions.to_dict("index") == {
+        "model.shop.orders": {"latest": 20, "baseline": 10, "ratio": 2}
+    }
@@ -0,0 +1,193 @@
+"""The dashboard page rendered with streamlit's AppTest against the fake dbt Cloud"""
+import functools
+import json
+import sys
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from src.async_classes import AsyncDbtCloud
+from tests.conftest import ACCOUNT_ID, JOBS
+
+PAGE = "src.pages.dbt_dashboard"
+REPO_URL = "https://example.com/repo/"
+SECRETS = {
+    # keys are strings, as read from secrets.toml
+    "PROJECT_MAPPING": {"1": "analytics", "2": "marketing", "3": "finance"},
+    # the adapter of the fake manifests
+    "PROJECT_REPO_URL_MAPPING": {"snowflake": REPO_URL},
+}
+
+
+def dashboard():
+    from src.pages.dbt_dashboard import render_page
+
+    render_page()
+
+
+@pytest.fixture()
+def page(fake_api, tmp_path, monkeypatch):
+    """the page module imported fresh, with its clients calling the fake api"""
+    monkeypatch.setenv("ACCOUNT_IDS", str(ACCOUNT_ID))
+    monkeypatch.setenv("RUN_STORE_PATH", str(tmp_path / "runs.sqlite"))
+    monkeypatch.setenv("ARTIFACT_CACHE_DIR", str(tmp_path / "artifacts"))
+    # the page reads its secrets on import
+    monkeypatch.setattr(st, "secrets", SECRETS)
+    sys.modules.pop(PAGE, None)
+    import src.pages.dbt_dashboard as page
+
+    monkeypatch.setattr(
+        page,
+        "AsyncDbtCloud",
+        functools.partial(AsyncDbtCloud, api_base=fake_api.api_base),
+    )
+    yield page
+
+    for ingest in page.HISTORY_INGESTS.values():
+        ingest.exception(30)
+    loop = page.get_event_loop()
+    loop.run(page.get_dbt_client(ACCOUNT_ID).close())
+    page.get_run_store(ACCOUNT_ID).close()
+    loop.stop()
+    st.cache_resource.clear()
+    sys.modules.pop(PAGE, None)
+
+
+@pytest.fixture()
+def app(page) -> AppTest:
+    return AppTest.from_function(dashboard, default_timeout=30)
+
+
+def texts(app: AppTest) -> str:
+    return "\n".join(text.value for text in app.main.text)
+
+
+def widget(widgets, label: str):
+    return next(widget for widget in widgets if widget.label == label)
+
+
+def test_latest_run_of_every_job(app):
+    app.run()
+
+    assert not app.exception
+    [runs] = app.dataframe
+    assert len(runs.value) == JOBS
+    assert len(app.selectbox[0].options) == JOBS
+    assert [subheader.value for subheader in app.main.subheader][0] == "Run summary"
+    assert [title.value for title in app.main.title] == ["Historical runs"]
+    assert "Slowest nodes" in texts(app)
+
+
+def test_failed_run_results(app):
+    app.run()
+    widget(app.sidebar.selectbox, "Failed or Successful runs").select("failed").run()
+    widget(app.button, "Show latest run results").click().run()
+
+    assert not app.exception
+    # counts by status, the failed run has some which do not pass
+    assert {metric.label for metric in app.metric} - {"success", "pass"}
+    assert [subheader.value for subheader in app.main.subheader] == [
+        "Run summary",
+        "Failure impact",
+    ]
+    assert "Failed steps" in texts(app)
+    assert len(app.expander) == len(app.json)
+    assert app.markdown[0].value.startswith("[models/domain_")
+    assert f"]({REPO_URL}models/domain_" in app.markdown[0].value
+    assert set(json.loads(app.json[0].value)) == {
+        "Type",
+        "Status",
+        "Message",
+        "Raw SQL",
+        "Timing",
+        "Depends On",
+    }
+
+
+def test_historical_run_results(app, fake_api):
+    app.run()
+    historical = widget(app.selectbox, "Select historical run to inspect")
+    # the latest run of the job is selected first
+    assert historical.index == 0
+    requests = fake_api.requests
+    historical.select_index(1).run()
+    # only the run results of the newly selected run are requested
+    assert fake_api.requests == requests + 1
+
+    widget(app.button, "Show historic run results").click().run()
+    assert not app.exception
+    assert "Failed steps" in texts(app) or "No failed steps found" in texts(app)
+
+
+def test_node_performance_and_job_trends(app, page):
+    app.run()
+    widget(app.sidebar.checkbox, "Show node performance").check()
+    widget(app.sidebar.checkbox, "Show job duration trends").check()
+    app.run()
+    assert not app.exception
+    assert [title.value for title in app.main.title] == [
+        "Job duration trends",
+        "Historical runs",
+        "Node performance",
+    ]
+
+    # node timings are collected in the background, the next rerun shows them
+    for ingest in page.HISTORY_INGESTS.values():
+        ingest.result(30)
+    app.run()
+    assert "Slowest nodes over the last" in texts(app)
+    assert "Nodes slower in the latest run" in texts(app)
+
+
+def test_debug_panel(app):
+    app.run()
+    widget(app.sidebar.checkbox, "Show debug metrics").check().run()
+
+    assert not app.exception
+    assert [metric.label for metric in app.sidebar.metric] == [
+        "Shared cache hit ratio",
+        "Merge memo hit ratio",
+        "Artifact cache hit ratio",
+    ]
+    assert len(app.sidebar.dataframe) == 2
+
+
+def test_no_project_chosen(app):
+    app.run()
+    for project in SECRETS["PROJECT_MAPPING"].values():
+        widget(app.sidebar.checkbox, project).uncheck()
+    app.run()
+
+    assert not app.exception
+    assert "No runs found" in texts(app)
+
+
+def test_failed_account_is_left_out(app, fake_api):
+    fake_api.fail_next(404)
+    app.run()
+
+    assert not app.exception
+    assert app.warning[0].value.startswith(f"Fetching runs of account {ACCOUNT_ID}")
+    assert app.info[0].value == "There are no runs to show yet"
+
+
+def test_unknown_adapter(app, page, monkeypatch):
+    monkeypatch.setattr(page, "PROJECT_REPO_URL_MAPPING", {})
+    app.run()
+
+    [exception] = app.exception
+    assert "snowflake" in exception.message
+
+
+def test_webhook_ingest_reads_the_run_store(app, page, fake_api, monkeypatch):
+    monkeypatch.setattr(page, "WEBHOOK_INGEST", True)
+    # the first render syncs the store, the sidecar keeps it up to date after
+    app.run()
+    requests = fake_api.requests
+    page.SHARED_CACHE.clear()
+    app.run()
+
+    assert not app.exception
+    assert len(app.dataframe[0].value) == JOBS
+    assert fake_api.requests == requests
@@ -0,0 +1,74 @@
+import pytest
+
+from src.async_classes import EventLoopThread
+from src.dbt_dashboard import artifact_key
+from src.poller import Poller, is_failed
+from src.run_store import RunStore
+from src.shared.cache import SharedCache
+from tests.conftest import ACCOUNT_ID, RUNS
+
+
+@pytest.fixture()
+def loop() -> EventLoopThread:
+    loop = EventLoopThread()
+    yield loop
+    loop.stop()
+
+
+@pytest.fixture()
+def store(tmp_path) -> RunStore:
+    store = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    yield store
+    store.close()
+
+
+@pytest.mark.parametrize(
+    "run, failed",
+    [
+        ({"is_complete": True, "is_success": False}, True),
+        ({"is_complete": True, "is_success": True}, False),
+        ({"is_complete": True, "is_success": False, "is_cancelled": True}, False),
+        ({"is_complete": False, "is_success": False}, False),
+    ],
+)
+def test_is_failed(run, failed):
+    assert is_failed(run) is failed
+
+
+def test_poll_once_prefetches_failed_runs_once(
+    async_client, fake_api, store, loop, monkeypatch
+):
+    account = fake_api.accounts[ACCOUNT_ID]
+    account.failure_rate = 0.5
+    # the latest started run of every job
+    runs = sorted(
+        map(account.run, range(1, RUNS + 1)), key=lambda run: run["started_at"]
+    )
+    latest = {run["job_id"]: run for run in runs}
+    failed = sorted(run["id"] for run in latest.values() if is_failed(run))
+    assert len(failed) > 1
+    account.without_artifacts = frozenset(failed[:1])
+
+    requested = []
+    get_run_artifacts = async_client.get_run_artifacts
+
+    async def counted_get_run_artifacts(run_id, *args, **kwargs):
+        requested.append(run_id)
+        return await get_run_artifacts(run_id, *args, **kwargs)
+
+    monkeypatch.setattr(async_client, "get_run_artifacts", counted_get_run_artifacts)
+    cache = SharedCache()
+    poller = Poller(async_client, store, cache, loop)
+
+    try:
+        assert loop.run(poller.poll_once()) == len(failed) - 1
+        assert sorted(requested) == failed
+        assert len(store) == RUNS
+        for run_id in failed[1:]:
+            assert artifact_key(async_client, run_id, "run_results.json") in cache
+
+        # the run without artifacts counts as done, nothing is requested again
+        assert loop.run(poller.poll_once()) == 0
+        assert sorted(requested) == failed
+    finally:
+        loop.run(async_client.close())
@@ -0,0 +1,18 @@
+from src.run_store import RunStore
+from tests.conftest import ACCOUNT_ID
+
+
+def test_version_is_per_account(fake_api, tmp_path):
+    account = fake_api.accounts[ACCOUNT_ID]
+    store = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID)
+    other = RunStore(str(tmp_path / "runs.sqlite"), ACCOUNT_ID + 1)
+    store.upsert([account.run(1)])
+    store.upsert_jobs([account.job(1)])
+    # unchanged runs leave the version as is
+    store.upsert([account.run(1)])
+
+    other.upsert([{**account.run(2), "account_id": ACCOUNT_ID + 1}])
+    other.delete([2])
+
+    assert store.version == 2
+    assert other.version == 2
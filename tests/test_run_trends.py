@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import pytest
+
+from src.run_store import RunStore
+from src.run_trends import job_trends, rolling_run_stats, run_history
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+# jitter of a steady job, the interquartile range of its runs is a few seconds
+STEADY = [100, 104, 98, 101, 97, 103, 99, 102, 100, 96]
+
+
+def duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"00:{minutes:02}:{seconds:02}"
+
+
+@pytest.fixture()
+def store() -> RunStore:
+    store = RunStore(":memory:", 1)
+    yield store
+    store.close()
+
+
+def add_runs(store: RunStore, job_id: int, seconds: List[float], **run):
+    first_id = len(store) + 1
+    store.upsert(
+        {
+            "id": first_id + i,
+            "job_id": job_id,
+            "is_complete": True,
+            "is_success": True,
+            "finished_at": (START + timedelta(hours=first_id + i)).isoformat(),
+            "queued_duration": duration(5),
+            "run_duration": duration(run_seconds),
+            **run,
+        }
+        for i, run_seconds in enumerate(seconds)
+    )
+
+
+def test_slow_run_is_an_outlier(store):
+    add_runs(store, 1, [*STEADY, 400, 101])
+    stats = rolling_run_stats(run_history(store))
+
+    assert stats["run_seconds"][stats["is_outlier"]].tolist() == [400]
+    # the slow run is compared with the runs before it only
+    slow = stats.loc[stats["run_seconds"] == 400].iloc[0]
+    assert slow["median_seconds"] == 100
+    assert slow["success_rate"] == 1
+    assert slow["median_queued_seconds"] == 5
+
+
+def test_jitter_of_short_jobs_is_not_an_outlier(store):
+    # far above the interquartile range, but less than min_seconds above the median
+    add_runs(store, 1, [10, 11, 10, 11, 10, 11, 40])
+    assert not rolling_run_stats(run_history(store))["is_outlier"].any()
+
+
+def test_few_runs_give_no_statistics(store):
+    add_runs(store, 1, [100, 100, 100, 100, 900])
+    stats = rolling_run_stats(run_history(store), min_periods=5)
+
+    assert stats["median_seconds"].isna().all()
+    assert not stats["is_outlier"].any()
+
+
+def test_jobs_are_compared_with_their_own_runs(store):
+    add_runs(store, 1, STEADY)
+    add_runs(store, 2, [1000] * 10)
+    add_runs(store, 1, [400])
+    stats = rolling_run_stats(run_history(store))
+
+    outliers = stats.loc[stats["is_outlier"], ["job_id", "run_seconds"]]
+    assert outliers.values.tolist() == [[1, 400]]
+
+
+def test_cancelled_and_unfinished_runs_are_left_out(store):
+    add_runs(store, 1, STEADY)
+    add_runs(store, 1, [900], is_cancelled=True)
+    add_runs(store, 1, [900], is_complete=False)
+
+    assert run_history(store)["run_seconds"].tolist() == STEADY
+
+
+def test_slowdown_of_recent_runs(store):
+    add_runs(store, 1, STEADY * 2)
+    add_runs(store, 1, [200] * 10, is_success=False)
+    add_runs(store, 2, STEADY * 3)
+    trends = job_trends(rolling_run_stats(run_history(store)), recent_runs=10)
+
+    assert trends.index.tolist() == [1, 2]
+    assert trends.at[1, "runs"] == 30
+    assert trends.at[1, "slowdown"] == 2
+    assert trends.at[1, "recent_success_rate"] == 0
+    assert trends.at[1, "older_success_rate"] == 1
+    # until the slower runs reach the upper quartile of the window
+    assert trends.at[1, "recent_outliers"] == 5
+    assert trends.at[2, "slowdown"] == 1
+
+
+def test_single_run(store):
+    add_runs(store, 1, [100])
+    stats = rolling_run_stats(run_history(store))
+    trends = job_trends(stats)
+
+    assert not stats["is_outlier"].any()
+    assert trends.at[1, "latest_seconds"] == 100
+    # nothing older to compare with
+    assert trends["slowdown"].isna().all()
+
+
+def test_empty_history(store):
+    stats = rolling_run_stats(run_history(store))
+
+    assert stats.empty
+    assert "is_outlier" in stats
+    assert job_trends(stats).empty
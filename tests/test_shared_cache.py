@@ -0,0 +1,33 @@
+import asyncio
+
+from src.shared.cache import SharedCache
+from tests.conftest import run
+
+
+def test_refresh_joins_fetch_in_flight():
+    cache = SharedCache()
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return len(fetches)
+
+    async def get_and_refresh():
+        return await asyncio.gather(
+            cache.get("key", fetch), cache.refresh("key", fetch)
+        )
+
+    assert run(get_and_refresh()) == [1, 1]
+    assert len(fetches) == 1
+
+
+def test_refresh_replaces_fresh_value():
+    cache = SharedCache()
+    cache.put("key", "old")
+
+    async def fetch():
+        return "new"
+
+    assert run(cache.refresh("key", fetch)) == "new"
+    assert run(cache.get("key", fetch)) == "new"
@@ -0,0 +1,24 @@
+import pytest
+
+from src.shared.environment import Auth
+
+
+@pytest.fixture(autouse=True)
+def credentials(monkeypatch):
+    monkeypatch.setenv("DASHBOARD_USER", "user")
+    monkeypatch.setenv("DASHBOARD_PASS", "pass")
+
+
+@pytest.mark.parametrize(
+    "user, password, authenticated",
+    [("user", "pass", True), ("user", "wrong", False), ("wrong", "pass", False)],
+)
+def test_is_auth(user, password, authenticated):
+    assert Auth(user, password).is_auth() is authenticated
+
+
+def test_authenticated_stays_authenticated(monkeypatch):
+    auth = Auth("user", "pass")
+    assert auth.is_auth()
+    monkeypatch.setenv("DASHBOARD_PASS", "changed")
+    assert auth.is_auth()
@@ -0,0 +1,61 @@
+import threading
+
+from src.shared.memo import Memo
+
+
+def test_computes_once_per_key():
+    memo = Memo()
+    computed = []
+
+    def compute():
+        computed.append(1)
+        return len(computed)
+
+    assert memo.get("key", compute) == 1
+    assert memo.get("key", compute) == 1
+    assert (memo.hits, memo.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used():
+    memo = Memo(max_entries=2)
+    memo.get("a", lambda: "a")
+    memo.get("b", lambda: "b")
+    # a is used again, so b is the least recently used when c is added
+    memo.get("a", lambda: "recomputed")
+    memo.get("c", lambda: "c")
+
+    assert len(memo) == 2
+    assert memo.get("a", lambda: "recomputed") == "a"
+    assert memo.get("b", lambda: "recomputed") == "recomputed"
+
+
+def test_clear():
+    memo = Memo()
+    memo.get("key", lambda: "old")
+    memo.clear()
+
+    assert len(memo) == 0
+    assert memo.get("key", lambda: "new") == "new"
+
+
+def test_concurrent_sessions():
+    memo = Memo(max_entries=8)
+    errors = []
+
+    def session(offset: int):
+        try:
+            for i in range(2000):
+                key = (offset + i) % 16
+                assert memo.get(key, lambda: key * 2) == key * 2
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(memo) == 8
+    assert memo.hits + memo.misses == 8 * 2000
@@ -0,0 +1,86 @@
+import json
+import threading
+
+import pytest
+
+from src.shared.metrics import Metrics, hit_ratio
+
+
+@pytest.fixture()
+def metrics() -> Metrics:
+    return Metrics(prefix="test")
+
+
+def test_prometheus_text(metrics):
+    metrics.inc("requests_total", endpoint="runs", status=200)
+    metrics.inc("requests_total", 2, endpoint="runs", status=200)
+    metrics.inc("requests_total", endpoint="jobs", status=429)
+    metrics.gauge("cache_entries", lambda: 7)
+
+    assert metrics.to_prometheus().splitlines() == [
+        "# TYPE test_requests_total counter",
+        'test_requests_total{endpoint="runs",status="200"} 3',
+        'test_requests_total{endpoint="jobs",status="429"} 1',
+        "# TYPE test_cache_entries gauge",
+        "test_cache_entries 7",
+    ]
+
+
+def test_prometheus_histogram(metrics):
+    for seconds in (0.003, 0.2, 0.2, 30):
+        metrics.observe("render_seconds", seconds, step="runs")
+    lines = metrics.to_prometheus().splitlines()
+
+    assert lines[0] == "# TYPE test_render_seconds histogram"
+    # buckets are cumulative and the last one counts every observation
+    assert 'test_render_seconds_bucket{step="runs",le="0.005"} 1' in lines
+    assert 'test_render_seconds_bucket{step="runs",le="0.1"} 1' in lines
+    assert 'test_render_seconds_bucket{step="runs",le="0.25"} 3' in lines
+    assert 'test_render_seconds_bucket{step="runs",le="10.0"} 3' in lines
+    assert 'test_render_seconds_bucket{step="runs",le="+Inf"} 4' in lines
+    assert lines[-2:] == [
+        'test_render_seconds_sum{step="runs"} 30.403',
+        'test_render_seconds_count{step="runs"} 4',
+    ]
+
+
+def test_timer_observes_blocks_which_raise(metrics):
+    with pytest.raises(ValueError):
+        with metrics.timer("render_seconds", step="runs"):
+            raise ValueError
+
+    [series] = metrics.snapshot()["histograms"]["render_seconds"]
+    assert series["labels"] == {"step": "runs"}
+    assert series["count"] == 1
+
+
+def test_json_snapshot(metrics):
+    metrics.inc("requests_total", status=200)
+    metrics.clear()
+    metrics.inc("requests_total", status=404)
+
+    assert json.loads(metrics.to_json())["counters"] == {
+        "requests_total": [{"labels": {"status": "404"}, "value": 1}]
+    }
+
+
+def test_concurrent_recording(metrics):
+    def record():
+        for _ in range(1000):
+            metrics.inc("requests_total")
+            metrics.observe("request_seconds", 0.01)
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["requests_total"][0]["value"] == 8000
+    assert snapshot["histograms"]["request_seconds"][0]["count"] == 8000
+
+
+@pytest.mark.parametrize("hits, misses, ratio", [(0, 0, 0), (3, 1, 0.75), (0, 5, 0)])
+def test_hit_ratio(hits, misses, ratio):
+    assert hit_ratio(hits, misses) == ratio
@@ -0,0 +1,133 @@
+import json
+
+import pandas as pd
+import pytest
+
+from src.manifest import ManifestIndex, build_manifest_index
+from src.triage import results_to_frame, triage_run
+
+MANIFEST = {
+    "metadata": {"adapter_type": "postgres"},
+    "nodes": {
+        "model.shop.orders": {
+            "resource_type": "model",
+            "original_file_path": "models/orders.sql",
+            "raw_sql": "select * from {{ ref('stg_orders') }}",
+            "depends_on": {"nodes": ["model.shop.stg_orders"]},
+        },
+        "model.shop.stg_orders": {
+            "resource_type": "model",
+            "original_file_path": "models/stg_orders.sql",
+            "raw_sql": "select * from raw.orders",
+            "depends_on": {"nodes": []},
+        },
+        "test.shop.unique_orders_id": {
+            "resource_type": "test",
+            "original_file_path": "models/schema.yml",
+            "raw_sql": "{{ test_unique(**_dbt_generic_test_kwargs) }}",
+            "depends_on": {"nodes": ["model.shop.orders"]},
+        },
+    },
+}
+
+
+def result(unique_id: str, status: str, execution_time: float, **fields) -> dict:
+    return {
+        "unique_id": unique_id,
+        "status": status,
+        "message": None,
+        "execution_time": execution_time,
+        **fields,
+    }
+
+
+RUN_RESULTS = {
+    "results": [
+        result(
+            "model.shop.stg_orders",
+            "success",
+            2.0,
+            timing=[
+                {"name": "compile", "started_at": "t0", "completed_at": "t1"},
+                {"name": "execute", "started_at": "t1", "completed_at": "t2"},
+            ],
+        ),
+        result("model.shop.orders", "error", 30.0, message="Database Error"),
+        result("test.shop.unique_orders_id", "skipped", 0.0),
+        result("test.shop.not_null_orders_id", "pass", 1.0),
+        # a node the manifest of the run does not know, ie removed since
+        result("seed.shop.countries", "error", 5.0),
+    ]
+}
+
+
+@pytest.fixture()
+def manifest(tmp_path) -> ManifestIndex:
+    manifest_path = tmp_path / "manifest.json"
+    manifest_path.write_text(json.dumps(MANIFEST))
+    build_manifest_index(str(manifest_path), str(tmp_path / "manifest.sqlite"))
+    manifest = ManifestIndex(str(tmp_path / "manifest.sqlite"))
+    yield manifest
+    manifest.close()
+
+
+def test_results_to_frame():
+    results = results_to_frame(RUN_RESULTS)
+
+    assert results["resource_type"].tolist() == [
+        "model",
+        "model",
+        "test",
+        "test",
+        "seed",
+    ]
+    assert results.at[0, "started_at"] == "t1"
+    assert results.at[0, "completed_at"] == "t2"
+    assert pd.isna(results.at[1, "started_at"])
+    assert results["execution_time"].dtype == float
+
+
+def test_results_to_frame_without_results():
+    results = results_to_frame({"results": []})
+
+    assert results.empty
+    assert "resource_type" in results
+
+
+def test_triage_run_counts(manifest):
+    triage = triage_run(RUN_RESULTS, manifest)
+
+    assert triage.status_counts.to_dict() == {
+        "error": 2,
+        "success": 1,
+        "skipped": 1,
+        "pass": 1,
+    }
+    assert triage.resource_type_counts.to_dict("index") == {
+        "model": {"error": 1, "pass": 0, "skipped": 0, "success": 1},
+        "seed": {"error": 1, "pass": 0, "skipped": 0, "success": 0},
+        "test": {"error": 0, "pass": 1, "skipped": 1, "success": 0},
+    }
+
+
+def test_triage_run_slowest(manifest):
+    triage = triage_run(RUN_RESULTS, manifest, top=2)
+
+    assert triage.slowest["unique_id"].tolist() == [
+        "model.shop.orders",
+        "seed.shop.countries",
+    ]
+
+
+def test_triage_run_failures_are_joined_with_the_manifest(manifest):
+    failures = triage_run(RUN_RESULTS, manifest).failures
+
+    # indexed by the position of the result in run_results
+    assert failures.index.tolist() == [1, 2, 4]
+    assert failures.at[1, "original_file_path"] == "models/orders.sql"
+    assert failures.at[1, "depends_on"] == {"nodes": ["model.shop.stg_orders"]}
+    assert failures.at[1, "message"] == "Database Error"
+    assert failures.at[2, "resource_type"] == "test"
+    # the resource type of nodes missing from the manifest comes from the unique id
+    assert failures.at[4, "resource_type"] == "seed"
+    assert pd.isna(failures.at[4, "original_file_path"])
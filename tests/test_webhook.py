@@ -0,0 +1,123 @@
+import http.client
+import json
+import os
+import threading
+
+import pytest
+import requests
+
+from benchmarks.fake_dbt_cloud import FakeAccount, FakeDbtCloudServer
+from src.manifest import MANIFEST_INDEX_FILE
+from src.run_store import RunStore
+from src.webhook import (
+    MAX_BODY_BYTES,
+    RUN_RESULTS_FILE,
+    SIGNATURE_HEADER,
+    WebhookIngest,
+    WebhookServer,
+    replay,
+    signature,
+)
+from tests.conftest import ACCOUNT_ID, JOBS, NODES
+
+SECRET = "secret"
+PAYLOAD = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "benchmarks",
+    "webhooks",
+    "job_run_completed.json",
+)
+# run of the recorded payload
+RUN_ID = 10_000
+
+
+@pytest.fixture()
+def webhook_api() -> FakeDbtCloudServer:
+    account = FakeAccount(ACCOUNT_ID, runs=RUN_ID, jobs=JOBS, nodes=NODES)
+    with FakeDbtCloudServer(account) as server:
+        yield server
+
+
+@pytest.fixture()
+def store_path(tmp_path) -> str:
+    return str(tmp_path / "runs.sqlite")
+
+
+@pytest.fixture()
+def sidecar(webhook_api, artifact_cache, store_path, tmp_path) -> WebhookServer:
+    ingest = WebhookIngest(store_path, artifact_cache, api_base=webhook_api.api_base)
+    server = WebhookServer(
+        ("127.0.0.1", 0),
+        SECRET,
+        ingest,
+        workers=1,
+        record_directory=str(tmp_path / "recorded"),
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server: WebhookServer) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def post(server: WebhookServer, body: bytes, secret: str = SECRET):
+    return requests.post(
+        url(server), data=body, headers={SIGNATURE_HEADER: signature(secret, body)}
+    )
+
+
+def test_replayed_run_is_stored_with_artifacts(sidecar, artifact_cache, store_path):
+    assert replay([PAYLOAD], url(sidecar), SECRET) == [202]
+    # waits for the ingest, which runs after the webhook was answered
+    sidecar.executor.shutdown(wait=True)
+
+    store = RunStore(store_path, ACCOUNT_ID)
+    try:
+        [run] = store.runs()
+        assert run["id"] == RUN_ID
+        assert [job["id"] for job in store.jobs()] == [run["job_id"]]
+        # webhooks alone do not count as a sync of the account
+        assert not store.is_synced()
+    finally:
+        store.close()
+    for name in (RUN_RESULTS_FILE, MANIFEST_INDEX_FILE):
+        assert artifact_cache.get_path(ACCOUNT_ID, RUN_ID, name) is not None
+
+
+def test_bad_signature_is_forbidden(sidecar):
+    with open(PAYLOAD, "rb") as f:
+        body = f.read()
+    assert post(sidecar, body, secret="wrong").status_code == 403
+    assert os.listdir(sidecar.record_directory) == []
+
+
+@pytest.mark.parametrize("body", [b"{not json", b"[1, 2]"])
+def test_bad_json_is_rejected(sidecar, body):
+    assert post(sidecar, body).status_code == 400
+
+
+@pytest.mark.parametrize(
+    "content_length, status",
+    [("abc", 400), ("-1", 413), (str(MAX_BODY_BYTES + 1), 413)],
+)
+def test_bad_content_length_is_rejected_unread(sidecar, content_length, status):
+    connection = http.client.HTTPConnection("127.0.0.1", sidecar.server_address[1])
+    try:
+        # no body is sent, the sidecar answers without waiting for one
+        connection.putrequest("POST", "/")
+        connection.putheader("Content-Length", content_length)
+        connection.endheaders()
+        assert connection.getresponse().status == status
+    finally:
+        connection.close()
+    assert os.listdir(sidecar.record_directory) == []
+
+
+def test_recorded_event_id_stays_in_directory(sidecar):
+    event = {"eventId": "../../escaped", "eventType": "job.created"}
+    assert post(sidecar, json.dumps(event).encode()).status_code == 202
+    assert os.listdir(sidecar.record_directory) == ["escaped.json"]